@@ -0,0 +1,11 @@
+"""
+FlyTau load benchmark.
+
+  python -m bench seed --scale medium          fill the database with synthetic data
+  python -m bench run --concurrency 1,8,32     drive the app in-process, print + save a baseline
+  python -m bench compare OLD.json NEW.json    diff two baselines (exit 1 on regression)
+
+Uses the same DB_* environment variables as utils.py. Seed a database built from
+sqlp.sql; every generated key is prefixed (BN-/BN/@bench.flytau) so it never collides
+with the sample data.
+"""
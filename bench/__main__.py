@@ -0,0 +1,48 @@
+import argparse
+import os
+
+from bench import datagen, workload
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="FlyTau load benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="insert synthetic data")
+    p_seed.add_argument("--scale", choices=sorted(datagen.SCALES), default="small")
+    p_seed.add_argument("--seed", type=int, default=42, help="random seed (same seed -> same data)")
+    for key in datagen.SCALES["small"]:
+        p_seed.add_argument(f"--{key}", type=int, default=None, help=f"override the number of {key}")
+
+    p_run = sub.add_parser("run", help="drive the app with the mixed workload")
+    p_run.add_argument("--concurrency", default="1,8,32", help="comma separated thread counts")
+    p_run.add_argument("--duration", type=float, default=30, help="seconds per concurrency level")
+    p_run.add_argument("--save", default=None, help="write the baseline JSON here")
+
+    p_cmp = sub.add_parser("compare", help="compare two saved baselines")
+    p_cmp.add_argument("old")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="allowed p95 slowdown (0.10 = 10%%)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "seed":
+        overrides = {k: getattr(args, k) for k in datagen.SCALES["small"]}
+        datagen.seed(args.scale, overrides=overrides, rnd_seed=args.seed)
+
+    elif args.command == "run":
+        levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+        baseline = workload.run(levels, args.duration)
+        if args.save:
+            os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+            workload.save(baseline, args.save)
+            print(f"Baseline saved to {args.save}")
+
+    elif args.command == "compare":
+        regressions = workload.compare(workload.load(args.old), workload.load(args.new), args.threshold)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Synthetic data consistent with sqlp.sql (FKs, seat uniqueness, long routes on Large aircraft)
+and with the admin flight rules: crew size by aircraft size, long-haul qualified crew on long
+routes, no aircraft or crew member on two flights at once. Crew/aircraft location continuity
+is not modelled.
+"""
+import heapq
+import random
+import string
+from datetime import date, datetime, time, timedelta
+
+import utils
+from utils import db_cur, db_tx
+
+
+# rows per table for each scale (override any of them from the CLI)
+SCALES = {
+    "small": {
+        "routes": 200, "aircraft": 100, "pilots": 60, "attendants": 120,
+        "customers": 2000, "guests": 2000, "flights": 3000, "orders": 30000,
+    },
+    "medium": {
+        "routes": 2000, "aircraft": 1000, "pilots": 600, "attendants": 1200,
+        "customers": 50000, "guests": 50000, "flights": 60000, "orders": 500000,
+    },
+    "large": {
+        "routes": 5000, "aircraft": 3000, "pilots": 2000, "attendants": 4000,
+        "customers": 300000, "guests": 300000, "flights": 250000, "orders": 3000000,
+    },
+}
+
+BATCH = 5000
+LONG_ROUTE_MINUTES = 360     # same rule as the admin flight form: long routes need Large aircraft
+FLIGHT_WINDOW_DAYS = 180     # flights spread over today +- this many days
+CREW_SIZE = {"Large": (3, 6), "Small": (2, 3)}   # (pilots, attendants), as validate_crew_before_flight
+TURNAROUND = timedelta(minutes=60)                # ground time before an aircraft / crew member flies again
+
+BENCH_PASSWORD = "bench"
+BENCH_MANAGER_ID = 900001
+PILOT_ID_BASE = 700000
+ATTENDANT_ID_BASE = 800000
+
+
+def customer_email(i):
+    return f"user{i}@bench.flytau"
+
+
+def guest_email(i):
+    return f"guest{i}@bench.flytau"
+
+
+def _airports(n):
+    # BAAA, BAAB, ... enough codes for n distinct airports
+    codes = []
+    for a in string.ascii_uppercase:
+        for b in string.ascii_uppercase:
+            for c in string.ascii_uppercase:
+                codes.append(f"B{a}{b}{c}")
+                if len(codes) == n:
+                    return codes
+    return codes
+
+
+def _take(pools, n, dep_dt):
+    """
+    n (free_at, index) entries free at dep_dt from heaps ordered by free_at, trying pools in
+    order. Returns [(pool, entry)], or None (nothing taken) when there are not enough.
+    """
+    taken = []
+    for pool in pools:
+        while len(taken) < n and pool and pool[0][0] <= dep_dt:
+            taken.append((pool, heapq.heappop(pool)))
+    if len(taken) < n:
+        _put_back(taken)
+        return None
+    return taken
+
+
+def _put_back(taken, free_at=None):
+    for pool, (was_free_at, index) in taken:
+        heapq.heappush(pool, (free_at or was_free_at, index))
+
+
+def _insert(sql, rows):
+    for i in range(0, len(rows), BATCH):
+        with db_tx() as cursor:
+            cursor.executemany(sql, rows[i:i + BATCH])
+
+
+def _next_id(table, column):
+    with db_cur() as cursor:
+        cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 AS N FROM {table}")
+        return int(cursor.fetchone()["N"])
+
+
+def seed(scale="small", overrides=None, rnd_seed=42, log=print):
+    """
+    Insert one scale of synthetic data, then rebuild the derived tables.
+    Returns the row counts that were used.
+    """
+    counts = dict(SCALES[scale])
+    counts.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    rnd = random.Random(rnd_seed)
+    today = date.today()
+
+    # ---------- staff ----------
+    log("staff ...")
+    _insert("""
+        INSERT IGNORE INTO Managers (EmployeeID, FirstNameHebrew, LastNameHebrew, Password)
+        VALUES (%s,%s,%s,%s)
+    """, [(BENCH_MANAGER_ID, "Bench", "Manager", BENCH_PASSWORD)])
+    pilot_long = [rnd.random() < 0.5 for _ in range(counts["pilots"])]
+    attendant_long = [rnd.random() < 0.5 for _ in range(counts["attendants"])]
+    _insert("""
+        INSERT INTO Pilots (EmployeeID, FirstNameHebrew, LastNameHebrew, StartDate, IsLongHaulQualified)
+        VALUES (%s,%s,%s,%s,%s)
+    """, [(PILOT_ID_BASE + i, "Pilot", str(i), today - timedelta(days=rnd.randint(30, 5000)), q)
+          for i, q in enumerate(pilot_long)])
+    _insert("""
+        INSERT INTO FlightAttendants (EmployeeID, FirstNameHebrew, LastNameHebrew, StartDate, IsLongHaulQualified)
+        VALUES (%s,%s,%s,%s,%s)
+    """, [(ATTENDANT_ID_BASE + i, "Attendant", str(i), today - timedelta(days=rnd.randint(30, 5000)), q)
+          for i, q in enumerate(attendant_long)])
+
+    # ---------- customers ----------
+    log("customers ...")
+    _insert("""
+        INSERT INTO RegisteredCustomers
+        (Email, FirstlNameEnglish, LastlNameEnglish, Password, PassportNum, BirthDate, RegistrationDate)
+        VALUES (%s,%s,%s,%s,%s,%s,%s)
+    """, [(customer_email(i), "User", str(i), BENCH_PASSWORD, f"P{i:08d}",
+           date(1960, 1, 1) + timedelta(days=rnd.randint(0, 15000)), today - timedelta(days=rnd.randint(0, 1500)))
+          for i in range(counts["customers"])])
+    _insert("""
+        INSERT INTO GuestCustomers (Email, FirstlNameEnglish, LastlNameEnglish)
+        VALUES (%s,%s,%s)
+    """, [(guest_email(i), "Guest", str(i)) for i in range(counts["guests"])])
+
+    # ---------- routes ----------
+    log("routes ...")
+    n_airports = 2
+    while n_airports * (n_airports - 1) < counts["routes"]:
+        n_airports += 1
+    airports = _airports(n_airports)
+    pairs = [(a, b) for a in airports for b in airports if a != b]
+    rnd.shuffle(pairs)
+    pairs = pairs[:counts["routes"]]
+
+    first_route = _next_id("Routes", "RouteID")
+    routes = []   # (RouteID, minutes)
+    route_rows = []
+    for i, (src, dst) in enumerate(pairs):
+        minutes = rnd.choice([rnd.randint(45, LONG_ROUTE_MINUTES), rnd.randint(LONG_ROUTE_MINUTES + 1, 900)])
+        routes.append((first_route + i, minutes))
+        route_rows.append((first_route + i, src, dst, minutes))
+    _insert("""
+        INSERT INTO Routes (RouteID, SourceAirport, DestAirport, DurationMinutes)
+        VALUES (%s,%s,%s,%s)
+    """, route_rows)
+
+    # ---------- aircraft + layouts ----------
+    log("aircraft ...")
+    aircraft = []    # (TailNum, size, {class: (rows, cols)})
+    for i in range(counts["aircraft"]):
+        size = "Large" if rnd.random() < 0.4 else "Small"
+        layout = {"Economy": (rnd.randint(20, 40) if size == "Large" else rnd.randint(10, 25), 6)}
+        if size == "Large":
+            layout["Business"] = (rnd.randint(3, 8), 4)
+        aircraft.append((f"BN-{i:05d}", size, layout))
+    _insert("""
+        INSERT INTO Aircrafts (TailNum, Manufacturer, Size, PurchaseDate)
+        VALUES (%s,%s,%s,%s)
+    """, [(t, rnd.choice(["Boeing", "Airbus", "Dassault"]), s, today - timedelta(days=rnd.randint(100, 9000)))
+          for t, s, _ in aircraft])
+    _insert("""
+        INSERT INTO AircraftLayout (TailNum, ClassType, NumRows, NumCols)
+        VALUES (%s,%s,%s,%s)
+    """, [(t, cls, r, c) for t, _, layout in aircraft for cls, (r, c) in layout.items()])
+
+    # ---------- flights, pricing, crew ----------
+    # planned in departure order; aircraft and crew are heaps of (free from, index), so each flight
+    # takes the ones that have been on the ground longest (short routes prefer crew without the
+    # long-haul qualification). A flight that cannot be staffed is not created.
+    log("flights ...")
+    plans = []
+    for _ in range(counts["flights"]):
+        route_id, minutes = rnd.choice(routes)
+        dep_date = today + timedelta(days=rnd.randint(-FLIGHT_WINDOW_DAYS, FLIGHT_WINDOW_DAYS))
+        dep_time = time(rnd.randint(0, 23), rnd.choice([0, 15, 30, 45]))
+        plans.append((datetime.combine(dep_date, dep_time), route_id, minutes))
+    plans.sort()
+
+    never = datetime.min
+    planes = {size: [(never, i) for i, a in enumerate(aircraft) if a[1] == size] for size in CREW_SIZE}
+    pilots = {q: [(never, i) for i, long_ok in enumerate(pilot_long) if long_ok == q] for q in (True, False)}
+    attendants = {q: [(never, i) for i, long_ok in enumerate(attendant_long) if long_ok == q] for q in (True, False)}
+
+    flights = []     # (FlightNum, departure datetime, layout)
+    flight_rows, pricing_rows, pilot_rows, attendant_rows = [], [], [], []
+    for dep_dt, route_id, minutes in plans:
+        long_haul = minutes >= LONG_ROUTE_MINUTES
+        if long_haul:
+            plane_pools = [planes["Large"]]
+        else:
+            plane_pools = [planes["Small"], planes["Large"]] if rnd.random() < 0.6 else [planes["Large"], planes["Small"]]
+        plane = _take(plane_pools, 1, dep_dt)
+        if plane is None:
+            continue
+        tail, size, layout = aircraft[plane[0][1][1]]
+
+        req_p, req_a = CREW_SIZE[size]
+        quals = [True] if long_haul else [False, True]
+        flight_pilots = _take([pilots[q] for q in quals], req_p, dep_dt)
+        flight_attendants = _take([attendants[q] for q in quals], req_a, dep_dt) if flight_pilots else None
+        if flight_attendants is None:
+            _put_back(plane + (flight_pilots or []))
+            continue
+        free_at = dep_dt + timedelta(minutes=minutes) + TURNAROUND
+        for taken in (plane, flight_pilots, flight_attendants):
+            _put_back(taken, free_at)
+
+        dep_date, dep_time = dep_dt.date(), dep_dt.time()
+        status = "Arrived" if dep_date < today else ("Canceled" if rnd.random() < 0.02 else "Active")
+        fn = f"BN{len(flight_rows):07d}"
+
+        flight_rows.append((fn, route_id, tail, dep_time, dep_date, status))
+        for cls in layout:
+            base = minutes * (0.6 if cls == "Economy" else 1.8)
+            pricing_rows.append((fn, cls, round(base * rnd.uniform(0.8, 1.4), 2)))
+        pilot_rows.extend((fn, PILOT_ID_BASE + index) for _, (_, index) in flight_pilots)
+        attendant_rows.extend((fn, ATTENDANT_ID_BASE + index) for _, (_, index) in flight_attendants)
+        if status != "Canceled":
+            flights.append((fn, dep_dt, layout))
+    if len(flight_rows) < counts["flights"]:
+        log(f"  {counts['flights'] - len(flight_rows)} flight(s) skipped: no free aircraft or crew")
+    counts["flights"] = len(flight_rows)
+
+    _insert("""
+        INSERT INTO Flights (FlightNum, RouteID, TailNum, DepartureTime, DepartureDate, StatusF)
+        VALUES (%s,%s,%s,%s,%s,%s)
+    """, flight_rows)
+    _insert("INSERT INTO FlightPricing (FlightNum, ClassType, Price) VALUES (%s,%s,%s)", pricing_rows)
+    _insert("INSERT INTO CrewPilots (FlightNum, PilotID) VALUES (%s,%s)", pilot_rows)
+    _insert("INSERT INTO CrewAttendants (FlightNum, AttendantID) VALUES (%s,%s)", attendant_rows)
+
+    # ---------- orders + tickets ----------
+    # seats are handed out in order per flight/class, so (FlightNum, SeatRow, SeatCol) stays unique
+    log("orders + tickets ...")
+    next_seat = {}
+    prices = {(fn, cls): p for fn, cls, p in pricing_rows}
+    order_id = _next_id("Orders", "OrderID")
+    order_rows, ticket_rows = [], []
+
+    def flush():
+        _insert("""
+            INSERT INTO Orders (OrderID, GuestEmail, RegisteredEmail, OrderDate, TotalPrice, OrderStatus)
+            VALUES (%s,%s,%s,%s,%s,%s)
+        """, order_rows)
+        _insert("""
+            INSERT INTO Tickets (OrderID, FlightNum, PassengerName, ClassType, SeatRow, SeatCol)
+            VALUES (%s,%s,%s,%s,%s,%s)
+        """, ticket_rows)
+        order_rows.clear()
+        ticket_rows.clear()
+
+    made = 0
+    attempts = 0
+    while made < counts["orders"] and attempts < counts["orders"] * 3:
+        attempts += 1
+        fn, dep_dt, layout = rnd.choice(flights)
+        cls = "Business" if "Business" in layout and rnd.random() < 0.15 else "Economy"
+        rows, cols = layout[cls]
+        qty = rnd.choice([1, 1, 1, 2, 2, 3, 4])
+        start = next_seat.get((fn, cls), 0)
+        if start + qty > rows * cols:
+            continue
+        next_seat[(fn, cls)] = start + qty
+
+        if rnd.random() < 0.7 and counts["customers"]:
+            reg, guest = customer_email(rnd.randrange(counts["customers"])), None
+        else:
+            reg, guest = None, guest_email(rnd.randrange(max(counts["guests"], 1)))
+
+        ordered = dep_dt - timedelta(days=rnd.randint(1, 120), minutes=rnd.randint(0, 1440))
+        if dep_dt.date() < today:
+            status = "Paid"
+        else:
+            status = "CustCancelled" if rnd.random() < 0.05 else "Active"
+        total = round(prices[(fn, cls)] * qty, 2)
+        if status == "CustCancelled":
+            total = round(total * 0.05, 2)
+
+        order_rows.append((order_id, guest, reg, ordered, total, status))
+        # cancelled orders keep no tickets (same as _cancel_orders_cur)
+        if status != "CustCancelled":
+            for k in range(start, start + qty):
+                ticket_rows.append((order_id, fn, f"Passenger {order_id}", cls, k // cols + 1, chr(ord("A") + k % cols)))
+        order_id += 1
+        made += 1
+        if len(order_rows) >= BATCH * 4:
+            flush()
+    flush()
+    counts["orders"] = made
+
+    # ---------- derived data ----------
+    log("seat counters + report rollups ...")
+    utils.rebuild_seat_counters()
+    with db_tx() as cursor:
+        cursor.execute("""
+            UPDATE Flights SET StatusF = 'Full'
+            WHERE StatusF = 'Active' AND FlightNum IN (
+                SELECT FlightNum FROM FlightSeatCounters
+                GROUP BY FlightNum
+                HAVING SUM(Sold) >= SUM(Capacity)
+            )
+        """)
+    utils.rebuild_report_rollups()
+
+    log("done: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+    return counts
@@ -0,0 +1,277 @@
+"""
+Mixed workload against the Flask app, in-process (test_client per thread, real MySQL).
+"""
+import json
+import random
+import re
+import threading
+import time as _clock
+from datetime import datetime
+
+import utils
+from utils import db_cur
+
+from bench import datagen
+
+
+# route label -> relative weight
+MIX = {
+    "flights_search GET": 10,
+    "flights_search POST": 30,
+    "book_flight GET": 25,
+    "book_flight POST": 5,
+    "guest_tickets POST": 10,
+    "orders_history GET": 12,
+    "admin_dashboard GET": 8,
+}
+
+
+# ==========================================================
+# QUERY COUNTING (from the Server-Timing header set in main.py)
+# ==========================================================
+_DB_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries')
+
+
+def queries_of(resp):
+    m = _DB_TIMING.search(resp.headers.get("Server-Timing", "")) if resp is not None else None
+    return int(m.group(1)) if m else 0
+
+
+# ==========================================================
+# SAMPLES (picked once, before the clock starts)
+# ==========================================================
+def load_samples(limit=500):
+    with db_cur() as cursor:
+        cursor.execute("""
+            SELECT f.FlightNum, f.DepartureDate, r.SourceAirport, r.DestAirport
+            FROM Flights f
+            JOIN Routes r ON r.RouteID = f.RouteID
+            WHERE f.StatusF = 'Active' AND f.DepartureDate >= CURDATE()
+            ORDER BY RAND()
+            LIMIT %s
+        """, (limit,))
+        flights = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT OrderID, GuestEmail
+            FROM Orders
+            WHERE GuestEmail IS NOT NULL
+            ORDER BY OrderID DESC
+            LIMIT %s
+        """, (limit,))
+        guest_orders = cursor.fetchall()
+
+        cursor.execute("SELECT Email FROM RegisteredCustomers WHERE Email LIKE %s LIMIT %s", ("%@bench.flytau", limit))
+        customers = [r["Email"] for r in cursor.fetchall()]
+
+    if not flights:
+        raise SystemExit("No future Active flights - run `python -m bench seed` first.")
+    return {"flights": flights, "guest_orders": guest_orders, "customers": customers}
+
+
+# ==========================================================
+# ONE WORKER THREAD
+# ==========================================================
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+class _Worker(threading.Thread):
+    def __init__(self, app, samples, deadline, rnd_seed, results):
+        super().__init__(daemon=True)
+        self.app = app
+        self.samples = samples
+        self.deadline = deadline
+        self.rnd = random.Random(rnd_seed)
+        self.results = results        # label -> list of (ms, queries, outcome)
+
+        self.anon = app.test_client()
+        self.user = app.test_client()
+        self.admin = app.test_client()
+
+    def _login(self):
+        if self.samples["customers"]:
+            self.user.post("/login", data={
+                "email": self.rnd.choice(self.samples["customers"]), "password": datagen.BENCH_PASSWORD
+            })
+        self.admin.post("/admin/login", data={
+            "employee_id": str(datagen.BENCH_MANAGER_ID), "password": datagen.BENCH_PASSWORD
+        })
+
+    def _prepare(self, label):
+        """Inputs for one request, picked before the timer starts. None = nothing to send."""
+        rnd = self.rnd
+        flight = rnd.choice(self.samples["flights"])
+        if label == "book_flight POST":
+            seats = utils.list_available_seats(flight["FlightNum"], "Economy")[:10]
+            if not seats:
+                return None
+            flight = dict(flight, seat=rnd.choice(seats))
+        if label == "guest_tickets POST" and not self.samples["guest_orders"]:
+            return None
+        return flight
+
+    def _request(self, label, flight):
+        rnd = self.rnd
+        fn = flight["FlightNum"]
+
+        if label == "flights_search GET":
+            return self.anon.get("/flights/search"), None
+        if label == "flights_search POST":
+            return self.anon.post("/flights/search", data={
+                "departure_date": str(flight["DepartureDate"]),
+                "source": flight["SourceAirport"],
+                "dest": flight["DestAirport"],
+            }), None
+        if label == "book_flight GET":
+            return self.anon.get(f"/flights/{fn}/book?class_type=Economy&qty=2"), None
+        if label == "book_flight POST":
+            seat = flight["seat"]
+            resp = self.anon.post(f"/flights/{fn}/book", data={
+                "class_type": "Economy", "qty": "1",
+                "seats": [f"{seat['row']}-{seat['col']}"],
+                "guest_email": datagen.guest_email(rnd.randrange(1000)),
+                "guest_first": "Bench", "guest_last": "Guest",
+            })
+            booked = resp.status_code == 302 and "/booking/confirm" in resp.headers.get("Location", "")
+            return resp, ("booked" if booked else "conflict")
+        if label == "guest_tickets POST":
+            o = rnd.choice(self.samples["guest_orders"])
+            return self.anon.post("/guest/tickets", data={
+                "email": o["GuestEmail"], "booking_code": str(o["OrderID"])
+            }), None
+        if label == "orders_history GET":
+            return self.user.get("/orders/history"), None
+        if label == "admin_dashboard GET":
+            return self.admin.get("/admin"), None
+        raise ValueError(label)
+
+    def run(self):
+        self._login()
+        labels = list(MIX.keys())
+        weights = [MIX[k] for k in labels]
+        while _clock.monotonic() < self.deadline:
+            label = self.rnd.choices(labels, weights)[0]
+            flight = self._prepare(label)
+            if flight is None:
+                continue
+            started = _clock.perf_counter()
+            try:
+                resp, outcome = self._request(label, flight)
+            except Exception as e:
+                resp, outcome = None, f"error: {type(e).__name__}"
+            ms = (_clock.perf_counter() - started) * 1000.0
+            if resp is not None and resp.status_code >= 500:
+                outcome = f"http {resp.status_code}"
+            self.results.setdefault(label, []).append((ms, queries_of(resp), outcome))
+
+
+# ==========================================================
+# RUN / REPORT
+# ==========================================================
+def run_level(app, samples, concurrency, duration, rnd_seed=1):
+    per_thread = [{} for _ in range(concurrency)]
+    deadline = _clock.monotonic() + duration
+    workers = [_Worker(app, samples, deadline, rnd_seed + i, per_thread[i]) for i in range(concurrency)]
+
+    started = _clock.monotonic()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = _clock.monotonic() - started
+
+    merged = {}
+    for res in per_thread:
+        for label, rows in res.items():
+            merged.setdefault(label, []).extend(rows)
+
+    routes = {}
+    total = 0
+    for label, rows in sorted(merged.items()):
+        lat = sorted(r[0] for r in rows)
+        outcomes = {}
+        for r in rows:
+            if r[2]:
+                outcomes[r[2]] = outcomes.get(r[2], 0) + 1
+        routes[label] = {
+            "count": len(rows),
+            "rps": round(len(rows) / elapsed, 2),
+            "p50_ms": round(_percentile(lat, 50), 2),
+            "p95_ms": round(_percentile(lat, 95), 2),
+            "p99_ms": round(_percentile(lat, 99), 2),
+            "mean_ms": round(sum(lat) / len(lat), 2),
+            "queries_mean": round(sum(r[1] for r in rows) / len(rows), 2),
+            "queries_max": max(r[1] for r in rows),
+            "outcomes": outcomes,
+        }
+        total += len(rows)
+
+    return {"concurrency": concurrency, "seconds": round(elapsed, 2),
+            "requests": total, "rps": round(total / elapsed, 2), "routes": routes}
+
+
+def run(concurrency_levels, duration, log=print):
+    # imported here so `bench seed` does not need Flask
+    from main import application
+
+    samples = load_samples()
+    levels = []
+    for c in concurrency_levels:
+        log(f"concurrency {c} for {duration}s ...")
+        level = run_level(application, samples, c, duration)
+        print_level(level, log)
+        levels.append(level)
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "db_pool_size": utils.DB_POOL_SIZE,
+        "duration": duration,
+        "levels": levels,
+    }
+
+
+def print_level(level, log=print):
+    log(f"  {level['requests']} requests, {level['rps']} req/s")
+    log(f"  {'route':<22}{'n':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'q/req':>7}")
+    for label, r in level["routes"].items():
+        log(f"  {label:<22}{r['count']:>7}{r['rps']:>8}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['queries_mean']:>7}")
+
+
+def save(baseline, path):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(baseline, fh, indent=2, default=str)
+
+
+def load(path):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def compare(old, new, threshold=0.10, log=print):
+    """
+    Per concurrency level + route: p95 and queries/request, old -> new.
+    Returns the regressions (p95 slower by more than threshold, or more queries per request).
+    """
+    regressions = []
+    old_levels = {l["concurrency"]: l for l in old["levels"]}
+    for level in new["levels"]:
+        before = old_levels.get(level["concurrency"])
+        if not before:
+            continue
+        log(f"concurrency {level['concurrency']}: {before['rps']} -> {level['rps']} req/s")
+        for label, r in level["routes"].items():
+            b = before["routes"].get(label)
+            if not b:
+                continue
+            change = (r["p95_ms"] - b["p95_ms"]) / b["p95_ms"] if b["p95_ms"] else 0.0
+            flag = ""
+            if change > threshold or r["queries_mean"] > b["queries_mean"]:
+                flag = "  <-- regression"
+                regressions.append((level["concurrency"], label))
+            log(f"  {label:<22} p95 {b['p95_ms']:>8} -> {r['p95_ms']:>8} ({change:+.0%})"
+                f"  q/req {b['queries_mean']} -> {r['queries_mean']}{flag}")
+    return regressions
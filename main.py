@@ -1,9 +1,13 @@
-from flask import Flask, render_template, redirect, request, session, url_for, flash
-from flask_session import Session
+from flask import Flask, Response, render_template, redirect, request, session, url_for, flash, g
+import click
 from datetime import timedelta, date
 import os
+import secrets
+import time as _clock
 
 from utils import *
+import metrics
+import session_store
 
 application = Flask(
     __name__,
@@ -19,7 +23,11 @@ os.makedirs(session_dir, exist_ok=True)
 
 application.config.update(
     SECRET_KEY=os.getenv("FLASK_SECRET_KEY", "dev-secret-change-me"),
-    SESSION_TYPE="filesystem",
+    # sqlite | mysql | redis | memory | filesystem (see session_store.py)
+    SESSION_BACKEND=os.getenv("SESSION_BACKEND", "sqlite"),
+    SESSION_SQLITE_PATH=os.getenv("SESSION_SQLITE_PATH", os.path.join(session_dir, "sessions.sqlite3")),
+    SESSION_REDIS_URL=os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0"),
+    SESSION_LRU_SECONDS=float(os.getenv("SESSION_LRU_SECONDS", "2")),
     SESSION_FILE_DIR=session_dir,
     SESSION_PERMANENT=True,
     PERMANENT_SESSION_LIFETIME=timedelta(minutes=30),
@@ -27,7 +35,93 @@ application.config.update(
     SESSION_COOKIE_SECURE=False
 )
 
-Session(application)
+session_interface = session_store.init_app(application)
+
+# -------------------------
+# DB: one pooled connection per request (see utils.db_cur)
+# -------------------------
+application.teardown_appcontext(release_request_connection)
+
+# Routes / Aircrafts / AircraftLayout in memory from the start (reloaded when their version changes)
+try:
+    load_reference_snapshot()
+except Exception as e:
+    application.logger.warning("Reference snapshot not loaded at start (%s); it will load on first use.", e)
+
+
+@application.before_request
+def _start_timer():
+    g._request_started = _clock.perf_counter()
+
+
+@application.before_request
+def _poll_cache_invalidations():
+    # changes made by other workers (throttled to one small query per CHANGE_POLL_SECONDS)
+    if request.endpoint != "static":
+        poll_data_changes()
+
+
+@application.after_request
+def _server_timing(response):
+    """
+    Server-Timing: db (statements + rows), db-acquire (waiting for the pool), app (whole request).
+    Over DB_QUERY_BUDGET statements -> warning in the log, so N+1 regressions show up.
+    """
+    stats = current_db_stats()
+    total_ms = (_clock.perf_counter() - g.get("_request_started", _clock.perf_counter())) * 1000.0
+    timings = [f"app;dur={total_ms:.1f}"]
+    if stats is not None:
+        timings.insert(0, f'db;dur={stats.exec_ms:.1f};desc="{stats.queries} queries, {stats.rows} rows"')
+        timings.insert(1, f"db-acquire;dur={stats.acquire_ms:.1f}")
+        if stats.queries > DB_QUERY_BUDGET:
+            sql_log.warning("%s %s ran %d queries (budget %d)",
+                            request.method, request.endpoint, stats.queries, DB_QUERY_BUDGET)
+    response.headers["Server-Timing"] = ", ".join(timings)
+    return response
+
+
+# -------------------------
+# Metrics (/metrics, aggregated over all worker processes)
+# -------------------------
+@metrics.register_collector
+def _db_and_cache_metrics():
+    pool = db_pool_stats()
+    out = [
+        ("gauge", "flytau_db_pool_size", {}, pool["size"]),
+        ("gauge", "flytau_db_pool_in_use", {}, pool["in_use"]),
+        ("gauge", "flytau_db_pool_idle", {}, pool["idle"]),
+        ("counter", "flytau_db_pool_acquired_total", {}, pool["acquired"]),
+        ("counter", "flytau_db_pool_wait_seconds_total", {}, pool["wait_seconds"]),
+        ("counter", "flytau_db_pool_timeouts_total", {}, pool["timeouts"]),
+    ]
+    for name, stats in CACHE_STATS.items():
+        out.append(("counter", "flytau_cache_hits_total", {"cache": name}, stats.hits))
+        out.append(("counter", "flytau_cache_misses_total", {"cache": name}, stats.misses))
+        out.append(("gauge", "flytau_cache_entries", {"cache": name}, stats.size()))
+    if session_interface is not None:
+        front = session_interface.front
+        out.append(("counter", "flytau_cache_hits_total", {"cache": "session"}, front.hits))
+        out.append(("counter", "flytau_cache_misses_total", {"cache": "session"}, front.misses))
+        out.append(("gauge", "flytau_cache_entries", {"cache": "session"}, len(front)))
+    return out
+
+
+@application.after_request
+def _record_request_metrics(response):
+    seconds = _clock.perf_counter() - g.get("_request_started", _clock.perf_counter())
+    endpoint = request.endpoint or "unmatched"
+    metrics.observe("flytau_http_request_duration_seconds", seconds, endpoint=endpoint, method=request.method)
+    metrics.inc("flytau_http_requests_total", endpoint=endpoint, method=request.method, status=response.status_code)
+    try:
+        metrics.flush()
+    except OSError:
+        pass   # metrics must never fail the request; the next flush writes everything
+    return response
+
+
+@application.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 # -------------------------
 # Helpers
@@ -38,6 +132,13 @@ def _is_logged_in():
 def _is_admin():
     return bool(session.get("admin_id"))
 
+def _hold_token(create=False):
+    # per-visitor id that owns seat holds (kept in the session)
+    token = session.get("hold_token")
+    if token is None and create:
+        token = session["hold_token"] = secrets.token_urlsafe(16)
+    return token
+
 def validate_registration_input(first, last):
     """
     English letters only for first/last name.
@@ -159,26 +260,82 @@ def logout():
 # ==========================================================
 # FLIGHT SEARCH (GUEST + REGISTERED)
 # ==========================================================
+CALENDAR_DAYS = int(os.environ.get("CALENDAR_DAYS", "3"))   # flexible search: +- days around the date
+
+
 @application.route("/flights/search", methods=["GET", "POST"])
 def flights_search():
     sources, dests = list_route_airports()
     results = None
+    itineraries = None
+    calendar = None
+    form = {}
 
     if request.method == "POST":
         dep_date = (request.form.get("departure_date", "")).strip() or None
         source = (request.form.get("source", "")).strip() or None
         dest = (request.form.get("dest", "")).strip() or None
-        results = search_flights(dep_date, source, dest)
+        with_connections = request.form.get("connections") == "1"
+        flexible = request.form.get("flexible") == "1"
+        form = {"departure_date": dep_date, "source": source, "dest": dest}
+
+        if flexible:
+            if dep_date and source and dest:
+                try:
+                    calendar = search_fare_calendar(dep_date, source, dest, CALENDAR_DAYS)
+                except ValueError:
+                    flash("Invalid departure date.", "error")
+            else:
+                flash("Flexible dates need a date, an origin and a destination.", "error")
 
-    return render_template("flights_search.html", sources=sources, dests=dests, results=results)
+        if with_connections and dep_date and source and dest:
+            try:
+                itineraries = search_connections(dep_date, source, dest)
+            except ValueError:
+                flash("Invalid departure date.", "error")
+                itineraries = []
+        else:
+            if with_connections:
+                flash("Connection search needs a date, an origin and a destination. Showing direct flights.", "error")
+            results = search_flights(dep_date, source, dest, with_availability=True)
+
+    return render_template(
+        "flights_search.html",
+        sources=sources,
+        dests=dests,
+        results=results,
+        itineraries=itineraries,
+        calendar=calendar,
+        form=form,
+        min_connection=CONNECTIONS_MIN_MINUTES
+    )
 
 
 # ==========================================================
 # BOOKING (Seat selection)
 # Python-only: to update "Select exactly X seats", we re-render page.
 # ==========================================================
+def _already_booked(request_key):
+    """Redirect to the order an earlier submit of this form made, or None if there is none."""
+    done = find_order_by_request_key(request_key) if request_key else None
+    if done is None:
+        return None
+    metrics.inc("flytau_bookings_total", outcome="duplicate")
+    session["last_order_id"], session["last_order_email"] = done
+    return redirect(url_for("booking_confirm"))
+
+
 @application.route("/flights/<flight_num>/book", methods=["GET", "POST"])
 def book_flight(flight_num):
+    # repeated submit of a form that already booked (double click, proxy retry): show that order.
+    # Checked again before every conflict below: the first submit may commit while this one runs,
+    # and its seats then look taken to this one.
+    request_key = (request.form.get("request_key", "")).strip()[:64] or None
+    if request.method == "POST":
+        done = _already_booked(request_key)
+        if done is not None:
+            return done
+
     flight = get_flight_details(flight_num)
     if not flight:
         flash("Flight not found.", "error")
@@ -220,22 +377,9 @@ def book_flight(flight_num):
     except:
         qty_for_page = 1
 
-    # ---------- build grid for the chosen class ----------
-    num_rows, num_cols = get_layout_for_flight(flight_num, class_type)
-    cols = [chr(ord("A") + i) for i in range(num_cols)]
-
-    taken_rows = get_taken_seats(flight_num, class_type)
-    occupied = set()
-    for t in taken_rows:
-        r = t.get("SeatRow", t.get("row"))
-        c = t.get("SeatCol", t.get("col"))
-        if r is None or c is None:
-            continue
-        occupied.add(f"{int(r)}-{str(c).upper()}")
-
-    available_count = (num_rows * len(cols)) - len(occupied)
-    if available_count < 0:
-        available_count = 0
+    # ---------- build grid for the chosen class (cached seat map) ----------
+    hold_token = _hold_token()
+    num_rows, cols, occupied, available_count, held = get_seat_grid(flight_num, class_type, hold_token)
 
     # clamp qty to available seats
     if available_count == 0:
@@ -251,11 +395,28 @@ def book_flight(flight_num):
         if action == "update":
             return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type, qty=qty_for_page))
 
+        # hold: keep the ticked seats for this visitor for SEAT_HOLD_SECONDS, back to the grid
+        if action == "hold":
+            try:
+                seats = [(int(r), c.upper()) for r, c in (s.split("-") for s in request.form.getlist("seats"))]
+            except ValueError:
+                seats = []
+            if len(seats) != qty_for_page:
+                flash(f"You must choose exactly {qty_for_page} seats.", "error")
+            else:
+                ok, expires_or_err = hold_seats(flight_num, class_type, seats, _hold_token(create=True))
+                if ok:
+                    flash(f"Seats held for you until {expires_or_err:%H:%M}.", "success")
+                else:
+                    flash(expires_or_err, "error")
+            return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type, qty=qty_for_page))
+
         passenger_name = (request.form.get("passenger_name", "")).strip()
         selected_seats = request.form.getlist("seats")
 
         registered_email = session.get("user_email")
         guest_email = None
+        guest_first = guest_last = None
 
         if registered_email:
             if not passenger_name:
@@ -267,19 +428,50 @@ def book_flight(flight_num):
             if not guest_email:
                 flash("Guest email is required.", "error")
                 return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type, qty=qty_for_page))
-            ensure_guest(guest_email, guest_first, guest_last)
             if not passenger_name:
                 passenger_name = f"{guest_first} {guest_last}".strip() or "Guest"
 
+        # auto-assign: best block picked and booked server side (retries on conflicts)
+        if action == "auto":
+            if available_count < qty_for_page or qty_for_page < 1:
+                done = _already_booked(request_key)
+                if done is not None:
+                    return done
+                flash(f"Not enough free seats in {class_type}.", "error")
+                return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type))
+
+            ok, order_id_or_err, seats = auto_book_order(
+                flight_num=flight_num,
+                class_type=class_type,
+                qty=qty_for_page,
+                passenger_name=passenger_name,
+                total_price=float(pricing[class_type]) * qty_for_page,
+                registered_email=registered_email,
+                guest_email=guest_email,
+                guest_first=guest_first,
+                guest_last=guest_last,
+                hold_token=hold_token,
+                request_key=request_key
+            )
+            if not ok:
+                done = _already_booked(request_key)
+                if done is not None:
+                    return done
+                metrics.inc("flytau_bookings_total", outcome="conflict", stage="auto")
+                flash(order_id_or_err, "error")
+                return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type, qty=qty_for_page))
+
+            metrics.inc("flytau_bookings_total", outcome="success")
+            session["last_order_id"] = order_id_or_err
+            session["last_order_email"] = registered_email or guest_email
+            flash("Seats assigned: " + ", ".join(f"{c}{r}" for r, c in seats), "success")
+            return redirect(url_for("booking_confirm"))
+
         # validate seat count
         if len(selected_seats) != qty_for_page:
             flash(f"You must choose exactly {qty_for_page} seats.", "error")
             return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type, qty=qty_for_page))
 
-        # validate chosen seats are still available
-        available = list_available_seats(flight_num, class_type)
-        available_set = {f"{s['row']}-{str(s['col']).upper()}" for s in available}
-
         selected_norm = []
         for s in selected_seats:
             try:
@@ -289,27 +481,41 @@ def book_flight(flight_num):
                 flash("Invalid seat format.", "error")
                 return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type, qty=qty_for_page))
 
-        for s in selected_norm:
-            if s not in available_set:
-                flash("One or more selected seats were taken. Please try again.", "error")
-                return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type, qty=qty_for_page))
+        # validate chosen seats are still available
+        if not seats_are_free(flight_num, class_type, [tuple(s.split("-")) for s in selected_norm], hold_token):
+            done = _already_booked(request_key)
+            if done is not None:
+                return done
+            metrics.inc("flytau_bookings_total", outcome="conflict", stage="precheck")
+            flash("One or more selected seats were taken. Please try again.", "error")
+            return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type, qty=qty_for_page))
 
         total_price = float(pricing[class_type]) * qty_for_page
-        order_id = create_order(
-            guest_email=guest_email,
-            registered_email=registered_email,
+
+        # guest + order + tickets + status in one transaction (all or nothing)
+        ok, order_id_or_err = book_order(
+            flight_num=flight_num,
+            class_type=class_type,
+            seats=[tuple(seat.split("-")) for seat in selected_norm],
+            passenger_name=passenger_name,
             total_price=total_price,
-            status="Active"
+            registered_email=registered_email,
+            guest_email=guest_email,
+            guest_first=guest_first,
+            guest_last=guest_last,
+            hold_token=hold_token,
+            request_key=request_key
         )
-
-        for seat in selected_norm:
-            row_str, col = seat.split("-")
-            ok, err = add_ticket(order_id, flight_num, passenger_name, class_type, int(row_str), col)
-            if not ok:
-                flash(err, "error")
-                return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type))
-
-        update_flight_status_full_if_needed(flight_num)
+        if not ok:
+            done = _already_booked(request_key)
+            if done is not None:
+                return done
+            metrics.inc("flytau_bookings_total", outcome="conflict", stage="insert")
+            flash(order_id_or_err, "error")
+            return redirect(url_for("book_flight", flight_num=flight_num, class_type=class_type))
+
+        metrics.inc("flytau_bookings_total", outcome="success")
+        order_id = order_id_or_err
         session["last_order_id"] = order_id
         session["last_order_email"] = registered_email or guest_email
         return redirect(url_for("booking_confirm"))
@@ -326,6 +532,9 @@ def book_flight(flight_num):
         num_rows=num_rows,
         cols=cols,
         occupied=occupied,
+        held=held,
+        hold_minutes=SEAT_HOLD_SECONDS // 60,
+        request_key=secrets.token_urlsafe(24),
         available_count=available_count,
         error=None
     )
@@ -459,28 +668,66 @@ def admin_dashboard():
 
     # filter
     flight_status = (request.args.get("flight_status") or "All").strip()
+    flights_filter = {
+        "date_from": (request.args.get("date_from") or "").strip() or None,
+        "date_to": (request.args.get("date_to") or "").strip() or None,
+        "route_id": (request.args.get("route_id") or "").strip() or None,
+        "tail_num": (request.args.get("tail_num") or "").strip() or None,
+    }
+    if flights_filter["route_id"] and not flights_filter["route_id"].isdigit():
+        flights_filter["route_id"] = None
+    flights_after = (request.args.get("after") or "").strip() or None
 
     # pre-check fields for create-flight filtering
     new_route_id_raw = (request.args.get("new_route_id") or "").strip()
     new_dep_date = (request.args.get("new_dep_date") or "").strip()
     new_dep_time = (request.args.get("new_dep_time") or "").strip()
 
-    routes = admin_list_routes()
-    aircrafts_all = admin_list_aircrafts()
-    pilots_all = admin_list_pilots()
-    attendants_all = admin_list_attendants()
-    flights = admin_list_flights(status=flight_status)
+    # pre-check input (parsed first so it can run together with the reports)
+    precheck_args = None
+    precheck_error = None
+    if new_route_id_raw and new_dep_date and new_dep_time:
+        try:
+            new_route_id = int(new_route_id_raw)
+            dep_dt = datetime.strptime(f"{new_dep_date} {new_dep_time}", "%Y-%m-%d %H:%M")
+        except Exception:
+            precheck_error = "Invalid route/date/time for pre-check."
+        else:
+            precheck_args = (new_route_id, dep_dt)
+
+    # all independent queries at the same time (page waits for the slowest one only)
+    tasks = {
+        "routes": (admin_list_routes, (), {}, []),
+        "aircrafts": (admin_list_aircrafts, (), {}, []),
+        "pilots": (admin_list_pilots, (), {}, []),
+        "attendants": (admin_list_attendants, (), {}, []),
+        "flights": (admin_list_flights, (), dict(status=flight_status, after=flights_after, **flights_filter), ([], None)),
+        "reports_by_status": (admin_report_orders_by_status, (), {}, []),
+        "revenue": (admin_report_revenue_sum, (), {}, 0.0),
+        "cancelled_cnt": (admin_report_cancelled_count, (), {}, 0),
+        "revenue_by_class": (admin_report_revenue_by_class, (), {}, []),
+        "flights_by_status": (admin_report_flights_by_status, (), {}, []),
+    }
+    if precheck_args:
+        tasks["candidates"] = (
+            admin_get_create_flight_candidates, precheck_args, {},
+            (False, "Pre-check could not be completed. Please try again.")
+        )
+
+    data, load_errors = load_concurrently(tasks)
 
-    reports_by_status = admin_report_orders_by_status()
-    revenue = admin_report_revenue_sum()
-    cancelled_cnt = admin_report_cancelled_count()
-    revenue_by_class = admin_report_revenue_by_class()
+    routes = data["routes"]
+    flights, flights_next = data["flights"]
+    reports_by_status = data["reports_by_status"]
+    revenue = data["revenue"]
+    cancelled_cnt = data["cancelled_cnt"]
+    revenue_by_class = data["revenue_by_class"]
+    flights_by_status = data["flights_by_status"]
 
     # defaults (if admin didn't "pre-check" yet)
-    candidate_aircrafts = aircrafts_all
-    candidate_pilots = pilots_all
-    candidate_attendants = attendants_all
-    flights_by_status = admin_report_flights_by_status()
+    candidate_aircrafts = data["aircrafts"]
+    candidate_pilots = data["pilots"]
+    candidate_attendants = data["attendants"]
     # NEW: crew rules by size (for template display)
     req_pilots_small = None
     req_atts_small = None
@@ -488,35 +735,29 @@ def admin_dashboard():
     req_atts_large = None
 
     is_long = None
-    precheck_error = None
 
-    if new_route_id_raw and new_dep_date and new_dep_time:
-        try:
-            new_route_id = int(new_route_id_raw)
-            dep_dt = datetime.strptime(f"{new_dep_date} {new_dep_time}", "%Y-%m-%d %H:%M")
-        except Exception:
-            precheck_error = "Invalid route/date/time for pre-check."
+    if precheck_error:
+        candidate_aircrafts = []
+        candidate_pilots = []
+        candidate_attendants = []
+    elif precheck_args:
+        ok, info = data["candidates"]
+        if not ok:
+            precheck_error = info  # string message
             candidate_aircrafts = []
             candidate_pilots = []
             candidate_attendants = []
         else:
-            ok, info = admin_get_create_flight_candidates(new_route_id, dep_dt)
-            if not ok:
-                precheck_error = info  # string message
-                candidate_aircrafts = []
-                candidate_pilots = []
-                candidate_attendants = []
-            else:
-                candidate_aircrafts = info.get("aircrafts", [])
-                candidate_pilots = info.get("pilots", [])
-                candidate_attendants = info.get("attendants", [])
-                is_long = info.get("is_long")
+            candidate_aircrafts = info.get("aircrafts", [])
+            candidate_pilots = info.get("pilots", [])
+            candidate_attendants = info.get("attendants", [])
+            is_long = info.get("is_long")
 
-                # read crew rules safely (matches your updated helper)
-                req_pilots_small = info.get("crew_rule_small", {}).get("req_pilots")
-                req_atts_small = info.get("crew_rule_small", {}).get("req_atts")
-                req_pilots_large = info.get("crew_rule_large", {}).get("req_pilots")
-                req_atts_large = info.get("crew_rule_large", {}).get("req_atts")
+            # read crew rules safely (matches your updated helper)
+            req_pilots_small = info.get("crew_rule_small", {}).get("req_pilots")
+            req_atts_small = info.get("crew_rule_small", {}).get("req_atts")
+            req_pilots_large = info.get("crew_rule_large", {}).get("req_pilots")
+            req_atts_large = info.get("crew_rule_large", {}).get("req_atts")
 
     return render_template(
         "admin_dashboard.html",
@@ -529,6 +770,9 @@ def admin_dashboard():
 
         flights=flights,
         flight_status=flight_status,
+        flights_filter=flights_filter,
+        flights_after=flights_after,
+        flights_next=flights_next,
 
         reports_by_status=reports_by_status,
         revenue=revenue,
@@ -546,7 +790,8 @@ def admin_dashboard():
         is_long=is_long,
         precheck_error=precheck_error,
         flights_by_status=flights_by_status,
-        revenue_by_class=revenue_by_class
+        revenue_by_class=revenue_by_class,
+        load_errors=load_errors
 
     )
 
@@ -807,5 +1052,78 @@ def admin_cancel_flight_route():
     return redirect(url_for("admin_dashboard"))
 
 
+def _bulk_cancel_message(summary):
+    return (f"{summary['flights']} flight(s) canceled, {summary['orders']} order(s) system-canceled "
+            f"with full refund, {summary['refreshed']} other flight(s) re-checked.")
+
+
+@application.route("/admin/flights/bulk-cancel", methods=["POST"])
+def admin_bulk_cancel_route():
+    if not _is_admin():
+        return redirect(url_for("admin_login"))
+
+    flight_nums = (request.form.get("flight_nums") or "").replace(",", " ").split()
+    date_from = (request.form.get("date_from") or "").strip() or None
+    date_to = (request.form.get("date_to") or "").strip() or None
+    tail_num = (request.form.get("tail_num") or "").strip() or None
+    route_raw = (request.form.get("route_id") or "").strip()
+    try:
+        route_id = int(route_raw) if route_raw else None
+    except ValueError:
+        flash("RouteID must be a number.", "error")
+        return redirect(url_for("admin_dashboard"))
+
+    def progress(stage, done, total):
+        application.logger.info("bulk cancel %s: %s/%s", stage, done, total if total is not None else "?")
+
+    ok, result = admin_bulk_cancel_flights(flight_nums, date_from, date_to, route_id, tail_num, progress=progress)
+    flash(_bulk_cancel_message(result) if ok else result, "success" if ok else "error")
+    return redirect(url_for("admin_dashboard"))
+
+
+# ==========================================================
+# MAINTENANCE COMMANDS (flask --app main <command>)
+# ==========================================================
+@application.cli.command("rebuild-reports")
+def rebuild_reports_command():
+    """Recompute the dashboard report rollups from Orders/Tickets/Flights."""
+    rebuild_report_rollups()
+    print("Report rollups rebuilt.")
+
+
+@application.cli.command("bulk-cancel")
+@click.option("--flights", default="", help="Comma separated flight numbers.")
+@click.option("--date-from", default=None, help="First departure date (YYYY-MM-DD).")
+@click.option("--date-to", default=None, help="Last departure date (YYYY-MM-DD).")
+@click.option("--route-id", type=int, default=None)
+@click.option("--tail", default=None, help="Aircraft tail number.")
+def bulk_cancel_command(flights, date_from, date_to, route_id, tail):
+    """Cancel many flights and refund all their orders, in small transactions."""
+    def progress(stage, done, total):
+        print(f"  {stage}: {done}" + (f"/{total}" if total is not None else ""))
+
+    ok, result = admin_bulk_cancel_flights(flights.replace(",", " ").split(), date_from, date_to,
+                                           route_id, tail, progress=progress)
+    if not ok:
+        print(result)
+        raise SystemExit(1)
+    print(_bulk_cancel_message(result))
+
+
+@application.cli.command("db-migrate")
+def db_migrate_command():
+    """Bring the schema up to the latest version in migrations.py."""
+    import migrations
+    migrations.migrate()
+
+
+@application.cli.command("audit-queries")
+def audit_queries_command():
+    """EXPLAIN the app's SQL; exit code 1 if a large table is fully scanned or a statement fails."""
+    import migrations
+    if migrations.audit_queries():
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
     application.run(debug=True)
@@ -0,0 +1,284 @@
+"""
+Prometheus-style metrics shared by all worker processes.
+
+Each process keeps its numbers in memory and writes a snapshot to
+METRICS_DIR/<pid>-<start ms>.json (at most every METRICS_FLUSH_SECONDS; the start time
+keeps a new process that reuses a dead one's pid from overwriting its totals).
+/metrics merges the snapshots of every process:
+- counters and histograms are summed over all processes (dead ones included,
+  so totals never go backwards); the snapshots of dead processes are folded into
+  METRICS_DIR/_totals.json and deleted, so restarts don't pile up files
+- gauges are summed over processes that are still alive
+"""
+import json
+import os
+import tempfile
+import threading
+import time as _clock
+
+try:
+    import fcntl
+except ImportError:   # Windows: no cross-process lock, dead snapshots are just kept
+    fcntl = None
+
+METRICS_DIR = os.environ.get("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "flytau_metrics")
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", "1"))
+
+# request latency buckets (seconds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "flytau_http_requests_total": ("counter", "HTTP requests by endpoint, method and status."),
+    "flytau_http_request_duration_seconds": ("histogram", "HTTP request latency by endpoint."),
+    "flytau_bookings_total": ("counter", "Booking attempts by outcome (success, duplicate, conflict with stage precheck, insert or auto)."),
+    "flytau_db_pool_size": ("gauge", "Connections allowed per pool (summed over processes)."),
+    "flytau_db_pool_in_use": ("gauge", "Connections currently borrowed."),
+    "flytau_db_pool_idle": ("gauge", "Idle connections kept in the pools."),
+    "flytau_db_pool_acquired_total": ("counter", "Connections handed out by the pools."),
+    "flytau_db_pool_wait_seconds_total": ("counter", "Time spent waiting for a pool connection."),
+    "flytau_db_pool_timeouts_total": ("counter", "Acquires that gave up because the pool was exhausted."),
+    "flytau_cache_hits_total": ("counter", "In-process cache hits by cache."),
+    "flytau_cache_misses_total": ("counter", "In-process cache misses by cache."),
+    "flytau_cache_entries": ("gauge", "Entries currently held by each cache."),
+}
+
+_lock = threading.Lock()
+_counters = {}       # (name, labels) -> float
+_histograms = {}     # (name, labels) -> [bucket counts..., +Inf count, sum]
+_collectors = []     # callables -> [(kind, name, labels dict, value)]
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+_snapshot_name = (None, "")   # (pid, file name): a forked worker gets its own file
+
+
+def _key(name, labels):
+    return name + "|" + ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+
+
+def _split(key):
+    name, _, raw = key.partition("|")
+    labels = dict(part.split("=", 1) for part in raw.split(",") if part)
+    return name, labels
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+                break
+        else:
+            h[len(BUCKETS)] += 1
+        h[-1] += seconds
+
+
+def register_collector(func):
+    """func() -> [(kind, name, labels, value)] read at flush time; kind: 'counter' or 'gauge'."""
+    _collectors.append(func)
+    return func
+
+
+# ==========================================================
+# SNAPSHOTS (one file per process)
+# ==========================================================
+def _snapshot():
+    with _lock:
+        snap = {"counters": dict(_counters), "histograms": {k: list(v) for k, v in _histograms.items()}, "gauges": {}}
+    for collect in _collectors:
+        for kind, name, labels, value in collect():
+            target = snap["gauges"] if kind == "gauge" else snap["counters"]
+            target[_key(name, labels)] = value
+    return snap
+
+
+def _snapshot_path():
+    global _snapshot_name
+    pid = os.getpid()
+    if _snapshot_name[0] != pid:
+        _snapshot_name = (pid, f"{pid}-{int(_clock.time() * 1000)}.json")
+    return os.path.join(METRICS_DIR, _snapshot_name[1])
+
+
+def flush(force=False):
+    """Write this process' snapshot (throttled unless force; one writer at a time)."""
+    global _last_flush
+    if not _flush_lock.acquire(blocking=force):
+        return   # another thread is writing right now
+    try:
+        now = _clock.monotonic()
+        if not force and now - _last_flush < METRICS_FLUSH_SECONDS:
+            return
+        _last_flush = now
+
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        _write_json(_snapshot_path(), _snapshot())
+    finally:
+        _flush_lock.release()
+
+
+def _write_json(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp, path)   # readers never see half a file
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+_TOTALS = "_totals.json"   # counters + histograms of dead processes
+
+
+def _add(counters, histograms, snap):
+    for k, v in snap["counters"].items():
+        counters[k] = counters.get(k, 0) + v
+    for k, v in snap["histograms"].items():
+        h = histograms.setdefault(k, [0] * len(v))
+        for i, x in enumerate(v):
+            h[i] += x
+
+
+def _is_alive(fname):
+    pid = fname[:-5].partition("-")[0]
+    return pid.isdigit() and _alive(int(pid))
+
+
+def _fold_dead(names):
+    """
+    Add the snapshots of dead processes to _TOTALS and delete them (caller holds the lock).
+    _TOTALS lists the files of the last fold, so a fold that stopped before deleting them
+    doesn't count them twice.
+    """
+    dead = [n for n in names if not _is_alive(n)]
+    if not dead:
+        return
+    totals_path = os.path.join(METRICS_DIR, _TOTALS)
+    totals = _read_json(totals_path) or {"counters": {}, "histograms": {}, "folded": []}
+
+    folded = []
+    for fname in dead:
+        if fname not in totals["folded"]:
+            snap = _read_json(os.path.join(METRICS_DIR, fname))
+            if snap is None:
+                continue
+            _add(totals["counters"], totals["histograms"], snap)
+        folded.append(fname)
+    totals["folded"] = folded
+    _write_json(totals_path, totals)
+
+    for fname in folded:
+        try:
+            os.unlink(os.path.join(METRICS_DIR, fname))
+        except FileNotFoundError:
+            pass
+
+
+def _merged():
+    counters, histograms, gauges = {}, {}, {}
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        lock = open(os.path.join(METRICS_DIR, "_fold.lock"), "a")
+    except OSError:
+        return counters, histograms, gauges
+
+    with lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)   # one process folds/reads at a time (released on close)
+        names = [n for n in os.listdir(METRICS_DIR) if n.endswith(".json") and n != _TOTALS]
+        if fcntl is not None:
+            _fold_dead(names)
+            names = [n for n in names if os.path.exists(os.path.join(METRICS_DIR, n))]
+
+        totals = _read_json(os.path.join(METRICS_DIR, _TOTALS))
+        if totals is not None:
+            _add(counters, histograms, totals)
+        for fname in names:
+            snap = _read_json(os.path.join(METRICS_DIR, fname))
+            if snap is None:
+                continue
+            _add(counters, histograms, snap)
+            if _is_alive(fname):
+                for k, v in snap["gauges"].items():
+                    gauges[k] = gauges.get(k, 0) + v
+    return counters, histograms, gauges
+
+
+# ==========================================================
+# TEXT EXPOSITION FORMAT
+# ==========================================================
+def _labels_text(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in sorted(labels.items()):
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _number(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def render():
+    """All processes' metrics in Prometheus text format."""
+    flush(force=True)
+    counters, histograms, gauges = _merged()
+
+    series = {}   # name -> lines
+    for source in (counters, gauges):
+        for key, value in source.items():
+            name, labels = _split(key)
+            series.setdefault(name, []).append(f"{name}{_labels_text(labels)} {_number(value)}")
+
+    for key, h in histograms.items():
+        name, labels = _split(key)
+        lines = series.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(BUCKETS, h):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels_text(dict(labels, le=repr(bound)))} {cumulative}")
+        cumulative += h[len(BUCKETS)]
+        lines.append(f"{name}_bucket{_labels_text(dict(labels, le='+Inf'))} {cumulative}")
+        lines.append(f"{name}_sum{_labels_text(labels)} {_number(float(h[-1]))}")
+        lines.append(f"{name}_count{_labels_text(labels)} {cumulative}")
+
+    out = []
+    for name in sorted(series):
+        kind, text = HELP.get(name, ("untyped", name))
+        out.append(f"# HELP {name} {text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(sorted(series[name]))
+    return "\n".join(out) + "\n"
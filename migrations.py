@@ -0,0 +1,457 @@
+"""
+Schema migrations + query plan audit.
+
+  flask --app main db-migrate       apply pending schema versions
+  flask --app main audit-queries    EXPLAIN every SQL statement in utils.py
+
+A fresh database built from sqlp.sql is already at the latest version
+(sqlp.sql fills SchemaVersion), so db-migrate is only needed for databases
+created from an older sqlp.sql.
+"""
+import ast
+import os
+import re
+from datetime import date, time
+
+import utils
+from utils import db_cur, db_tx
+
+
+# ==========================================================
+# MIGRATIONS
+# ==========================================================
+def _table_exists(cursor, table):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return cursor.fetchone() is not None
+
+
+def _column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+
+def _ensure_index(cursor, table, name, columns, unique=False):
+    """
+    Create the index unless some index already starts with exactly these columns
+    (e.g. the one InnoDB made for a FOREIGN KEY). MySQL has no CREATE INDEX IF NOT EXISTS.
+    """
+    cursor.execute("""
+        SELECT INDEX_NAME, COLUMN_NAME, NON_UNIQUE
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    """, (table,))
+    existing = {}
+    for r in cursor.fetchall():
+        cols, non_unique = existing.get(r["INDEX_NAME"], ([], r["NON_UNIQUE"]))
+        cols.append(r["COLUMN_NAME"])
+        existing[r["INDEX_NAME"]] = (cols, non_unique)
+
+    for cols, non_unique in existing.values():
+        if cols[:len(columns)] == list(columns) and (not unique or (int(non_unique) == 0 and len(cols) == len(columns))):
+            return False
+
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    cursor.execute(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})")
+    return True
+
+
+def _m1_seat_counters(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS FlightSeatCounters (
+            FlightNum VARCHAR(20),
+            ClassType ENUM('Economy', 'Business'),
+            Capacity INT NOT NULL,
+            Sold INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (FlightNum, ClassType),
+            FOREIGN KEY (FlightNum) REFERENCES Flights(FlightNum) ON DELETE CASCADE
+        )
+    """)
+    utils.rebuild_seat_counters()
+
+
+def _m2_report_rollups(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ReportOrderStatus (
+            OrderStatus ENUM('Paid', 'Active', 'CustCancelled', 'SysCancelled') PRIMARY KEY,
+            Cnt INT NOT NULL DEFAULT 0,
+            TotalPrice DECIMAL(14, 2) NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ReportDailyOrders (
+            Day DATE,
+            OrderStatus ENUM('Paid', 'Active', 'CustCancelled', 'SysCancelled'),
+            Cnt INT NOT NULL DEFAULT 0,
+            TotalPrice DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (Day, OrderStatus)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ReportClassRevenue (
+            ClassType ENUM('Economy', 'Business') PRIMARY KEY,
+            Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ReportFlightStatus (
+            StatusF ENUM('Active', 'Full', 'Arrived', 'Canceled') PRIMARY KEY,
+            Cnt INT NOT NULL DEFAULT 0
+        )
+    """)
+    utils.rebuild_report_rollups()
+
+
+def _m3_hot_path_indexes(cursor):
+    # search / status reports / keyset paging / per-aircraft + per-route timelines
+    _ensure_index(cursor, "Flights", "idx_flights_status_date", ["StatusF", "DepartureDate"])
+    _ensure_index(cursor, "Flights", "idx_flights_dep", ["DepartureDate", "DepartureTime", "FlightNum"])
+    _ensure_index(cursor, "Flights", "idx_flights_route_date", ["RouteID", "DepartureDate"])
+    _ensure_index(cursor, "Flights", "idx_flights_tail_date", ["TailNum", "DepartureDate"])
+    # order history + guest lookups
+    _ensure_index(cursor, "Orders", "idx_orders_reg_date", ["RegisteredEmail", "OrderDate"])
+    _ensure_index(cursor, "Orders", "idx_orders_guest", ["GuestEmail"])
+    # tickets by order (cancel paths) and by flight/class (seat maps, counters)
+    _ensure_index(cursor, "Tickets", "idx_tickets_order", ["OrderID"])
+    _ensure_index(cursor, "Tickets", "idx_tickets_flight_class", ["FlightNum", "ClassType"])
+
+
+def _m4_sessions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Sessions (
+            SessionID VARCHAR(64) PRIMARY KEY,
+            Data MEDIUMBLOB NOT NULL,
+            ExpiresAt DATETIME NOT NULL,
+            INDEX idx_sessions_expires (ExpiresAt)
+        )
+    """)
+
+
+
+def _m5_data_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS DataVersions (
+            Name VARCHAR(50) PRIMARY KEY,
+            Version BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("INSERT IGNORE INTO DataVersions (Name, Version) VALUES ('reference', 1)")
+
+
+
+def _m6_change_log(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS DataChangeLog (
+            ChangeID BIGINT AUTO_INCREMENT PRIMARY KEY,
+            Namespace VARCHAR(20) NOT NULL,
+            ItemKey VARCHAR(200) NOT NULL DEFAULT '',
+            ChangedAt DATETIME NOT NULL,
+            INDEX idx_changelog_time (ChangedAt)
+        )
+    """)
+
+
+def _m7_seat_holds(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SeatHolds (
+            FlightNum VARCHAR(20) NOT NULL,
+            SeatRow INT NOT NULL,
+            SeatCol VARCHAR(5) NOT NULL,
+            ClassType ENUM('Economy', 'Business') NOT NULL,
+            HoldToken VARCHAR(64) NOT NULL,
+            ExpiresAt DATETIME NOT NULL,
+            PRIMARY KEY (FlightNum, SeatRow, SeatCol),
+            FOREIGN KEY (FlightNum) REFERENCES Flights(FlightNum) ON DELETE CASCADE,
+            INDEX idx_seatholds_token (HoldToken, FlightNum),
+            INDEX idx_seatholds_expires (ExpiresAt)
+        )
+    """)
+
+
+def _m8_order_request_key(cursor):
+    if not _column_exists(cursor, "Orders", "RequestKey"):
+        cursor.execute("ALTER TABLE Orders ADD COLUMN RequestKey VARCHAR(64) NULL")
+    _ensure_index(cursor, "Orders", "uq_orders_request_key", ("RequestKey",), unique=True)
+
+
+def _m9_report_shards(cursor):
+    # one row per (key, Shard): bookings add to a random shard, readers SUM the shards
+    for table, key in (("ReportOrderStatus", "OrderStatus"), ("ReportDailyOrders", "Day, OrderStatus"),
+                       ("ReportClassRevenue", "ClassType"), ("ReportFlightStatus", "StatusF")):
+        if not _column_exists(cursor, table, "Shard"):
+            cursor.execute(f"""
+                ALTER TABLE {table}
+                    ADD COLUMN Shard TINYINT UNSIGNED NOT NULL DEFAULT 0,
+                    DROP PRIMARY KEY,
+                    ADD PRIMARY KEY ({key}, Shard)
+            """)
+
+
+# (version, description, function(cursor)) - append only, never renumber
+MIGRATIONS = [
+    (1, "FlightSeatCounters", _m1_seat_counters),
+    (2, "Report rollup tables", _m2_report_rollups),
+    (3, "Hot path secondary indexes", _m3_hot_path_indexes),
+    (4, "Sessions table", _m4_sessions),
+    (5, "DataVersions table", _m5_data_versions),
+    (6, "DataChangeLog table", _m6_change_log),
+    (7, "SeatHolds table", _m7_seat_holds),
+    (8, "Orders.RequestKey (idempotent bookings)", _m8_order_request_key),
+    (9, "Sharded report rollup rows", _m9_report_shards),
+]
+
+
+def _ensure_version_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaVersion (
+            Version INT PRIMARY KEY,
+            Description VARCHAR(200),
+            AppliedAt DATETIME
+        )
+    """)
+
+
+def current_version():
+    with db_cur() as cursor:
+        _ensure_version_table(cursor)
+        cursor.execute("SELECT COALESCE(MAX(Version), 0) AS V FROM SchemaVersion")
+        return int(cursor.fetchone()["V"])
+
+
+def migrate(log=print):
+    """Apply every migration above the current version, in order. Returns the new version."""
+    version = current_version()
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        log(f"Applying {number}: {description} ...")
+        # DDL commits implicitly in MySQL, so each step must be safe to re-run
+        with db_cur() as cursor:
+            step(cursor)
+        with db_tx() as cursor:
+            cursor.execute(
+                "INSERT INTO SchemaVersion (Version, Description, AppliedAt) VALUES (%s,%s,NOW())",
+                (number, description)
+            )
+        version = number
+    log(f"Schema is at version {version}.")
+    return version
+
+
+# ==========================================================
+# QUERY PLAN AUDIT (EXPLAIN)
+# ==========================================================
+# a table counts as "large" from this many rows (estimate from information_schema)
+AUDIT_LARGE_TABLE_ROWS = int(os.environ.get("AUDIT_LARGE_TABLE_ROWS", "10000"))
+
+# functions that read whole tables on purpose (rebuilds, full timelines)
+AUDIT_ALLOW_SCANS = {
+    "rebuild_seat_counters",
+    "_seat_counters_rebuild_cur",
+    "rebuild_report_rollups",
+    "load_crew_timelines",
+    "admin_find_available_crew",
+}
+
+# builders that assemble SQL at runtime: (function, args, kwargs)
+AUDIT_CALLS = [
+    ("search_flights", ("{DepartureDate}", "{SourceAirport}", "{DestAirport}"), {}),
+    ("search_flights", ("{DepartureDate}", "{SourceAirport}", "{DestAirport}"), {"with_availability": True}),
+    ("admin_search_flights", ("{DepartureDate}", "{SourceAirport}", "{DestAirport}", "Active"), {}),
+    ("admin_list_flights", (), {"status": "Active", "route_id": "{RouteID}", "after": "{FlightsCursor}"}),
+    ("get_registered_orders", ("{Email}", "Active"), {}),
+]
+
+_SQL_START = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT|REPLACE|WITH)\b", re.I)
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|SET\b|JOIN\b|LEFT\b|INNER\b|GROUP\b|ORDER\b|LIMIT\b|VALUES\b)(\w+))?", re.I)
+_PARAM_COLUMN = re.compile(r"(\w+)\s*(?:=|<>|<=|>=|<|>|\bIN\s*\()\s*(?:%s\s*,\s*)*$", re.I)
+
+
+def _load_samples():
+    """Representative parameter values taken from the data itself."""
+    samples = {
+        "ClassType": "Economy",
+        "StatusF": "Active",
+        "OrderStatus": "Active",
+        "DepartureDate": date.today(),
+        "DepartureTime": time(12, 0),
+        "OrderDate": date.today(),
+        "ExpiresAt": date.today(),
+    }
+    lookups = {
+        "FlightNum": "SELECT FlightNum FROM Flights ORDER BY DepartureDate DESC LIMIT 1",
+        "TailNum": "SELECT TailNum FROM Aircrafts LIMIT 1",
+        "RouteID": "SELECT RouteID FROM Routes LIMIT 1",
+        "SourceAirport": "SELECT SourceAirport FROM Routes LIMIT 1",
+        "DestAirport": "SELECT DestAirport FROM Routes LIMIT 1",
+        "OrderID": "SELECT MAX(OrderID) FROM Orders",
+        "Email": "SELECT Email FROM RegisteredCustomers LIMIT 1",
+        "GuestEmail": "SELECT Email FROM GuestCustomers LIMIT 1",
+        "PilotID": "SELECT EmployeeID FROM Pilots LIMIT 1",
+        "AttendantID": "SELECT EmployeeID FROM FlightAttendants LIMIT 1",
+        "EmployeeID": "SELECT EmployeeID FROM Pilots LIMIT 1",
+    }
+    with db_cur() as cursor:
+        for key, sql in lookups.items():
+            cursor.execute(sql)
+            row = cursor.fetchone()
+            samples[key] = list(row.values())[0] if row else None
+    samples["RegisteredEmail"] = samples["Email"]
+    samples["FlightsCursor"] = f"{date.today().isoformat()}|23:59:59|{samples['FlightNum']}"
+    return samples
+
+
+def _guess_params(sql, samples):
+    # one value per %s, chosen by the column it is compared with
+    params = []
+    for m in re.finditer(r"%s", sql):
+        col = _PARAM_COLUMN.search(sql[:m.start()])
+        name = col.group(1) if col else None
+        params.append(samples.get(name, 1) if name else 1)
+    return tuple(params)
+
+
+def collect_utils_sql(path=None):
+    """
+    Literal SQL passed to cursor.execute/executemany in utils.py -> [(function, sql or None)].
+    f-strings are kept only when their holes are IN-list placeholders; anything else is None (dynamic).
+    """
+    path = path or utils.__file__.replace(".pyc", ".py")
+    with open(path, encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+
+    found = []
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.FunctionDef):
+            continue
+        for node in ast.walk(func):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in ("execute", "executemany") and node.args):
+                continue
+            arg = node.args[0]
+            sql = None
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                sql = arg.value
+            elif isinstance(arg, ast.JoinedStr):
+                parts = []
+                for v in arg.values:
+                    if isinstance(v, ast.Constant):
+                        parts.append(v.value)
+                    elif isinstance(v.value, ast.Name) and v.value.id == "placeholders":
+                        parts.append("%s")
+                    else:
+                        parts = None
+                        break
+                sql = "".join(parts) if parts is not None else None
+            found.append((func.name, sql))
+    return found
+
+
+def _capture_calls(samples):
+    """Run the SQL builders against a recording cursor and collect what they would execute."""
+    captured = []
+
+    class _Recorder:
+        rowcount = 0
+        lastrowid = None
+
+        def execute(self, sql, params=()):
+            captured.append((self.func_name, sql, tuple(params)))
+
+        def executemany(self, sql, seq):
+            pass
+
+        def fetchall(self):
+            return []
+
+        def fetchone(self):
+            return None
+
+    from contextlib import contextmanager
+
+    @contextmanager
+    def recording_cur():
+        yield recorder
+
+    recorder = _Recorder()
+
+    def fill(v):
+        if isinstance(v, str) and v.startswith("{") and v.endswith("}"):
+            return samples.get(v[1:-1])
+        return v
+
+    real = utils.db_cur
+    utils.db_cur = recording_cur
+    try:
+        for name, args, kwargs in AUDIT_CALLS:
+            recorder.func_name = name
+            getattr(utils, name)(*[fill(a) for a in args], **{k: fill(v) for k, v in kwargs.items()})
+    finally:
+        utils.db_cur = real
+    return captured
+
+
+def _large_tables(cursor):
+    cursor.execute("""
+        SELECT TABLE_NAME, TABLE_ROWS
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE()
+    """)
+    return {r["TABLE_NAME"].lower() for r in cursor.fetchall() if int(r["TABLE_ROWS"] or 0) >= AUDIT_LARGE_TABLE_ROWS}
+
+
+def audit_queries(log=print):
+    """
+    EXPLAIN every statement (literal SQL from utils.py + AUDIT_CALLS builders).
+    Fails on a full scan (type=ALL) of a large table outside AUDIT_ALLOW_SCANS, and on a
+    statement EXPLAIN rejects (table None).
+    Returns: list of failures [(function, table, sql)]
+    """
+    samples = _load_samples()
+
+    statements = []
+    skipped = 0
+    for func, sql in collect_utils_sql():
+        if sql is None:
+            skipped += 1
+        elif _SQL_START.match(sql):
+            statements.append((func, sql, _guess_params(sql, samples)))
+    statements.extend(_capture_calls(samples))
+
+    failures = []
+    with db_cur() as cursor:
+        large = _large_tables(cursor)
+        for func, sql, params in statements:
+            aliases = {}
+            for m in _TABLE_REF.finditer(sql):
+                aliases[(m.group(2) or m.group(1)).lower()] = m.group(1).lower()
+                aliases[m.group(1).lower()] = m.group(1).lower()
+
+            try:
+                cursor.execute("EXPLAIN " + sql, params)
+                plan = cursor.fetchall()
+            except Exception as e:
+                failures.append((func, None, " ".join(sql.split())))
+                log(f"[ERROR] {func}: {e}")
+                continue
+
+            scans = [
+                aliases.get((row.get("table") or "").lower(), (row.get("table") or "").lower())
+                for row in plan if row.get("type") == "ALL"
+            ]
+            bad = [t for t in scans if t in large and func not in AUDIT_ALLOW_SCANS]
+            if bad:
+                for t in bad:
+                    failures.append((func, t, " ".join(sql.split())))
+                    log(f"[SCAN]  {func}: full scan on {t}")
+            else:
+                log(f"[OK]    {func}")
+
+    log(f"{len(statements)} statement(s) explained, {skipped} dynamic skipped, {len(failures)} problem(s).")
+    return failures
@@ -0,0 +1,429 @@
+"""
+Server-side sessions: in-process LRU in front of a shared store.
+
+  SESSION_BACKEND = sqlite (default) | mysql | redis | memory | filesystem (old Flask-Session)
+
+- the cookie only carries a random session id, the data stays on the server
+- data is pickled (zlib-compressed when large) into one blob per session
+- nothing is written when the session did not change; the expiry is pushed
+  forward at most every SESSION_TOUCH_SECONDS (a cheap touch, not a rewrite)
+- empty sessions are never stored (anonymous browsing costs no writes)
+- the cookie is "<sid>.<version>"; the version changes with every write, and the
+  LRU front only answers for the version the browser sent, so a copy cached by
+  one worker never hides a newer write made by another
+- expired rows are deleted in batches by a background sweep every SESSION_SWEEP_SECONDS
+"""
+import pickle
+import secrets
+import sqlite3
+import threading
+import time as _clock
+import zlib
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+# ==========================================================
+# SERIALIZATION
+# ==========================================================
+_COMPRESS_FROM = 512   # bytes
+
+
+def dumps(data):
+    raw = pickle.dumps(dict(data), protocol=pickle.HIGHEST_PROTOCOL)
+    if len(raw) >= _COMPRESS_FROM:
+        return b"z" + zlib.compress(raw)
+    return b"p" + raw
+
+
+def loads(blob):
+    blob = bytes(blob)
+    raw = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    return pickle.loads(raw)
+
+
+# ==========================================================
+# BACKENDS: get(sid) -> (blob, expires_at) | None, set, touch, delete, sweep
+# (expires_at = unix time)
+# ==========================================================
+class MemoryBackend:
+    """Single process only (development)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            item = self._data.get(sid)
+        if item is None or item[1] <= _clock.time():
+            return None
+        return item
+
+    def set(self, sid, blob, expires_at):
+        with self._lock:
+            self._data[sid] = (blob, expires_at)
+
+    def touch(self, sid, expires_at):
+        with self._lock:
+            if sid in self._data:
+                self._data[sid] = (self._data[sid][0], expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def sweep(self, batch):
+        now = _clock.time()
+        with self._lock:
+            dead = [sid for sid, (_, exp) in self._data.items() if exp <= now]
+            for sid in dead:
+                del self._data[sid]
+        return len(dead)
+
+
+class SQLiteBackend:
+    """One SQLite file shared by all workers on the host (WAL mode, one connection per thread)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    sid TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    expires REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._conn().execute(
+            "SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?", (sid, _clock.time())
+        ).fetchone()
+        return row
+
+    def set(self, sid, blob, expires_at):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+            (sid, sqlite3.Binary(blob), expires_at)
+        )
+
+    def touch(self, sid, expires_at):
+        self._conn().execute("UPDATE sessions SET expires = ? WHERE sid = ?", (expires_at, sid))
+
+    def delete(self, sid):
+        self._conn().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def sweep(self, batch):
+        total = 0
+        while True:
+            cur = self._conn().execute("""
+                DELETE FROM sessions WHERE rowid IN (
+                    SELECT rowid FROM sessions WHERE expires <= ? LIMIT ?
+                )
+            """, (_clock.time(), batch))
+            total += cur.rowcount
+            if cur.rowcount < batch:
+                return total
+
+
+class MySQLBackend:
+    """Sessions table in the app database (shared by every host)."""
+
+    def get(self, sid):
+        from utils import db_cur
+        with db_cur() as cursor:
+            cursor.execute("""
+                SELECT Data, UNIX_TIMESTAMP(ExpiresAt) AS Expires
+                FROM Sessions
+                WHERE SessionID = %s AND ExpiresAt > NOW()
+            """, (sid,))
+            row = cursor.fetchone()
+        return (row["Data"], float(row["Expires"])) if row else None
+
+    def set(self, sid, blob, expires_at):
+        from utils import db_cur
+        with db_cur() as cursor:
+            cursor.execute("""
+                INSERT INTO Sessions (SessionID, Data, ExpiresAt)
+                VALUES (%s, %s, FROM_UNIXTIME(%s))
+                ON DUPLICATE KEY UPDATE Data = VALUES(Data), ExpiresAt = VALUES(ExpiresAt)
+            """, (sid, blob, expires_at))
+
+    def touch(self, sid, expires_at):
+        from utils import db_cur
+        with db_cur() as cursor:
+            cursor.execute("UPDATE Sessions SET ExpiresAt = FROM_UNIXTIME(%s) WHERE SessionID = %s", (expires_at, sid))
+
+    def delete(self, sid):
+        from utils import db_cur
+        with db_cur() as cursor:
+            cursor.execute("DELETE FROM Sessions WHERE SessionID = %s", (sid,))
+
+    def sweep(self, batch):
+        from utils import db_cur
+        total = 0
+        while True:
+            with db_cur() as cursor:
+                cursor.execute("DELETE FROM Sessions WHERE ExpiresAt <= NOW() LIMIT %s", (batch,))
+                deleted = cursor.rowcount
+            total += deleted
+            if deleted < batch:
+                return total
+
+
+class RedisBackend:
+    """Any Redis-compatible server; expiry is Redis' own TTL (sweep is a no-op)."""
+
+    def __init__(self, url, prefix="flytau:session:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSION_BACKEND=redis needs the 'redis' package (pip install redis).")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, sid):
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + sid)
+        pipe.pttl(self.prefix + sid)
+        blob, pttl = pipe.execute()
+        if blob is None or pttl is None or pttl < 0:
+            return None
+        return blob, _clock.time() + pttl / 1000.0
+
+    def set(self, sid, blob, expires_at):
+        self.client.set(self.prefix + sid, blob, px=max(1, int((expires_at - _clock.time()) * 1000)))
+
+    def touch(self, sid, expires_at):
+        self.client.pexpire(self.prefix + sid, max(1, int((expires_at - _clock.time()) * 1000)))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+    def sweep(self, batch):
+        return 0
+
+
+# ==========================================================
+# LRU FRONT
+# ==========================================================
+class _LRU:
+    """Recently used sessions of this process: sid -> (blob, expires_at, cached_at, version)."""
+
+    def __init__(self, size, max_age):
+        self.size = size
+        self.max_age = max_age
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sid, version):
+        if self.size <= 0 or self.max_age <= 0:
+            return None
+        now = _clock.time()
+        with self._lock:
+            item = self._items.get(sid)
+            if item is not None and item[3] == version and item[1] > now and now - item[2] < self.max_age:
+                self._items.move_to_end(sid)
+                self.hits += 1
+                return item[0], item[1]
+            self._items.pop(sid, None)
+            self.misses += 1
+        return None
+
+    def put(self, sid, blob, expires_at, version):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._items[sid] = (blob, expires_at, _clock.time(), version)
+            self._items.move_to_end(sid)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def drop(self, sid):
+        with self._lock:
+            self._items.pop(sid, None)
+
+    def __len__(self):
+        return len(self._items)
+
+
+# ==========================================================
+# FLASK SESSION INTERFACE
+# ==========================================================
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False, blob=None, expires_at=0.0,
+                 version="", permanent=True):
+        def on_update(self):
+            self.modified = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.blob = blob              # what the store holds (None = nothing stored yet)
+        self.expires_at = expires_at
+        self.version = version        # changes with every write (second part of the cookie)
+        self._is_permanent = permanent
+
+    # SessionMixin keeps this flag as a "_permanent" key, which would make every new session
+    # non-empty (and stored); here it is an attribute, set by the interface on every request
+    @property
+    def permanent(self):
+        return self._is_permanent
+
+    @permanent.setter
+    def permanent(self, value):
+        self._is_permanent = bool(value)
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, backend, lifetime, lru_size=10000, lru_seconds=2.0,
+                 touch_seconds=60.0, sweep_seconds=300.0, sweep_batch=1000, permanent=True):
+        self.backend = backend
+        self.lifetime = lifetime                  # seconds
+        self.front = _LRU(lru_size, lru_seconds)
+        self.touch_seconds = touch_seconds
+        self.sweep_seconds = sweep_seconds
+        self.sweep_batch = sweep_batch
+        self.permanent = permanent
+
+        self._next_sweep = _clock.time() + sweep_seconds
+        self._sweeping = threading.Lock()
+
+    # ---------- load ----------
+    def _fetch(self, sid, version):
+        item = self.front.get(sid, version)
+        if item is None:
+            item = self.backend.get(sid)
+            if item is not None:
+                self.front.put(sid, bytes(item[0]), item[1], version)
+        return item
+
+    def open_session(self, app, request):
+        sid, _, version = (request.cookies.get(self.get_cookie_name(app)) or "").partition(".")
+        if sid:
+            item = self._fetch(sid, version)
+            if item is not None:
+                blob, expires_at = bytes(item[0]), item[1]
+                try:
+                    data = loads(blob)
+                    data.pop("_permanent", None)   # written by older versions of this module
+                    return ServerSession(data, sid=sid, blob=blob, expires_at=expires_at,
+                                         version=version, permanent=self.permanent)
+                except Exception:
+                    pass   # unreadable blob -> start over
+
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True, permanent=self.permanent)
+
+    # ---------- save ----------
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            # emptied (logout) -> forget it; never stored -> nothing to do
+            if session.blob is not None:
+                self.backend.delete(session.sid)
+                self.front.drop(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            self._maybe_sweep()
+            return
+
+        now = _clock.time()
+        expires_at = now + self.lifetime
+        blob = dumps(session)
+
+        if blob != session.blob:
+            session.version = secrets.token_hex(4)
+            self.backend.set(session.sid, blob, expires_at)
+            self.front.put(session.sid, blob, expires_at, session.version)
+        elif expires_at - session.expires_at >= self.touch_seconds:
+            self.backend.touch(session.sid, expires_at)
+            self.front.put(session.sid, blob, expires_at, session.version)
+        else:
+            # unchanged and recently touched: no write, cookie already good
+            self._maybe_sweep()
+            return
+
+        response.set_cookie(
+            name,
+            f"{session.sid}.{session.version}",
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        self._maybe_sweep()
+
+    # ---------- expiry ----------
+    def _maybe_sweep(self):
+        if _clock.time() < self._next_sweep or not self._sweeping.acquire(blocking=False):
+            return
+        self._next_sweep = _clock.time() + self.sweep_seconds
+
+        def run():
+            try:
+                self.backend.sweep(self.sweep_batch)
+            except Exception:
+                pass   # next sweep will try again
+            finally:
+                self._sweeping.release()
+
+        threading.Thread(target=run, name="session-sweep", daemon=True).start()
+
+
+def init_app(app):
+    """
+    Install the session interface chosen by app.config["SESSION_BACKEND"].
+    Returns the interface (None for the filesystem backend, which is Flask-Session's).
+    """
+    cfg = app.config
+    backend_name = cfg.get("SESSION_BACKEND", "sqlite")
+
+    if backend_name == "filesystem":
+        from flask_session import Session
+        cfg["SESSION_TYPE"] = "filesystem"
+        Session(app)
+        return None
+
+    if backend_name == "sqlite":
+        backend = SQLiteBackend(cfg["SESSION_SQLITE_PATH"])
+    elif backend_name == "mysql":
+        backend = MySQLBackend()
+    elif backend_name == "redis":
+        backend = RedisBackend(cfg.get("SESSION_REDIS_URL", "redis://localhost:6379/0"))
+    elif backend_name == "memory":
+        backend = MemoryBackend()
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend_name}")
+
+    interface = ServerSessionInterface(
+        backend,
+        lifetime=int(app.permanent_session_lifetime.total_seconds()),
+        lru_size=int(cfg.get("SESSION_LRU_SIZE", 10000)),
+        lru_seconds=float(cfg.get("SESSION_LRU_SECONDS", 2)),
+        touch_seconds=float(cfg.get("SESSION_TOUCH_SECONDS", 60)),
+        sweep_seconds=float(cfg.get("SESSION_SWEEP_SECONDS", 300)),
+        permanent=bool(cfg.get("SESSION_PERMANENT", True)),
+    )
+    app.session_interface = interface
+    return interface
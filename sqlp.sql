@@ -117,7 +117,12 @@ CREATE TABLE Flights (
     StatusF ENUM('Active', 'Full', 'Arrived', 'Canceled'),
 
     FOREIGN KEY (RouteID) REFERENCES Routes(RouteID),
-    FOREIGN KEY (TailNum) REFERENCES Aircrafts(TailNum)
+    FOREIGN KEY (TailNum) REFERENCES Aircrafts(TailNum),
+
+    INDEX idx_flights_status_date (StatusF, DepartureDate),
+    INDEX idx_flights_dep (DepartureDate, DepartureTime, FlightNum),
+    INDEX idx_flights_route_date (RouteID, DepartureDate),
+    INDEX idx_flights_tail_date (TailNum, DepartureDate)
 );
 
 CREATE TABLE FlightPricing (
@@ -166,10 +171,17 @@ CREATE TABLE Orders (
     TotalPrice DECIMAL(10, 2) DEFAULT 0,
     OrderStatus ENUM('Paid', 'Active', 'CustCancelled', 'SysCancelled') ,
 
+    -- idempotency key of the booking form that created the order (repeated POSTs reuse it)
+    RequestKey VARCHAR(64) NULL,
+
     -- Foreign Keys ensure the email actually exists in the specific table
     FOREIGN KEY (GuestEmail) REFERENCES GuestCustomers(Email) ON DELETE CASCADE,
     FOREIGN KEY (RegisteredEmail) REFERENCES RegisteredCustomers(Email) ON DELETE CASCADE,
-    CHECK ((GuestEmail IS NOT NULL AND RegisteredEmail IS NULL) OR (GuestEmail IS NULL AND RegisteredEmail IS NOT NULL))
+    CHECK ((GuestEmail IS NOT NULL AND RegisteredEmail IS NULL) OR (GuestEmail IS NULL AND RegisteredEmail IS NOT NULL)),
+
+    INDEX idx_orders_reg_date (RegisteredEmail, OrderDate),
+    INDEX idx_orders_guest (GuestEmail),
+    UNIQUE INDEX uq_orders_request_key (RequestKey)
 );
 
 CREATE TABLE Tickets (
@@ -183,7 +195,119 @@ CREATE TABLE Tickets (
 
     FOREIGN KEY (OrderID) REFERENCES Orders(OrderID) ON DELETE CASCADE,
     FOREIGN KEY (FlightNum) REFERENCES Flights(FlightNum),
-    UNIQUE (FlightNum, SeatRow, SeatCol)
+    UNIQUE (FlightNum, SeatRow, SeatCol),
+
+    INDEX idx_tickets_order (OrderID),
+    INDEX idx_tickets_flight_class (FlightNum, ClassType)
+);
+
+-- ==========================================
+-- 7. DERIVED COUNTERS (kept up to date by utils.py)
+-- ==========================================
+
+-- seats per flight/class: Capacity from AircraftLayout, Sold = tickets of not-cancelled orders
+CREATE TABLE FlightSeatCounters (
+    FlightNum VARCHAR(20),
+    ClassType ENUM('Economy', 'Business'),
+    Capacity INT NOT NULL,
+    Sold INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (FlightNum, ClassType),
+    FOREIGN KEY (FlightNum) REFERENCES Flights(FlightNum) ON DELETE CASCADE
+);
+
+-- report rollups (dashboard reads these instead of scanning Orders/Tickets/Flights)
+-- each key is split over several Shard rows (summed when read) so bookings don't queue on one row
+CREATE TABLE ReportOrderStatus (
+    OrderStatus ENUM('Paid', 'Active', 'CustCancelled', 'SysCancelled'),
+    Shard TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    Cnt INT NOT NULL DEFAULT 0,
+    TotalPrice DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (OrderStatus, Shard)
+);
+
+CREATE TABLE ReportDailyOrders (
+    Day DATE,
+    OrderStatus ENUM('Paid', 'Active', 'CustCancelled', 'SysCancelled'),
+    Shard TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    Cnt INT NOT NULL DEFAULT 0,
+    TotalPrice DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (Day, OrderStatus, Shard)
+);
+
+CREATE TABLE ReportClassRevenue (
+    ClassType ENUM('Economy', 'Business'),
+    Shard TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (ClassType, Shard)
+);
+
+CREATE TABLE ReportFlightStatus (
+    StatusF ENUM('Active', 'Full', 'Arrived', 'Canceled'),
+    Shard TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    Cnt INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (StatusF, Shard)
+);
+
+-- ==========================================
+-- 8. WEB SESSIONS (only used with SESSION_BACKEND=mysql)
+-- ==========================================
+
+CREATE TABLE Sessions (
+    SessionID VARCHAR(64) PRIMARY KEY,
+    Data MEDIUMBLOB NOT NULL,
+    ExpiresAt DATETIME NOT NULL,
+
+    INDEX idx_sessions_expires (ExpiresAt)
+);
+
+-- ==========================================
+-- 9. DATA VERSIONS (bumped by writes, polled by every worker)
+-- ==========================================
+
+-- 'reference' = Routes / Aircrafts / AircraftLayout (in-memory snapshot in utils.py)
+CREATE TABLE DataVersions (
+    Name VARCHAR(50) PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 0
+);
+
+-- append-only change log: every worker polls it and drops the cache entries named here
+CREATE TABLE DataChangeLog (
+    ChangeID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    Namespace VARCHAR(20) NOT NULL,
+    ItemKey VARCHAR(200) NOT NULL DEFAULT '',
+    ChangedAt DATETIME NOT NULL,
+
+    INDEX idx_changelog_time (ChangedAt)
+);
+
+-- ==========================================
+-- 10. SEAT HOLDS
+-- ==========================================
+
+-- seats reserved for one visitor while they book; rows past ExpiresAt count as free
+CREATE TABLE SeatHolds (
+    FlightNum VARCHAR(20) NOT NULL,
+    SeatRow INT NOT NULL,
+    SeatCol VARCHAR(5) NOT NULL,
+    ClassType ENUM('Economy', 'Business') NOT NULL,
+    HoldToken VARCHAR(64) NOT NULL,
+    ExpiresAt DATETIME NOT NULL,
+
+    PRIMARY KEY (FlightNum, SeatRow, SeatCol),
+    FOREIGN KEY (FlightNum) REFERENCES Flights(FlightNum) ON DELETE CASCADE,
+    INDEX idx_seatholds_token (HoldToken, FlightNum),
+    INDEX idx_seatholds_expires (ExpiresAt)
+);
+
+-- ==========================================
+-- 11. SCHEMA VERSION (see migrations.py)
+-- ==========================================
+
+CREATE TABLE SchemaVersion (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200),
+    AppliedAt DATETIME
 );
 
 #DATA
@@ -335,7 +459,7 @@ INSERT INTO CrewAttendants VALUES
 -- =====================================================
 -- 10. ORDERS
 -- =====================================================
-INSERT INTO Orders VALUES
+INSERT INTO Orders (OrderID, GuestEmail, RegisteredEmail, OrderDate, TotalPrice, OrderStatus) VALUES
 (1,'guest1@mail.com',NULL,NOW(),280,'Paid'),
 (2,NULL,'user1@mail.com',NOW(),3200,'Paid'),
 (3,'guest2@mail.com',NULL,NOW(),0,'SysCancelled'),
@@ -527,5 +651,61 @@ INSERT INTO CrewAttendants VALUES
 ('FL023',2009),('FL023',2010),('FL023',2011),('FL023',2012),('FL023',2001),('FL023',2002);
 
 
-
-
+-- =====================================================
+-- DERIVED DATA (run after all data above is loaded)
+-- =====================================================
+INSERT INTO FlightSeatCounters (FlightNum, ClassType, Capacity, Sold)
+SELECT fp.FlightNum, fp.ClassType, al.NumRows * al.NumCols,
+       (SELECT COUNT(*)
+        FROM Tickets t
+        JOIN Orders o ON t.OrderID = o.OrderID
+        WHERE t.FlightNum = fp.FlightNum
+          AND t.ClassType = fp.ClassType
+          AND o.OrderStatus NOT IN ('CustCancelled', 'SysCancelled'))
+FROM FlightPricing fp
+JOIN Flights f ON f.FlightNum = fp.FlightNum
+JOIN AircraftLayout al ON al.TailNum = f.TailNum AND al.ClassType = fp.ClassType
+ON DUPLICATE KEY UPDATE Capacity = VALUES(Capacity), Sold = VALUES(Sold);
+
+INSERT INTO ReportOrderStatus (OrderStatus, Cnt, TotalPrice)
+SELECT OrderStatus, COUNT(*), COALESCE(SUM(TotalPrice), 0)
+FROM Orders
+WHERE OrderStatus IS NOT NULL
+GROUP BY OrderStatus;
+
+INSERT INTO ReportDailyOrders (Day, OrderStatus, Cnt, TotalPrice)
+SELECT DATE(OrderDate), OrderStatus, COUNT(*), COALESCE(SUM(TotalPrice), 0)
+FROM Orders
+WHERE OrderStatus IS NOT NULL AND OrderDate IS NOT NULL
+GROUP BY DATE(OrderDate), OrderStatus;
+
+INSERT INTO ReportClassRevenue (ClassType, Revenue)
+SELECT x.ClassType, SUM(x.TotalPrice)
+FROM (
+    SELECT o.OrderID, o.TotalPrice, t.ClassType
+    FROM Orders o
+    JOIN Tickets t ON o.OrderID = t.OrderID
+    WHERE o.OrderStatus NOT IN ('CustCancelled', 'SysCancelled')
+    GROUP BY o.OrderID, o.TotalPrice, t.ClassType
+) AS x
+GROUP BY x.ClassType;
+
+INSERT INTO ReportFlightStatus (StatusF, Cnt)
+SELECT StatusF, COUNT(*)
+FROM Flights
+WHERE StatusF IS NOT NULL
+GROUP BY StatusF;
+
+-- this file already contains every migration in migrations.py
+INSERT INTO SchemaVersion (Version, Description, AppliedAt) VALUES
+(1, 'FlightSeatCounters', NOW()),
+(2, 'Report rollup tables', NOW()),
+(3, 'Hot path secondary indexes', NOW()),
+(4, 'Sessions table', NOW()),
+(5, 'DataVersions table', NOW()),
+(6, 'DataChangeLog table', NOW()),
+(7, 'SeatHolds table', NOW()),
+(8, 'Orders.RequestKey (idempotent bookings)', NOW()),
+(9, 'Sharded report rollup rows', NOW());
+
+INSERT INTO DataVersions (Name, Version) VALUES ('reference', 1);
@@ -0,0 +1,93 @@
+"""
+Booking POST -> /booking/confirm, without MySQL: the booking path is replaced, the confirm
+page runs the real get_order_by_id_and_email / get_order_tickets on a fake cursor.
+"""
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, time
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("mysql.connector")
+
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+import main   # noqa: E402
+import utils  # noqa: E402
+
+ORDER = {"OrderID": 77, "GuestEmail": "guest@example.com", "RegisteredEmail": None,
+         "OrderDate": datetime(2026, 1, 1, 10, 0), "TotalPrice": 100.0, "OrderStatus": "Active"}
+TICKET = {"TicketID": 1, "OrderID": 77, "FlightNum": "FT1", "PassengerName": "Guest User",
+          "ClassType": "Economy", "SeatRow": 1, "SeatCol": "A"}
+
+
+class FakeCursor:
+    def __init__(self):
+        self.sql = ""
+        self.params = ()
+
+    def execute(self, sql, params=()):
+        self.sql, self.params = sql, params
+
+    def fetchone(self):
+        if "FROM Orders" in self.sql and self.params[0] == ORDER["OrderID"] and ORDER["GuestEmail"] in self.params:
+            return dict(ORDER)
+        return None
+
+    def fetchall(self):
+        return [dict(TICKET)] if "FROM Tickets" in self.sql else []
+
+
+@contextmanager
+def fake_db_cur():
+    yield FakeCursor()
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(main.metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "poll_data_changes", lambda force=False: 0)
+    monkeypatch.setattr(utils, "db_cur", fake_db_cur)
+
+    monkeypatch.setattr(main, "get_flight_details", lambda fn: {
+        "FlightNum": fn, "SourceAirport": "TLV", "DestAirport": "LHR",
+        "DepartureDate": date(2030, 1, 1), "DepartureTime": time(8, 0),
+    })
+    monkeypatch.setattr(main, "get_flight_pricing", lambda fn: {"Economy": 100.0})
+    monkeypatch.setattr(main, "get_seat_grid", lambda fn, cls, token=None: (10, ["A", "B"], set(), 20, set()))
+    monkeypatch.setattr(main, "seats_are_free", lambda fn, cls, seats, token=None: True)
+    monkeypatch.setattr(main, "find_order_by_request_key", lambda key: None)
+    monkeypatch.setattr(main, "book_order", lambda **kw: (True, ORDER["OrderID"]))
+
+    main.application.config["TESTING"] = True
+    return main.application.test_client()
+
+
+def test_book_then_confirm(client):
+    resp = client.post("/flights/FT1/book", data={
+        "class_type": "Economy", "qty": "1", "seats": ["1-A"], "action": "confirm",
+        "guest_email": ORDER["GuestEmail"], "guest_first": "Guest", "guest_last": "User",
+    })
+    assert resp.status_code == 302
+    assert "/booking/confirm" in resp.headers["Location"]
+
+    page = client.get("/booking/confirm")
+    assert page.status_code == 200
+    body = page.get_data(as_text=True)
+    assert "77" in body and "Guest User" in body
+
+
+def test_repeat_submit_after_first_commit_shows_order(client, monkeypatch):
+    # the first submit committed while this one ran: its seats now look taken
+    keys = iter([None, (ORDER["OrderID"], ORDER["GuestEmail"])])
+    monkeypatch.setattr(main, "find_order_by_request_key", lambda key: next(keys))
+    monkeypatch.setattr(main, "seats_are_free", lambda fn, cls, seats, token=None: False)
+
+    resp = client.post("/flights/FT1/book", data={
+        "class_type": "Economy", "qty": "1", "seats": ["1-A"], "action": "confirm",
+        "guest_email": ORDER["GuestEmail"], "guest_first": "Guest", "guest_last": "User",
+        "request_key": "k1",
+    })
+    assert resp.status_code == 302
+    assert "/booking/confirm" in resp.headers["Location"]
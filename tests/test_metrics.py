@@ -0,0 +1,64 @@
+"""
+Snapshot files: concurrent flushes don't trip over each other, and a process that reuses a
+dead pid doesn't overwrite that pid's totals.
+"""
+import os
+import threading
+
+import metrics
+
+
+def test_concurrent_flushes(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    errors = []
+
+    def run():
+        try:
+            for _ in range(100):
+                metrics.flush(force=True)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert [n for n in os.listdir(tmp_path) if n.endswith(".tmp")] == []
+
+
+def test_reused_pid_keeps_old_totals(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_histograms", {})
+    pid = os.getpid()
+    monkeypatch.setattr(metrics, "_snapshot_name", (pid, f"{pid}-1000.json"))
+
+    metrics.inc("flytau_bookings_total", 3, outcome="success")
+    metrics.flush(force=True)
+
+    # same pid, new process: fresh counters and a later start time
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_snapshot_name", (pid, f"{pid}-2000.json"))
+    metrics.inc("flytau_bookings_total", 1, outcome="success")
+
+    assert 'flytau_bookings_total{outcome="success"} 4' in metrics.render()
+
+
+def test_dead_snapshots_are_folded(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_histograms", {})
+    dead = {"counters": {"flytau_bookings_total|outcome=success": 5}, "histograms": {},
+            "gauges": {"flytau_db_pool_in_use|": 7}}
+    for name in ("999999991-1.json", "999999992-1.json"):
+        metrics._write_json(str(tmp_path / name), dead)
+
+    for _ in range(2):   # folding twice must not count twice
+        text = metrics.render()
+        assert 'flytau_bookings_total{outcome="success"} 10' in text
+        assert "flytau_db_pool_in_use" not in text
+    assert not (tmp_path / "999999991-1.json").exists()
+    assert (tmp_path / "_totals.json").exists()
@@ -0,0 +1,55 @@
+"""
+SeatMap and seat block picking: pure in-memory logic, no database.
+"""
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("mysql.connector")
+
+from datetime import datetime, timedelta  # noqa: E402
+
+from utils import SeatMap, find_seat_block  # noqa: E402
+
+
+def make_map(num_rows, num_cols, taken=(), held=(), holder="other"):
+    seat_map = SeatMap(num_rows, num_cols)
+    for row, col in taken:
+        seat_map.set_taken(row, col)
+    until = datetime.now() + timedelta(minutes=5)
+    for row, col in held:
+        seat_map.holds[(row, col)] = (holder, until)
+    return seat_map
+
+
+@pytest.mark.parametrize("col", ["AB", "", "1A"])
+def test_bad_column_is_outside_the_cabin(col):
+    seat_map = SeatMap(3, 3)
+    assert seat_map.is_taken(1, col)
+    seat_map.set_taken(1, col)
+    assert seat_map.taken == 0
+
+
+def test_block_in_one_row_uses_the_smallest_run_that_fits():
+    seat_map = make_map(3, 4, taken=[(1, "A"), (1, "B")])
+    assert find_seat_block(seat_map, 2) == [(1, "C"), (1, "D")]
+
+
+def test_block_spans_the_fewest_rows():
+    seat_map = make_map(3, 3, taken=[(1, "B"), (2, "B"), (3, "B")])
+    assert find_seat_block(seat_map, 3) == [(1, "A"), (1, "C"), (2, "A")]
+
+
+def test_seats_held_by_others_count_as_taken():
+    seat_map = make_map(2, 3, held=[(1, "B")])
+    assert find_seat_block(seat_map, 2) == [(2, "A"), (2, "B")]
+    assert find_seat_block(seat_map, 2, token="other") == [(1, "A"), (1, "B")]
+
+
+def test_no_block_when_free_seats_are_held():
+    seat_map = make_map(1, 3, held=[(1, "A")])
+    assert seat_map.free == 3
+    assert find_seat_block(seat_map, 3) is None
+
+
+def test_no_block_when_not_enough_unsold_seats():
+    assert find_seat_block(make_map(1, 2, taken=[(1, "A")]), 2) is None
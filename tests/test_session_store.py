@@ -0,0 +1,51 @@
+"""
+ServerSessionInterface with the memory backend: empty sessions are not stored, and a
+worker's LRU copy never hides a write made by another worker.
+"""
+import pytest
+
+pytest.importorskip("flask")
+
+from flask import Flask, session  # noqa: E402
+
+import session_store  # noqa: E402
+
+
+def make_app(backend):
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.session_interface = session_store.ServerSessionInterface(backend, lifetime=3600, lru_seconds=60)
+
+    @app.route("/get")
+    def get():
+        return str(session.get("n", 0))
+
+    @app.route("/inc")
+    def inc():
+        session["n"] = session.get("n", 0) + 1
+        return str(session["n"])
+
+    return app
+
+
+def test_anonymous_request_stores_nothing():
+    backend = session_store.MemoryBackend()
+    resp = make_app(backend).test_client().get("/get")
+    assert "Set-Cookie" not in resp.headers
+    assert backend._data == {}
+
+
+def test_write_on_other_worker_is_not_lost():
+    backend = session_store.MemoryBackend()
+    one, two = make_app(backend).test_client(), make_app(backend).test_client()
+
+    one.get("/inc")
+    cookie = one.get_cookie("session").value
+    two.set_cookie("session", cookie)
+    assert two.get("/get").get_data(as_text=True) == "1"   # worker two now caches n=1
+
+    one.set_cookie("session", two.get_cookie("session").value)
+    assert one.get("/inc").get_data(as_text=True) == "2"   # written by worker one
+
+    two.set_cookie("session", one.get_cookie("session").value)
+    assert two.get("/inc").get_data(as_text=True) == "3"
@@ -1,7 +1,19 @@
 import mysql.connector
 from contextlib import contextmanager
+import logging
 import os
+import random
+import re
+import sys
+import threading
+import time as _clock
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timedelta, time,date
+from decimal import Decimal, ROUND_HALF_UP
+
+from flask import g, has_app_context
 
 # ==========================================
 # DB CONFIG
@@ -11,14 +23,47 @@ DB_USER = os.environ.get("DB_USER", "root")
 DB_PASSWORD = os.environ.get("DB_PASSWORD", "1234")
 DB_NAME = os.environ.get("DB_NAME", "FlyTau")
 
+# pool settings (seconds for all time values)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "5"))
+DB_POOL_MAX_LIFETIME = int(os.environ.get("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_PING_AFTER = int(os.environ.get("DB_POOL_PING_AFTER", "30"))
+DB_POOL_RESET_SESSION = os.environ.get("DB_POOL_RESET_SESSION", "1") == "1"
+
+# "1" => inside a Flask request, all db_cur() calls share one connection (kept on flask.g)
+DB_REQUEST_SCOPED = os.environ.get("DB_REQUEST_SCOPED", "1") == "1"
+
 # ==========================================
-# DB CURSOR CONTEXT MANAGER
+# CONNECTION POOL
 # ==========================================
-@contextmanager
-def db_cur():
-    conn = None
-    cursor = None
-    try:
+class ConnectionPool:
+    """
+    Small thread-safe pool on top of mysql.connector.
+    - at most `size` connections are borrowed at the same time (others wait up to `timeout`)
+    - idle connections are pinged before reuse if they sat longer than `ping_after`
+    - connections older than `max_lifetime` are closed instead of reused
+    - session state is reset when a connection comes back (no leaks between borrowers)
+    """
+
+    def __init__(self, size, timeout, max_lifetime, ping_after, reset_session=True):
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self.reset_session = reset_session
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []      # stack of (conn, last_used) -> most recently used first
+        self._born = {}      # id(conn) -> created_at
+
+        # counters for /metrics (seconds)
+        self.in_use = 0
+        self.acquired = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _connect(self):
         conn = mysql.connector.connect(
             host=DB_HOST,
             user=DB_USER,
@@ -27,13 +72,325 @@ def db_cur():
             autocommit=True,
             connection_timeout=5
         )
-        cursor = conn.cursor(dictionary=True)
-        yield cursor
+        with self._lock:
+            self._born[id(conn)] = _clock.monotonic()
+        return conn
+
+    def _close(self, conn):
+        with self._lock:
+            self._born.pop(id(conn), None)
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def acquire(self):
+        started = _clock.perf_counter()
+        got = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self.wait_seconds += _clock.perf_counter() - started
+            if got:
+                self.in_use += 1
+                self.acquired += 1
+            else:
+                self.timeouts += 1
+        if not got:
+            raise mysql.connector.errors.PoolError("Database pool exhausted (no free connection).")
+
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    return self._connect()
+
+                conn, last_used = item
+                now = _clock.monotonic()
+                born = self._born.get(id(conn), now)
+
+                # too old -> replace
+                if now - born > self.max_lifetime:
+                    self._close(conn)
+                    continue
+
+                # idle for a while -> make sure the server did not drop it
+                if now - last_used > self.ping_after:
+                    try:
+                        conn.ping(reconnect=False)
+                    except mysql.connector.Error:
+                        self._close(conn)
+                        continue
+
+                return conn
+        except Exception:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        try:
+            if not discard:
+                try:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    if self.reset_session:
+                        conn.reset_session()
+                except mysql.connector.Error:
+                    discard = True
+
+            if discard:
+                self._close(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, _clock.monotonic()))
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+                "acquired": self.acquired,
+                "wait_seconds": self.wait_seconds,
+                "timeouts": self.timeouts,
+            }
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+
+_pool = ConnectionPool(
+    size=DB_POOL_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    ping_after=DB_POOL_PING_AFTER,
+    reset_session=DB_POOL_RESET_SESSION
+)
+
+
+def db_pool_stats():
+    """Snapshot of the connection pool counters (see ConnectionPool.stats)."""
+    return _pool.stats()
+
+
+def _request_connection():
+    conn = g.get("_db_conn")
+    if conn is None:
+        conn = _acquire_timed()
+        g._db_conn = conn
+    return conn
+
+
+def release_request_connection(exc=None):
+    """Flask teardown hook: give the request's connection back to the pool."""
+    conn = g.pop("_db_conn", None)
+    if conn is not None:
+        _pool.release(conn)
+
+# ==========================================
+# QUERY INSTRUMENTATION (per request, see main.py after_request)
+# ==========================================
+DB_INSTRUMENT = os.environ.get("DB_INSTRUMENT", "1") == "1"
+DB_SLOW_QUERY_MS = float(os.environ.get("DB_SLOW_QUERY_MS", "200"))
+DB_QUERY_BUDGET = int(os.environ.get("DB_QUERY_BUDGET", "25"))
+
+sql_log = logging.getLogger("flytau.sql")
+
+_stats_override = threading.local()   # worker threads report into the request that started them
+
+
+class QueryStats:
+    """What one request did with the database (times in ms)."""
+    __slots__ = ("queries", "rows", "acquire_ms", "exec_ms", "_lock")
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.acquire_ms = 0.0
+        self.exec_ms = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, queries=0, rows=0, acquire_ms=0.0, exec_ms=0.0):
+        with self._lock:
+            self.queries += queries
+            self.rows += rows
+            self.acquire_ms += acquire_ms
+            self.exec_ms += exec_ms
+
+
+def current_db_stats():
+    """QueryStats of the running request (None outside a request / when disabled)."""
+    if not DB_INSTRUMENT:
+        return None
+    stats = getattr(_stats_override, "stats", None)
+    if stats is not None:
+        return stats
+    if not has_app_context():
+        return None
+    stats = g.get("_db_stats")
+    if stats is None:
+        stats = g._db_stats = QueryStats()
+    return stats
+
+
+@contextmanager
+def reporting_to(stats):
+    """Count queries of this thread into another request's stats (thread pool workers)."""
+    previous = getattr(_stats_override, "stats", None)
+    _stats_override.stats = stats
+    try:
+        yield
     finally:
-        if cursor:
+        _stats_override.stats = previous
+
+
+def _acquire_timed():
+    started = _clock.perf_counter()
+    conn = _pool.acquire()
+    stats = current_db_stats()
+    if stats is not None:
+        stats.add(acquire_ms=(_clock.perf_counter() - started) * 1000.0)
+    return conn
+
+
+_IN_LIST = re.compile(r"%s(\s*,\s*%s)+")
+
+
+def _normalize_sql(sql):
+    # one line, IN (%s,%s,%s...) collapsed so the same statement always logs the same way
+    return _IN_LIST.sub("%s, ...", " ".join(str(sql).split()))
+
+
+def _params_shape(params):
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    return f"{len(params)} x (" + ", ".join(sorted({type(v).__name__ for v in params})) + ")"
+
+
+class _InstrumentedCursor:
+    """Cursor proxy: counts statements/rows and times execute() into QueryStats."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def _timed(self, method, sql, params):
+        started = _clock.perf_counter()
+        try:
+            return method(sql, params) if params is not None else method(sql)
+        finally:
+            ms = (_clock.perf_counter() - started) * 1000.0
+            self._stats.add(queries=1, exec_ms=ms)
+            if ms >= DB_SLOW_QUERY_MS:
+                caller = sys._getframe(2)
+                sql_log.warning(
+                    "slow query %.1f ms in %s (%s:%d): %s params=%s",
+                    ms, caller.f_code.co_name, os.path.basename(caller.f_code.co_filename),
+                    caller.f_lineno, _normalize_sql(sql), _params_shape(params)
+                )
+
+    def execute(self, sql, params=None):
+        return self._timed(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_params):
+        return self._timed(self._cursor.executemany, sql, seq_params)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.add(rows=1)
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.add(rows=len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _instrument(cursor):
+    stats = current_db_stats()
+    return cursor if stats is None else _InstrumentedCursor(cursor, stats)
+
+# ==========================================
+# DB CURSOR CONTEXT MANAGERS
+# ==========================================
+@contextmanager
+def _db_conn():
+    request_scoped = DB_REQUEST_SCOPED and has_app_context()
+    conn = _request_connection() if request_scoped else _acquire_timed()
+    broken = False
+    try:
+        yield conn
+    except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+        broken = True
+        raise
+    finally:
+        if not request_scoped:
+            _pool.release(conn, discard=broken)
+        elif broken:
+            # drop it now so the rest of the request gets a fresh connection
+            g.pop("_db_conn", None)
+            _pool.release(conn, discard=True)
+
+
+@contextmanager
+def db_cur():
+    with _db_conn() as conn:
+        # buffered => results are fully read, so the connection is always clean for the next user
+        cursor = conn.cursor(dictionary=True, buffered=True)
+        try:
+            yield _instrument(cursor)
+        finally:
             cursor.close()
-        if conn:
-            conn.close()
+
+
+_tx_local = threading.local()
+
+
+def _after_commit(callback):
+    """Run callback once the surrounding db_tx() commits (right away outside a transaction)."""
+    pending = getattr(_tx_local, "pending", None)
+    if pending is None:
+        callback()
+    else:
+        pending.append(callback)
+
+
+@contextmanager
+def db_tx():
+    """
+    Same as db_cur(), but everything inside the block is ONE transaction:
+    commit when the block ends, rollback if it raises.
+    Callbacks registered with _after_commit() run after the commit (dropped on rollback).
+    """
+    with _db_conn() as conn:
+        cursor = conn.cursor(dictionary=True, buffered=True)
+        conn.start_transaction()
+        _tx_local.pending = pending = []
+        try:
+            yield _instrument(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            _tx_local.pending = None
+            cursor.close()
+        for callback in pending:
+            callback()
 
 # ==========================================================
 # AUTH
@@ -70,51 +427,694 @@ def ensure_guest(email, first_name="Guest", last_name="User"):
         """, (email, first_name or "Guest", last_name or "User"))
 
 # ==========================================================
-# FLIGHTS SEARCH
+# IN-PROCESS CACHES
 # ==========================================================
-def list_route_airports():
+class CacheStats:
+    """Hit/miss counters of one in-process cache (exported by /metrics)."""
+    __slots__ = ("hits", "misses", "size")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.size = lambda: 0
+
+
+CACHE_STATS = {}   # cache name -> CacheStats
+
+
+def cache_stats(name, size=None):
+    """Register (or get) the counters of a named cache. size: callable -> current entry count."""
+    stats = CACHE_STATS.get(name)
+    if stats is None:
+        stats = CACHE_STATS[name] = CacheStats()
+    if size is not None:
+        stats.size = size
+    return stats
+
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU where every entry also expires after `ttl` seconds.
+    invalidate() bumps a generation number: a value loaded before an invalidation
+    is not stored (set(..., generation=...)), so a slow reader cannot put stale data back.
+    """
+
+    def __init__(self, name, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._items = OrderedDict()     # key -> (value, stored_at)
+        self._lock = threading.Lock()
+        self.stats = cache_stats(name, size=lambda: len(self._items))
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and _clock.monotonic() - item[1] < self.ttl:
+                self._items.move_to_end(key)
+                self.stats.hits += 1
+                return item[0]
+            if item is not None:
+                del self._items[key]
+            self.stats.misses += 1
+        return MISSING
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._items[key] = (value, _clock.monotonic())
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, match=None):
+        """Drop entries whose key satisfies match(key) (all when match is None). Returns how many."""
+        with self._lock:
+            self.generation += 1
+            if match is None:
+                n = len(self._items)
+                self._items.clear()
+                return n
+            dead = [k for k in self._items if match(k)]
+            for k in dead:
+                del self._items[k]
+            return len(dead)
+
+# ==========================================================
+# CHANGE LOG (cross-process cache invalidation)
+# ==========================================================
+# Writes append (Namespace, ItemKey) rows to DataChangeLog in their own transaction.
+# Every worker polls the log (at most every CHANGE_POLL_SECONDS, from before_request)
+# and hands new rows to the handlers of that namespace. Namespaces in use:
+#   seats      "FLIGHTNUM|Class"   seat maps and holds ("FLIGHTNUM|" = every class)
+#   search     "date|SRC|DST"      search_flights results, fare calendar, connection index
+#   orders     email               get_registered_orders results
+#   aircraft   TAILNUM             aircraft timelines (flight candidates)
+#   reference  ""                  Routes / Aircrafts / AircraftLayout snapshot
+CHANGE_POLL_SECONDS = float(os.environ.get("CHANGE_POLL_SECONDS", "1"))
+CHANGE_LOG_KEEP_SECONDS = int(os.environ.get("CHANGE_LOG_KEEP_SECONDS", "3600"))
+CHANGE_POLL_OVERLAP = 200       # ids re-read every poll (a lower id may commit after a higher one)
+CHANGE_POLL_BATCH = 1000
+CHANGE_LOG_SWEEP_SECONDS = 600
+
+_change_handlers = {}           # namespace -> [handler(key)]; key None = "drop everything"
+_changes_lock = threading.Lock()
+_changes_seen = None            # highest ChangeID handled by this worker (None = not started)
+_changes_done = OrderedDict()   # recent ChangeIDs already handled (own writes + overlap window)
+_changes_polled_at = 0.0
+_changes_swept_at = 0.0
+
+
+def on_data_change(namespace):
+    """Decorator: handler(key) runs in every worker when a change in `namespace` is polled."""
+    def register(handler):
+        _change_handlers.setdefault(namespace, []).append(handler)
+        return handler
+    return register
+
+
+def _changes_mark_done(change_id):
+    with _changes_lock:
+        _changes_done[change_id] = None
+        while len(_changes_done) > CHANGE_POLL_OVERLAP * 4:
+            _changes_done.popitem(last=False)
+
+
+def log_data_change(cursor, namespace, key=""):
+    """
+    Append a change inside the caller's transaction. This worker handles it itself
+    (after commit), so the poll skips it here.
+    """
+    cursor.execute(
+        "INSERT INTO DataChangeLog (Namespace, ItemKey, ChangedAt) VALUES (%s, %s, NOW())",
+        (namespace, str(key)[:200])
+    )
+    change_id = cursor.lastrowid
+    _after_commit(lambda: _changes_mark_done(change_id))
+
+
+def _dispatch_change(namespace, key):
+    for handler in _change_handlers.get(namespace, ()):
+        handler(key)
+
+
+def poll_data_changes(force=False):
+    """Apply changes other workers logged since the last poll. Returns how many were applied."""
+    global _changes_seen, _changes_polled_at, _changes_swept_at
+    now = _clock.monotonic()
+    if not force and now - _changes_polled_at < CHANGE_POLL_SECONDS:
+        return 0
+    _changes_polled_at = now
+
     with db_cur() as cursor:
-        cursor.execute("SELECT DISTINCT SourceAirport FROM Routes ORDER BY SourceAirport")
-        sources = [r["SourceAirport"] for r in cursor.fetchall()]
-        cursor.execute("SELECT DISTINCT DestAirport FROM Routes ORDER BY DestAirport")
-        dests = [r["DestAirport"] for r in cursor.fetchall()]
-    return sources, dests
+        if _changes_seen is None:
+            # fresh worker: caches are empty, start from the end of the log
+            cursor.execute("SELECT COALESCE(MAX(ChangeID), 0) AS M FROM DataChangeLog")
+            _changes_seen = int(cursor.fetchone()["M"])
+            return 0
 
-def search_flights(departure_date=None, source=None, destination=None):
-    query = """
-        SELECT f.FlightNum, f.DepartureDate, f.DepartureTime, f.StatusF,
-               r.SourceAirport, r.DestAirport, r.DurationMinutes
-        FROM Flights f
-        JOIN Routes r ON f.RouteID = r.RouteID
-        WHERE f.StatusF = 'Active'
+        cursor.execute("""
+            SELECT ChangeID, Namespace, ItemKey
+            FROM DataChangeLog
+            WHERE ChangeID > %s
+            ORDER BY ChangeID
+            LIMIT %s
+        """, (max(0, _changes_seen - CHANGE_POLL_OVERLAP), CHANGE_POLL_BATCH))
+        rows = cursor.fetchall()
+
+        if now - _changes_swept_at >= CHANGE_LOG_SWEEP_SECONDS:
+            _changes_swept_at = now
+            cursor.execute("""
+                DELETE FROM DataChangeLog
+                WHERE ChangedAt < NOW() - INTERVAL %s SECOND
+                LIMIT 5000
+            """, (CHANGE_LOG_KEEP_SECONDS,))
+
+    if len(rows) == CHANGE_POLL_BATCH:
+        # too far behind to replay: drop every cache, continue from the newest row
+        for namespace in list(_change_handlers):
+            _dispatch_change(namespace, None)
+        _changes_seen = max(_changes_seen, int(rows[-1]["ChangeID"]))
+        return len(rows)
+
+    applied = 0
+    for r in rows:
+        change_id = int(r["ChangeID"])
+        _changes_seen = max(_changes_seen, change_id)   # also own writes, or the window only grows
+        if change_id in _changes_done:
+            continue
+        _dispatch_change(r["Namespace"], r["ItemKey"])
+        _changes_mark_done(change_id)
+        applied += 1
+    return applied
+
+# ==========================================================
+# REFERENCE DATA SNAPSHOT (Routes, Aircrafts, AircraftLayout)
+# ==========================================================
+# seconds between version checks (one PK lookup on DataVersions)
+REFERENCE_CHECK_SECONDS = float(os.environ.get("REFERENCE_CHECK_SECONDS", "5"))
+
+
+class ReferenceSnapshot:
     """
-    params = []
+    Read-only copy of the rarely changing tables. Never modified after it is built:
+    a newer version is a new object swapped in whole, so readers never see half an update.
+    """
+    __slots__ = ("version", "routes", "aircraft", "layouts", "sources", "dests")
+
+    def __init__(self, version, routes, aircraft, layouts):
+        self.version = version
+        self.routes = routes          # RouteID -> row
+        self.aircraft = aircraft      # TAILNUM -> row
+        self.layouts = layouts        # (TAILNUM, ClassType) -> (NumRows, NumCols)
+        self.sources = tuple(sorted({r["SourceAirport"] for r in routes.values()}))
+        self.dests = tuple(sorted({r["DestAirport"] for r in routes.values()}))
+
+    def route(self, route_id):
+        try:
+            return self.routes.get(int(route_id))
+        except (TypeError, ValueError):
+            return None
+
+    def aircraft_row(self, tail_num):
+        return self.aircraft.get(str(tail_num or "").strip().upper())
+
+    def layout(self, tail_num, class_type):
+        return self.layouts.get((str(tail_num or "").strip().upper(), class_type))
+
+
+_reference = None
+_reference_lock = threading.Lock()
+_reference_checked_at = 0.0
+
+
+def _read_data_version(cursor, name):
+    cursor.execute("SELECT Version FROM DataVersions WHERE Name = %s", (name,))
+    row = cursor.fetchone()
+    return int(row["Version"]) if row else 0
+
+
+def load_reference_snapshot():
+    """Build a new snapshot from the DB and make it the current one (called at worker start)."""
+    global _reference, _reference_checked_at
+    with db_cur() as cursor:
+        version = _read_data_version(cursor, "reference")
+        cursor.execute("SELECT RouteID, SourceAirport, DestAirport, DurationMinutes FROM Routes")
+        routes = {int(r["RouteID"]): r for r in cursor.fetchall()}
+        cursor.execute("SELECT TailNum, Manufacturer, Size, PurchaseDate FROM Aircrafts")
+        aircraft = {r["TailNum"].upper(): r for r in cursor.fetchall()}
+        cursor.execute("SELECT TailNum, ClassType, NumRows, NumCols FROM AircraftLayout")
+        layouts = {(r["TailNum"].upper(), r["ClassType"]): (int(r["NumRows"]), int(r["NumCols"]))
+                   for r in cursor.fetchall()}
+
+    snap = ReferenceSnapshot(version, routes, aircraft, layouts)
+    with _reference_lock:
+        _reference = snap
+        _reference_checked_at = _clock.monotonic()
+    return snap
+
+
+def reference():
+    """Current snapshot; reloaded when the 'reference' row of DataVersions moved."""
+    global _reference_checked_at
+    snap = _reference
+    if snap is None:
+        return load_reference_snapshot()
+    if _clock.monotonic() - _reference_checked_at < REFERENCE_CHECK_SECONDS:
+        return snap
+
+    _reference_checked_at = _clock.monotonic()
+    with db_cur() as cursor:
+        version = _read_data_version(cursor, "reference")
+    if version != snap.version:
+        return load_reference_snapshot()
+    return snap
+
+
+def bump_data_version(cursor, name):
+    """Call inside the writing transaction: other workers pick the change up on their next check."""
+    cursor.execute("""
+        INSERT INTO DataVersions (Name, Version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE Version = Version + 1
+    """, (name,))
+    if name == "reference":
+        log_data_change(cursor, "reference")
+        _after_commit(_expire_reference)
+
+
+@on_data_change("reference")
+def _expire_reference(key=None):
+    # check the version on the very next use
+    global _reference_checked_at
+    _reference_checked_at = float("-inf")
+
+# ==========================================================
+# FLIGHTS SEARCH
+# ==========================================================
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", "60"))
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "5000"))
+
+# (date, SOURCE, DEST) -> result rows; None in a key = "any"
+_search_cache = TTLCache("flight_search", SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+
+def _search_key(departure_date, source, destination):
+    def norm(x):
+        x = str(x).strip() if x is not None else ""
+        return x.upper() or None
+    return (norm(departure_date), norm(source), norm(destination))
+
+
+def invalidate_flight_search(departure_date, source, destination):
+    """
+    Forget every cached search that could contain a flight on this date/route
+    (exact key plus the ones that left date/source/dest empty).
+    """
+    flight_key = _search_key(departure_date, source, destination)
+
+    def match(key):
+        return all(k is None or k == f for k, f in zip(key, flight_key))
+
+    return _search_cache.invalidate(match)
+
+
+def _search_changed(cursor, departure_date, source, destination):
+    # inside the writing transaction: here after commit, other workers through the change log
+    key = "|".join(str(x or "") for x in (departure_date, source, destination))
+    log_data_change(cursor, "search", key)
+    _after_commit(lambda: _dispatch_change("search", key))
+
+
+@on_data_change("search")
+def _on_search_change(key):
+    if key is None:
+        _search_cache.invalidate()
+        _calendar_cache.invalidate()
+    else:
+        invalidate_flight_search(*(x or None for x in key.split("|")))
+        invalidate_fare_calendar(*(x or None for x in key.split("|")))
+
+
+def list_route_airports():
+    snap = reference()
+    return list(snap.sources), list(snap.dests)
 
+def _search_filters(departure_date, source, destination):
+    where, params = ["f.StatusF = 'Active'"], []
     if departure_date:
-        query += " AND f.DepartureDate = %s"
+        where.append("f.DepartureDate = %s")
         params.append(departure_date)
-
     if source:
-        query += " AND r.SourceAirport = %s"
+        where.append("r.SourceAirport = %s")
         params.append(source)
-
     if destination:
-        query += " AND r.DestAirport = %s"
+        where.append("r.DestAirport = %s")
         params.append(destination)
+    return " AND ".join(where), params
+
+
+# Price + seats left per class for the flights of a search result, pivoted to one row per flight:
+# primary key lookups on FlightPricing / FlightSeatCounters / AircraftLayout, no re-run of the search.
+# Capacity falls back to the layout for flights that have no counter rows yet.
+_SEARCH_AVAILABILITY_SQL = """
+    SELECT fp.FlightNum,
+           MAX(CASE WHEN fp.ClassType = 'Economy' THEN fp.Price END) AS EconomyPrice,
+           MAX(CASE WHEN fp.ClassType = 'Business' THEN fp.Price END) AS BusinessPrice,
+           MAX(CASE WHEN fp.ClassType = 'Economy'
+                    THEN GREATEST(COALESCE(c.Capacity, al.NumRows * al.NumCols) - COALESCE(c.Sold, 0), 0)
+               END) AS EconomySeatsLeft,
+           MAX(CASE WHEN fp.ClassType = 'Business'
+                    THEN GREATEST(COALESCE(c.Capacity, al.NumRows * al.NumCols) - COALESCE(c.Sold, 0), 0)
+               END) AS BusinessSeatsLeft
+    FROM FlightPricing fp
+    JOIN Flights f ON f.FlightNum = fp.FlightNum
+    LEFT JOIN AircraftLayout al ON al.TailNum = f.TailNum AND al.ClassType = fp.ClassType
+    LEFT JOIN FlightSeatCounters c ON c.FlightNum = fp.FlightNum AND c.ClassType = fp.ClassType
+    WHERE fp.FlightNum IN ({flights})
+    GROUP BY fp.FlightNum
+"""
+
+_AVAILABILITY_FIELDS = ("EconomyPrice", "BusinessPrice", "EconomySeatsLeft", "BusinessSeatsLeft")
+
+# FlightNums bound per availability query (an unfiltered search lists every active flight)
+SEARCH_AVAILABILITY_CHUNK = int(os.environ.get("SEARCH_AVAILABILITY_CHUNK", "500"))
+
+
+def search_flights(departure_date=None, source=None, destination=None, with_availability=False):
+    """
+    Active flights matching the filters (None = any).
+    with_availability: also fill EconomyPrice/BusinessPrice/EconomySeatsLeft/BusinessSeatsLeft
+    (None when the flight has no such class) and SoldOut (no seat left in any class; cached rows
+    may belong to flights that turned Full since) - one extra query per SEARCH_AVAILABILITY_CHUNK
+    FlightNums returned.
+    """
+    key = _search_key(departure_date, source, destination)
+    where, params = _search_filters(departure_date, source, destination)
 
-    query += " ORDER BY f.DepartureDate, f.DepartureTime"
+    cached = _search_cache.get(key)
+    if cached is not MISSING:
+        rows = [dict(r) for r in cached]
+    else:
+        generation = _search_cache.generation
+        query = f"""
+            SELECT f.FlightNum, f.DepartureDate, f.DepartureTime, f.StatusF,
+                   r.SourceAirport, r.DestAirport, r.DurationMinutes
+            FROM Flights f
+            JOIN Routes r ON f.RouteID = r.RouteID
+            WHERE {where}
+            ORDER BY f.DepartureDate, f.DepartureTime
+        """
 
-    with db_cur() as cursor:
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
+        with db_cur() as cursor:
+            cursor.execute(query, tuple(params))
+            fetched = cursor.fetchall()
 
-    for r in rows:
-        r["ArrivalDateTime"] = compute_arrival_dt(
-            r["DepartureDate"], r["DepartureTime"], r["DurationMinutes"]
-        )
+        for r in fetched:
+            r["ArrivalDateTime"] = compute_arrival_dt(
+                r["DepartureDate"], r["DepartureTime"], r["DurationMinutes"]
+            )
+        _search_cache.set(key, fetched, generation)
+        rows = [dict(r) for r in fetched]
+
+    # seats move with every booking, so availability is never cached with the rows
+    if with_availability and rows:
+        flight_nums = list(dict.fromkeys(r["FlightNum"] for r in rows))
+        availability = {}
+        with db_cur() as cursor:
+            for chunk in _chunks(flight_nums, SEARCH_AVAILABILITY_CHUNK):
+                cursor.execute(
+                    _SEARCH_AVAILABILITY_SQL.format(flights=",".join(["%s"] * len(chunk))),
+                    tuple(chunk)
+                )
+                availability.update((a["FlightNum"], a) for a in cursor.fetchall())
+        for r in rows:
+            a = availability.get(r["FlightNum"], {})
+            for field in _AVAILABILITY_FIELDS:
+                r[field] = a.get(field)
+                if field.endswith("SeatsLeft") and r[field] is not None:
+                    r[field] = int(r[field])
+            r["SoldOut"] = not (r["EconomySeatsLeft"] or r["BusinessSeatsLeft"])
     return rows
 
 
+# ==========================================================
+# FARE CALENDAR (flexible dates: one grouped query per source/dest window)
+# ==========================================================
+CALENDAR_MAX_DAYS = int(os.environ.get("CALENDAR_MAX_DAYS", "15"))
+CALENDAR_CACHE_TTL = float(os.environ.get("CALENDAR_CACHE_TTL", "30"))
+
+# (SOURCE, DEST, first day, last day) -> day rows. Flight changes drop entries through the
+# 'search' namespace; seat sales only age out (seats left may lag by CALENDAR_CACHE_TTL).
+_calendar_cache = TTLCache("fare_calendar", SEARCH_CACHE_SIZE, CALENDAR_CACHE_TTL)
+
+_CALENDAR_SQL = """
+    SELECT f.DepartureDate,
+           COUNT(DISTINCT f.FlightNum) AS Flights,
+           MIN(CASE WHEN fp.ClassType = 'Economy' AND COALESCE(c.Sold < c.Capacity, 1)
+                    THEN fp.Price END) AS MinEconomy,
+           MIN(CASE WHEN fp.ClassType = 'Business' AND COALESCE(c.Sold < c.Capacity, 1)
+                    THEN fp.Price END) AS MinBusiness,
+           COALESCE(SUM(CASE WHEN fp.ClassType = 'Economy'
+                             THEN GREATEST(c.Capacity - c.Sold, 0) END), 0) AS EconomySeatsLeft,
+           COALESCE(SUM(CASE WHEN fp.ClassType = 'Business'
+                             THEN GREATEST(c.Capacity - c.Sold, 0) END), 0) AS BusinessSeatsLeft
+    FROM Flights f
+    JOIN Routes r ON r.RouteID = f.RouteID
+    LEFT JOIN FlightPricing fp ON fp.FlightNum = f.FlightNum
+    LEFT JOIN FlightSeatCounters c ON c.FlightNum = fp.FlightNum AND c.ClassType = fp.ClassType
+    WHERE f.StatusF = 'Active'
+      AND r.SourceAirport = %s AND r.DestAirport = %s
+      AND f.DepartureDate BETWEEN %s AND %s
+    GROUP BY f.DepartureDate
+"""
+
+
+def invalidate_fare_calendar(departure_date, source, destination):
+    """Forget every cached calendar whose route matches and whose window holds departure_date."""
+    day = _to_date(departure_date) if departure_date else None
+    src, dst = (x.upper() if x else None for x in (source, destination))
+
+    def match(key):
+        return ((src is None or key[0] == src) and (dst is None or key[1] == dst)
+                and (day is None or key[2] <= day <= key[3]))
+
+    return _calendar_cache.invalidate(match)
+
+
+def search_fare_calendar(departure_date, source, destination, days=3):
+    """
+    departure_date +- days on one route, one row per day (days without flights included):
+    {"DepartureDate", "Flights", "MinEconomy", "MinBusiness", "EconomySeatsLeft", "BusinessSeatsLeft",
+     "Selected"}. Lowest prices only count classes that still have free seats.
+    """
+    days = max(0, min(int(days), CALENDAR_MAX_DAYS))
+    center = _to_date(departure_date)
+    first = max(center - timedelta(days=days), date.today())
+    last = center + timedelta(days=days)
+    key = (source.strip().upper(), destination.strip().upper(), first, last)
+
+    rows = _calendar_cache.get(key)
+    if rows is MISSING:
+        generation = _calendar_cache.generation
+        with db_cur() as cursor:
+            cursor.execute(_CALENDAR_SQL, key)
+            rows = {r["DepartureDate"]: r for r in cursor.fetchall()}
+        _calendar_cache.set(key, rows, generation)
+
+    calendar = []
+    day = first
+    while day <= last:
+        r = rows.get(day) or {}
+        calendar.append({
+            "DepartureDate": day,
+            "Flights": int(r.get("Flights") or 0),
+            "MinEconomy": r.get("MinEconomy"),
+            "MinBusiness": r.get("MinBusiness"),
+            "EconomySeatsLeft": int(r.get("EconomySeatsLeft") or 0),
+            "BusinessSeatsLeft": int(r.get("BusinessSeatsLeft") or 0),
+            "Selected": day == center,
+        })
+        day += timedelta(days=1)
+    return calendar
+
+
+# ==========================================================
+# CONNECTION SEARCH (1-2 stop itineraries over an in-memory flight graph)
+# ==========================================================
+CONNECTIONS_WINDOW_DAYS = int(os.environ.get("CONNECTIONS_WINDOW_DAYS", "180"))
+CONNECTIONS_MIN_MINUTES = int(os.environ.get("CONNECTIONS_MIN_MINUTES", "60"))
+CONNECTIONS_MAX_MINUTES = int(os.environ.get("CONNECTIONS_MAX_MINUTES", "1440"))
+CONNECTIONS_REBUILD_SECONDS = float(os.environ.get("CONNECTIONS_REBUILD_SECONDS", "900"))
+CONNECTIONS_MAX_RESULTS = 50
+
+_CONNECTIONS_SQL = """
+    SELECT f.FlightNum, f.DepartureDate, f.DepartureTime,
+           r.SourceAirport, r.DestAirport, r.DurationMinutes
+    FROM Flights f
+    JOIN Routes r ON f.RouteID = r.RouteID
+    WHERE f.StatusF = 'Active' AND {where}
+"""
+
+
+class ConnectionIndex:
+    """
+    Active flights of the next CONNECTIONS_WINDOW_DAYS as a time-expanded graph:
+    (SRC, DEST) -> departures sorted by time, plus SRC -> {DEST}. Legs are tuples
+    (dep_dt, arr_dt, row). Changes arrive per (date, SRC, DEST) slice from the
+    "search" change namespace and are applied before the next query.
+    """
+
+    def __init__(self):
+        self.pairs = {}           # (SRC, DEST) -> (dep_dts, legs), both sorted
+        self.dests = {}           # SRC -> set of DEST
+        self.first_day = None
+        self.built_at = 0.0
+        self._dirty = set()       # (date, SRC, DEST) slices to reload
+        self._stale = True        # full rebuild needed
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _leg(row):
+        row["ArrivalDateTime"] = compute_arrival_dt(row["DepartureDate"], row["DepartureTime"], row["DurationMinutes"])
+        return (_parse_dep_dt(row["DepartureDate"], row["DepartureTime"]), row["ArrivalDateTime"], row)
+
+    def _add(self, pairs, dests, rows):
+        for row in rows:
+            key = (row["SourceAirport"].upper(), row["DestAirport"].upper())
+            pairs.setdefault(key, []).append(self._leg(row))
+            dests.setdefault(key[0], set()).add(key[1])
+
+    @staticmethod
+    def _sorted(legs):
+        legs.sort(key=lambda leg: leg[0])
+        return ([leg[0] for leg in legs], legs)
+
+    def mark(self, key):
+        with self._lock:
+            if key is None:
+                self._stale = True
+            else:
+                day, src, dst = (key.split("|") + ["", "", ""])[:3]
+                if day and src and dst:
+                    self._dirty.add((day, src.upper(), dst.upper()))
+                else:
+                    self._stale = True
+
+    def _rebuild(self):
+        first_day = date.today()
+        with db_cur() as cursor:
+            cursor.execute(
+                _CONNECTIONS_SQL.format(where="f.DepartureDate BETWEEN %s AND %s"),
+                (first_day, first_day + timedelta(days=CONNECTIONS_WINDOW_DAYS))
+            )
+            rows = cursor.fetchall()
+        pairs, dests = {}, {}
+        self._add(pairs, dests, rows)
+        self.pairs = {k: self._sorted(v) for k, v in pairs.items()}
+        self.dests = dests
+        self.first_day = first_day
+        self.built_at = _clock.monotonic()
+
+    def _reload_slices(self, slices):
+        with db_cur() as cursor:
+            for day, src, dst in slices:
+                cursor.execute(
+                    _CONNECTIONS_SQL.format(where="f.DepartureDate = %s AND r.SourceAirport = %s AND r.DestAirport = %s"),
+                    (day, src, dst)
+                )
+                rows = cursor.fetchall()
+                key = (src, dst)
+                day = _to_date(day)
+                kept = [leg for leg in self.pairs.get(key, ((), []))[1] if leg[2]["DepartureDate"] != day]
+                fresh = {}
+                self._add(fresh, {}, rows)
+                # swap whole entries: readers keep whichever version they already hold
+                self.pairs[key] = self._sorted(kept + fresh.get(key, []))
+                if dst not in self.dests.get(src, ()):
+                    self.dests[src] = self.dests.get(src, set()) | {dst}
+
+    def refresh(self):
+        with self._lock:
+            too_old = _clock.monotonic() - self.built_at >= CONNECTIONS_REBUILD_SECONDS
+            if self._stale or too_old or self.first_day != date.today():
+                self._stale = False
+                self._dirty.clear()
+                self._rebuild()
+            elif self._dirty:
+                slices, self._dirty = self._dirty, set()
+                self._reload_slices(slices)
+
+    def departures(self, src, dst, earliest, latest):
+        deps, legs = self.pairs.get((src, dst), ((), []))
+        i = bisect_left(deps, earliest)
+        while i < len(legs) and legs[i][0] <= latest:
+            yield legs[i]
+            i += 1
+
+
+_connections = ConnectionIndex()
+
+
+@on_data_change("search")
+def _on_connections_change(key):
+    _connections.mark(key)
+
+
+def search_connections(departure_date, source, destination, max_stops=2,
+                       min_connection=None, max_connection=None):
+    """
+    Direct, 1-stop and 2-stop itineraries leaving `source` on `departure_date`.
+    min/max_connection: minutes between landing and the next departure.
+    Returns: list of {"Legs": [flight rows], "Stops", "DepartureDateTime", "ArrivalDateTime", "TotalMinutes"}
+    sorted by arrival time (at most CONNECTIONS_MAX_RESULTS).
+    """
+    min_gap = timedelta(minutes=CONNECTIONS_MIN_MINUTES if min_connection is None else int(min_connection))
+    max_gap = timedelta(minutes=CONNECTIONS_MAX_MINUTES if max_connection is None else int(max_connection))
+    src, dst = source.strip().upper(), destination.strip().upper()
+    day = _to_date(departure_date)
+    day_start = datetime.combine(day, time(0, 0))
+    day_end = datetime.combine(day, time(23, 59, 59))
+
+    _connections.refresh()
+    index = _connections
+    found = []
+
+    for mid in index.dests.get(src, ()):
+        for leg1 in index.departures(src, mid, day_start, day_end):
+            if mid == dst:
+                found.append((leg1,))
+                continue
+            if max_stops < 1:
+                continue
+            window = (leg1[1] + min_gap, leg1[1] + max_gap)
+            for leg2 in index.departures(mid, dst, *window):
+                found.append((leg1, leg2))
+            if max_stops < 2:
+                continue
+            for mid2 in index.dests.get(mid, ()):
+                if mid2 in (src, dst) or (mid2, dst) not in index.pairs:
+                    continue
+                for leg2 in index.departures(mid, mid2, *window):
+                    for leg3 in index.departures(mid2, dst, leg2[1] + min_gap, leg2[1] + max_gap):
+                        found.append((leg1, leg2, leg3))
+
+    found.sort(key=lambda legs: (legs[-1][1], legs[-1][1] - legs[0][0], len(legs)))
+    itineraries = []
+    for legs in found[:CONNECTIONS_MAX_RESULTS]:
+        itineraries.append({
+            "Legs": [dict(leg[2]) for leg in legs],
+            "Stops": len(legs) - 1,
+            "DepartureDateTime": legs[0][0],
+            "ArrivalDateTime": legs[-1][1],
+            "TotalMinutes": int((legs[-1][1] - legs[0][0]).total_seconds() // 60),
+        })
+    return itineraries
+
+
 def get_flight_details(flight_num):
     with db_cur() as cursor:
         cursor.execute("""
@@ -130,7 +1130,7 @@ def get_flight_details(flight_num):
         return None
 
     row["ArrivalDateTime"] = compute_arrival_dt(row["DepartureDate"], row["DepartureTime"], row["DurationMinutes"])
-    row["EconomySeats"] = get_class_seat_count(row["TailNum"], "Economy")
+    row["EconomySeats"] = get_class_seat_count(row["TailNum"], "Economy")      # snapshot, no query
     row["BusinessSeats"] = get_class_seat_count(row["TailNum"], "Business")
     return row
 
@@ -141,73 +1141,571 @@ def get_flight_pricing(flight_num):
     return {r["ClassType"]: float(r["Price"]) for r in rows}
 
 def get_layout_for_flight(flight_num, class_type):
+    with db_cur() as cursor:
+        cursor.execute("SELECT TailNum FROM Flights WHERE FlightNum = %s", (flight_num,))
+        row = cursor.fetchone()
+    layout = reference().layout(row["TailNum"], class_type) if row else None
+    return layout or (0, 0)
+
+# ==========================================================
+# SEAT INVENTORY (in-process bitmap per flight + class)
+# ==========================================================
+# seconds a loaded seat map is trusted before it is read again from the DB
+SEAT_INVENTORY_TTL = float(os.environ.get("SEAT_INVENTORY_TTL", "30"))
+
+
+class SeatMap:
+    """
+    Occupancy of one class on one flight: 1 bit per seat (row-major, rows 1..N, cols A..).
+    Sized from AircraftLayout, so a 30x6 cabin is 23 bytes.
+    holds: unexpired SeatHolds rows, (row, COL) -> (token, expires_at). A held seat counts as
+    taken for everyone except the holder (token).
+    """
+    __slots__ = ("num_rows", "num_cols", "bits", "taken", "holds", "loaded_at")
+
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = int(num_rows)
+        self.num_cols = int(num_cols)
+        self.bits = bytearray((self.num_rows * self.num_cols + 7) // 8)
+        self.taken = 0
+        self.holds = {}
+        self.loaded_at = _clock.monotonic()
+
+    @property
+    def cols(self):
+        return [chr(ord("A") + i) for i in range(self.num_cols)]
+
+    @property
+    def free(self):
+        return self.num_rows * self.num_cols - self.taken
+
+    def _index(self, row, col):
+        col = str(col)
+        if len(col) != 1:
+            return None  # "AB", "" (tampered form) -> outside the cabin
+        r = int(row) - 1
+        c = ord(col.upper()) - ord("A")
+        if r < 0 or r >= self.num_rows or c < 0 or c >= self.num_cols:
+            return None
+        return r * self.num_cols + c
+
+    def _held(self, row, col, token, now):
+        hold = self.holds.get((int(row), str(col).upper()))
+        return hold is not None and hold[0] != token and hold[1] > now
+
+    def is_taken(self, row, col, token=None):
+        i = self._index(row, col)
+        if i is None:
+            return True  # outside the cabin -> never bookable
+        if self.bits[i >> 3] & (1 << (i & 7)):
+            return True
+        return bool(self.holds) and self._held(row, col, token, datetime.now())
+
+    def set_taken(self, row, col, taken=True):
+        i = self._index(row, col)
+        if i is None:
+            return
+        mask = 1 << (i & 7)
+        was = bool(self.bits[i >> 3] & mask)
+        if taken and not was:
+            self.bits[i >> 3] |= mask
+            self.taken += 1
+        elif not taken and was:
+            self.bits[i >> 3] &= ~mask
+            self.taken -= 1
+
+    def seats(self, taken, token=None):
+        out = []
+        cols = self.cols
+        now = datetime.now()
+        for r in range(self.num_rows):
+            for c in range(self.num_cols):
+                i = r * self.num_cols + c
+                is_taken = bool(self.bits[i >> 3] & (1 << (i & 7)))
+                if not is_taken and self.holds:
+                    is_taken = self._held(r + 1, cols[c], token, now)
+                if is_taken == taken:
+                    out.append((r + 1, cols[c]))
+        return out
+
+    def held_by(self, token):
+        now = datetime.now()
+        return [seat for seat, (t, expires_at) in self.holds.items() if t == token and expires_at > now]
+
+
+_seat_maps = {}                   # (FLIGHTNUM, ClassType) -> SeatMap
+_seat_maps_lock = threading.Lock()
+_seat_map_stats = cache_stats("seat_map", size=lambda: len(_seat_maps))
+
+
+def _seat_key(flight_num, class_type):
+    return (str(flight_num).strip().upper(), str(class_type))
+
+
+def _load_seat_map(flight_num, class_type):
+    # layout + every active ticket of this class in one query
     with db_cur() as cursor:
         cursor.execute("""
-            SELECT al.NumRows, al.NumCols
+            SELECT al.NumRows, al.NumCols, t.SeatRow, t.SeatCol, o.OrderStatus
             FROM Flights f
-            JOIN AircraftLayout al ON f.TailNum = al.TailNum
-            WHERE f.FlightNum = %s AND al.ClassType = %s
-        """, (flight_num, class_type))
-        row = cursor.fetchone()
-    if not row:
-        return 0, 0
-    return int(row["NumRows"]), int(row["NumCols"])
+            JOIN AircraftLayout al ON al.TailNum = f.TailNum AND al.ClassType = %s
+            LEFT JOIN Tickets t ON t.FlightNum = f.FlightNum AND t.ClassType = al.ClassType
+            LEFT JOIN Orders o ON o.OrderID = t.OrderID
+            WHERE f.FlightNum = %s
+        """, (class_type, flight_num))
+        rows = cursor.fetchall()
+
+    if not rows:
+        return None
+
+    seat_map = SeatMap(rows[0]["NumRows"], rows[0]["NumCols"])
+    for r in rows:
+        if r["SeatRow"] is None or r["OrderStatus"] in ("CustCancelled", "SysCancelled"):
+            continue
+        seat_map.set_taken(r["SeatRow"], r["SeatCol"])
 
-def get_taken_seats(flight_num, class_type):
     with db_cur() as cursor:
         cursor.execute("""
-            SELECT t.SeatRow, t.SeatCol
-            FROM Tickets t
-            JOIN Orders o ON t.OrderID = o.OrderID
-            WHERE t.FlightNum = %s
-              AND t.ClassType = %s
-              AND o.OrderStatus NOT IN ('CustCancelled', 'SysCancelled')
-        """, (flight_num, class_type))
-        return cursor.fetchall()
+            SELECT SeatRow, SeatCol, HoldToken, ExpiresAt
+            FROM SeatHolds
+            WHERE FlightNum = %s AND ClassType = %s AND ExpiresAt > %s
+        """, (flight_num, class_type, datetime.now()))
+        for h in cursor.fetchall():
+            seat_map.holds[(int(h["SeatRow"]), h["SeatCol"].upper())] = (h["HoldToken"], h["ExpiresAt"])
+    return seat_map
+
+
+def get_seat_map(flight_num, class_type):
+    """Cached SeatMap (loaded lazily, reloaded after SEAT_INVENTORY_TTL). None if no layout."""
+    key = _seat_key(flight_num, class_type)
+    with _seat_maps_lock:
+        seat_map = _seat_maps.get(key)
+    if seat_map is not None and _clock.monotonic() - seat_map.loaded_at < SEAT_INVENTORY_TTL:
+        _seat_map_stats.hits += 1
+        return seat_map
+
+    _seat_map_stats.misses += 1
+    seat_map = _load_seat_map(flight_num, class_type)
+    if seat_map is not None:
+        with _seat_maps_lock:
+            _seat_maps[key] = seat_map
+    return seat_map
+
+
+def _seat_maps_mark(flight_num, class_type, seats, taken=True):
+    # only touch a map that is already cached (otherwise next read loads it fresh)
+    key = _seat_key(flight_num, class_type)
+    with _seat_maps_lock:
+        seat_map = _seat_maps.get(key)
+        if seat_map is not None:
+            for row, col in seats:
+                seat_map.set_taken(row, col, taken)
+
+
+def invalidate_seat_maps(flight_nums, class_type=None):
+    flight_keys = {str(fn).strip().upper() for fn in flight_nums}
+    with _seat_maps_lock:
+        for key in list(_seat_maps):
+            if key[0] in flight_keys and (class_type is None or key[1] == class_type):
+                del _seat_maps[key]
+
+
+@on_data_change("seats")
+def _on_seats_change(key):
+    if key is None:
+        with _seat_maps_lock:
+            _seat_maps.clear()
+    else:
+        flight_num, _, class_type = key.partition("|")
+        invalidate_seat_maps([flight_num], class_type or None)
+
+
+def get_seat_grid(flight_num, class_type, hold_token=None):
+    """
+    Everything the seat-selection page needs, from the cached map.
+    Seats held by hold_token stay selectable (and are listed in held).
+    Returns: (num_rows, cols, occupied {"row-COL"}, available_count, held {"row-COL"})
+    """
+    seat_map = get_seat_map(flight_num, class_type)
+    if seat_map is None:
+        return 0, [], set(), 0, set()
+    with _seat_maps_lock:
+        occupied = {f"{r}-{c}" for r, c in seat_map.seats(taken=True, token=hold_token)}
+        held = {f"{r}-{c}" for r, c in seat_map.held_by(hold_token)} if hold_token else set()
+    available_count = seat_map.num_rows * seat_map.num_cols - len(occupied)
+    return seat_map.num_rows, seat_map.cols, occupied, available_count, held
+
+
+def seats_are_free(flight_num, class_type, seats, hold_token=None):
+    """seats: list of (row, col). True only if every seat exists in the cabin and is free (or held by hold_token)."""
+    seat_map = get_seat_map(flight_num, class_type)
+    if seat_map is None:
+        return False
+    with _seat_maps_lock:
+        return all(not seat_map.is_taken(r, c, hold_token) for r, c in seats)
+
+
+def get_taken_seats(flight_num, class_type, hold_token=None):
+    seat_map = get_seat_map(flight_num, class_type)
+    if seat_map is None:
+        return []
+    with _seat_maps_lock:
+        return [{"SeatRow": r, "SeatCol": c} for r, c in seat_map.seats(taken=True, token=hold_token)]
 
 
-def list_available_seats(flight_num, class_type):
-    num_rows, num_cols = get_layout_for_flight(flight_num, class_type)
-    if not num_rows or not num_cols:
+def list_available_seats(flight_num, class_type, hold_token=None):
+    seat_map = get_seat_map(flight_num, class_type)
+    if seat_map is None:
         return []
+    with _seat_maps_lock:
+        return [{"row": r, "col": c} for r, c in seat_map.seats(taken=False, token=hold_token)]
+
+
+# ==========================================================
+# SEAT HOLDS (seats reserved for one visitor while they finish the booking)
+# ==========================================================
+SEAT_HOLD_SECONDS = int(os.environ.get("SEAT_HOLD_SECONDS", "300"))
+SEAT_HOLD_SWEEP_SECONDS = float(os.environ.get("SEAT_HOLD_SWEEP_SECONDS", "60"))
+SEAT_HOLD_SWEEP_BATCH = int(os.environ.get("SEAT_HOLD_SWEEP_BATCH", "1000"))
+
+_holds_next_sweep = 0.0
+_holds_sweeping = threading.Lock()
+
+
+def _seat_pairs_sql(seats):
+    # "(SeatRow, SeatCol) IN (...)" for [(row, COL)]
+    return "(SeatRow, SeatCol) IN (" + ",".join(["(%s,%s)"] * len(seats)) + ")", \
+        [x for r, c in seats for x in (int(r), str(c).upper())]
+
+
+def _seat_maps_set_holds(flight_num, class_type, token, seats=(), expires_at=None):
+    # replace this token's holds on the flight in the cached maps (no map cached -> next read loads them)
+    key = _seat_key(flight_num, class_type)
+    with _seat_maps_lock:
+        for map_key, seat_map in _seat_maps.items():
+            if map_key[0] != key[0]:
+                continue
+            for seat in [s for s, h in seat_map.holds.items() if h[0] == token]:
+                del seat_map.holds[seat]
+            if map_key == key:
+                for r, c in seats:
+                    seat_map.holds[(int(r), str(c).upper())] = (token, expires_at)
+
+
+def hold_seats(flight_num, class_type, seats, token):
+    """
+    Hold seats [(row, col)] for SEAT_HOLD_SECONDS on behalf of token (replaces the token's
+    earlier holds on this flight). Other visitors see them as taken until the hold expires
+    or the holder books them.
+    Returns: (ok: bool, expires_at or error message)
+    """
+    seats = [(int(r), str(c).upper()) for r, c in seats]
+    if not seats or not seats_are_free(flight_num, class_type, seats, hold_token=token):
+        return False, "One or more selected seats were taken. Please try again."
+
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=SEAT_HOLD_SECONDS)
+    in_seats, seat_params = _seat_pairs_sql(seats)
+    try:
+        with db_tx() as cursor:
+            # the seat map may be this worker's stale copy: a booked seat has a Tickets row
+            # (unique on FlightNum, SeatRow, SeatCol -> one index lookup per seat)
+            cursor.execute(f"""
+                SELECT COUNT(*) AS N FROM Tickets
+                WHERE FlightNum = %s AND {in_seats}
+            """, (flight_num, *seat_params))
+            if int(cursor.fetchone()["N"]):
+                invalidate_seat_maps([flight_num], class_type)
+                return False, "One or more selected seats were taken. Please try again."
+
+            cursor.execute("DELETE FROM SeatHolds WHERE HoldToken = %s AND FlightNum = %s", (token, flight_num))
+            cursor.execute(f"""
+                DELETE FROM SeatHolds
+                WHERE FlightNum = %s AND ExpiresAt <= %s AND {in_seats}
+            """, (flight_num, now, *seat_params))
+            cursor.executemany("""
+                INSERT INTO SeatHolds (FlightNum, SeatRow, SeatCol, ClassType, HoldToken, ExpiresAt)
+                VALUES (%s,%s,%s,%s,%s,%s)
+            """, [(flight_num, r, c, class_type, token, expires_at) for r, c in seats])
+            # no class in the key: the token's old holds may have been in the other class
+            log_data_change(cursor, "seats", f"{flight_num}|")
+    except mysql.connector.errors.IntegrityError:
+        invalidate_seat_maps([flight_num], class_type)
+        return False, "One or more selected seats are held by another customer. Please pick others."
+
+    _seat_maps_set_holds(flight_num, class_type, token, seats, expires_at)
+    _maybe_sweep_seat_holds()
+    return True, expires_at
+
+
+def sweep_seat_holds(batch=None):
+    """Delete expired holds, batch rows per statement (short locks). Returns how many."""
+    batch = int(batch or SEAT_HOLD_SWEEP_BATCH)
+    removed = 0
+    while True:
+        with db_tx() as cursor:
+            cursor.execute("DELETE FROM SeatHolds WHERE ExpiresAt <= %s LIMIT %s", (datetime.now(), batch))
+            n = cursor.rowcount
+        removed += n
+        if n < batch:
+            return removed
 
-    letters = [chr(ord("A") + i) for i in range(num_cols)]
 
-    taken_rows = get_taken_seats(flight_num, class_type)
-    taken_set = {(int(t["SeatRow"]), str(t["SeatCol"]).upper()) for t in taken_rows}
+def _maybe_sweep_seat_holds():
+    # expired holds already count as free; the sweep only keeps the table small
+    global _holds_next_sweep
+    if _clock.monotonic() < _holds_next_sweep or not _holds_sweeping.acquire(blocking=False):
+        return
+    _holds_next_sweep = _clock.monotonic() + SEAT_HOLD_SWEEP_SECONDS
 
-    available = []
-    for r in range(1, num_rows + 1):
-        for c in letters:
-            if (r, c) not in taken_set:
-                available.append({"row": r, "col": c})
-    return available
+    def run():
+        try:
+            sweep_seat_holds()
+        except Exception:
+            pass   # next sweep will try again
+        finally:
+            _holds_sweeping.release()
+
+    threading.Thread(target=run, name="seat-hold-sweep", daemon=True).start()
+
+
+# ==========================================================
+# AUTO SEAT ASSIGNMENT (best block from the seat map, booked with retry)
+# ==========================================================
+AUTO_ASSIGN_ATTEMPTS = int(os.environ.get("AUTO_ASSIGN_ATTEMPTS", "3"))
+
+
+def _free_runs(seat_map, row, token=None):
+    # contiguous free column ranges of one row: [(first col index, length)]
+    runs, start = [], None
+    for c in range(seat_map.num_cols + 1):
+        free = c < seat_map.num_cols and not seat_map.is_taken(row, chr(ord("A") + c), token)
+        if free and start is None:
+            start = c
+        elif not free and start is not None:
+            runs.append((start, c - start))
+            start = None
+    return runs
+
+
+def find_seat_block(seat_map, qty, token=None):
+    """
+    Best `qty` free seats as [(row, col)], or None if the class has fewer free seats.
+    1. one row, side by side (frontmost row, smallest run that fits - keeps big runs for big groups)
+    2. otherwise the fewest consecutive rows holding qty free seats, filled run by run
+       (largest runs first), so the group stays as close together as possible
+    Seats held by someone other than token count as taken.
+    """
+    qty = int(qty)
+    if qty < 1 or seat_map.free < qty:
+        return None
+
+    rows = {r: _free_runs(seat_map, r, token) for r in range(1, seat_map.num_rows + 1)}
+
+    best = None   # (run length, row, start col)
+    for r, runs in rows.items():
+        for start, length in runs:
+            if length >= qty and (best is None or length < best[0]):
+                best = (length, r, start)
+    if best is not None:
+        _, r, start = best
+        return [(r, chr(ord("A") + start + i)) for i in range(qty)]
+
+    counts = {r: sum(length for _, length in runs) for r, runs in rows.items()}
+    window = None   # (number of rows, first row)
+    for first in range(1, seat_map.num_rows + 1):
+        total, last = 0, first
+        while last <= seat_map.num_rows:
+            total += counts[last]
+            if total >= qty:
+                break
+            last += 1
+        if total < qty:
+            break
+        if window is None or last - first + 1 < window[0]:
+            window = (last - first + 1, first)
+    if window is None:
+        return None   # enough unsold seats, but some are held
+
+    _, first = window
+    picked = []
+    for r in range(first, first + window[0]):
+        for start, length in sorted(rows[r], key=lambda run: -run[1]):
+            for i in range(length):
+                if len(picked) == qty:
+                    return picked
+                picked.append((r, chr(ord("A") + start + i)))
+    return picked
+
+
+def auto_book_order(flight_num, class_type, qty, passenger_name, total_price,
+                    registered_email=None, guest_email=None, guest_first="Guest", guest_last="User",
+                    hold_token=None, request_key=None):
+    """
+    Pick the best block (find_seat_block) and book it with book_order.
+    If another booking wins one of the seats, book_order drops the cached map, so the next
+    attempt picks from fresh data (up to AUTO_ASSIGN_ATTEMPTS tries).
+    Returns: (ok: bool, order_id or error message, seats [(row, col)] or None)
+    """
+    for _ in range(max(1, AUTO_ASSIGN_ATTEMPTS)):
+        seat_map = get_seat_map(flight_num, class_type)
+        if seat_map is None:
+            return False, "No seat layout for this class.", None
+        with _seat_maps_lock:
+            seats = find_seat_block(seat_map, qty, hold_token)
+        if seats is None:
+            return False, f"Not enough free seats in {class_type}.", None
+
+        ok, order_id_or_err = book_order(
+            flight_num, class_type, seats, passenger_name, total_price,
+            registered_email=registered_email, guest_email=guest_email,
+            guest_first=guest_first, guest_last=guest_last, hold_token=hold_token,
+            request_key=request_key
+        )
+        if ok:
+            return True, order_id_or_err, seats
+
+    return False, "Seats are selling fast. Please try again.", None
 
 
 # ==========================================================
 # ORDERS & TICKETS
 # ==========================================================
 def create_order(guest_email, registered_email, total_price, status="Active"):
-    with db_cur() as cursor:
+    now = datetime.now()
+    with db_tx() as cursor:
         cursor.execute("""
             INSERT INTO Orders (GuestEmail, RegisteredEmail, OrderDate, TotalPrice, OrderStatus)
             VALUES (%s,%s,%s,%s,%s)
-        """, (guest_email, registered_email, datetime.now(), total_price, status))
-        return cursor.lastrowid
+        """, (guest_email, registered_email, now, total_price, status))
+        order_id = cursor.lastrowid
+        _report_orders_delta(cursor, [(status, now.date(), 1, total_price)])
+        _orders_changed(cursor, [registered_email])
+        return order_id
 
 
 def add_ticket(order_id, flight_num, passenger_name, class_type, seat_row, seat_col):
     try:
-        with db_cur() as cursor:
+        with db_tx() as cursor:
+            cursor.execute("""
+                INSERT INTO Tickets
+                (OrderID, FlightNum, PassengerName, ClassType, SeatRow, SeatCol)
+                VALUES (%s,%s,%s,%s,%s,%s)
+            """, (order_id, flight_num, passenger_name, class_type, seat_row, seat_col))
+            _seat_counters_add(cursor, flight_num, class_type, 1)
+
+            # first ticket of this class in an active order -> order counts toward that class
+            cursor.execute("""
+                SELECT o.TotalPrice, o.OrderStatus,
+                       (SELECT COUNT(*) FROM Tickets t WHERE t.OrderID = o.OrderID AND t.ClassType = %s) AS Cnt
+                FROM Orders o
+                WHERE o.OrderID = %s
+            """, (class_type, order_id))
+            o = cursor.fetchone()
+            if o and int(o["Cnt"]) == 1 and o["OrderStatus"] not in ("CustCancelled", "SysCancelled"):
+                _report_class_delta(cursor, [(class_type, o["TotalPrice"])])
+        _seat_maps_mark(flight_num, class_type, [(seat_row, seat_col)])
+        return True, None
+
+    except mysql.connector.errors.IntegrityError:
+        invalidate_seat_maps([flight_num], class_type)
+        return False, "This seat was already taken. Please select another seat."
+
+
+# ---------- idempotent submissions (Orders.RequestKey) ----------
+BOOKING_KEY_TTL = float(os.environ.get("BOOKING_KEY_TTL", "900"))
+
+# RequestKey -> (OrderID, email); only keys that produced an order are kept
+_booking_keys = TTLCache("booking_keys", 10000, BOOKING_KEY_TTL)
+
+
+def find_order_by_request_key(request_key):
+    """(OrderID, email) of the order a booking form with this key already created, else None."""
+    if not request_key:
+        return None
+    done = _booking_keys.get(request_key)
+    if done is not MISSING:
+        return done
+
+    with db_cur() as cursor:
+        cursor.execute("""
+            SELECT OrderID, COALESCE(RegisteredEmail, GuestEmail) AS Email
+            FROM Orders
+            WHERE RequestKey = %s
+        """, (request_key,))
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    done = (row["OrderID"], row["Email"])
+    _booking_keys.set(request_key, done)
+    return done
+
+
+def book_order(flight_num, class_type, seats, passenger_name, total_price,
+               registered_email=None, guest_email=None, guest_first="Guest", guest_last="User",
+               hold_token=None, request_key=None):
+    """
+    Whole booking in ONE transaction:
+    hold check -> guest upsert -> order -> all tickets (one batched insert) -> flight status refresh.
+    seats: list of (row, col)
+    hold_token: the booker's holds are allowed (and released); anyone else's active hold blocks.
+    request_key: stored on the order (unique); a second booking with the same key returns the
+    first order instead of booking again.
+    Returns: (ok: bool, order_id or error message). If any seat is taken nothing is saved.
+    """
+    in_seats, seat_params = _seat_pairs_sql(seats)
+    try:
+        with db_tx() as cursor:
+            now = datetime.now()
+            cursor.execute(f"""
+                SELECT COUNT(*) AS N FROM SeatHolds
+                WHERE FlightNum = %s AND ExpiresAt > %s AND HoldToken <> %s AND {in_seats}
+            """, (flight_num, now, hold_token or "", *seat_params))
+            if int(cursor.fetchone()["N"]):
+                invalidate_seat_maps([flight_num], class_type)
+                return False, "One or more selected seats are held by another customer. Please pick others."
+
+            if guest_email:
+                cursor.execute("""
+                    INSERT INTO GuestCustomers (Email, FirstlNameEnglish, LastlNameEnglish)
+                    VALUES (%s,%s,%s)
+                    ON DUPLICATE KEY UPDATE Email=Email
+                """, (guest_email, guest_first or "Guest", guest_last or "User"))
+
             cursor.execute("""
+                INSERT INTO Orders (GuestEmail, RegisteredEmail, OrderDate, TotalPrice, OrderStatus, RequestKey)
+                VALUES (%s,%s,%s,%s,%s,%s)
+            """, (guest_email, registered_email, now, total_price, "Active", request_key))
+            order_id = cursor.lastrowid
+
+            cursor.executemany("""
                 INSERT INTO Tickets
                 (OrderID, FlightNum, PassengerName, ClassType, SeatRow, SeatCol)
                 VALUES (%s,%s,%s,%s,%s,%s)
-            """, (order_id, flight_num, passenger_name, class_type, seat_row, seat_col))
-        return True, None
+            """, [(order_id, flight_num, passenger_name, class_type, int(r), str(c).upper()) for r, c in seats])
+            if hold_token:
+                cursor.execute("DELETE FROM SeatHolds WHERE HoldToken = %s AND FlightNum = %s", (hold_token, flight_num))
+
+            _seat_counters_add(cursor, flight_num, class_type, len(seats))
+            _orders_changed(cursor, [registered_email])
+            _report_orders_delta(cursor, [("Active", now.date(), 1, total_price)])
+            _report_class_delta(cursor, [(class_type, total_price)])
+            _refresh_flight_status(cursor, flight_num)
+        _seat_maps_mark(flight_num, class_type, seats)
+        if hold_token:
+            _seat_maps_set_holds(flight_num, class_type, hold_token)
+        if request_key:
+            _booking_keys.set(request_key, (order_id, registered_email or guest_email))
+        return True, order_id
 
     except mysql.connector.errors.IntegrityError:
-        return False, "This seat was already taken. Please select another seat."
+        # same form submitted twice at once: the other request created the order
+        done = find_order_by_request_key(request_key)
+        if done is not None:
+            return True, done[0]
+        # our cached map was behind the DB -> reload on next read
+        invalidate_seat_maps([flight_num], class_type)
+        return False, "One or more selected seats were taken. Please try again."
 
 
 def get_order_by_id_and_email(order_id, email):
@@ -259,10 +1757,77 @@ def can_cancel_order(order, hours_before=36):
 
     return True, "OK"
 
+def _cancel_orders_cur(cursor, order_ids, status, keep_rate):
+    """
+    Set-based cancel for a list of orders (inside the caller's transaction):
+    - OrderStatus=status, TotalPrice=TotalPrice*keep_rate (0 => full refund, 0.05 => 5% fee)
+    - delete their tickets (seats are released)
+    - give the seats back to FlightSeatCounters and move the orders in the report rollups
+    Returns: list of FlightNum that lost tickets (caller refreshes their status).
+    """
+    if not order_ids:
+        return []
+
+    placeholders = ",".join(["%s"] * len(order_ids))
+    ids = tuple(order_ids)
+
+    # order totals + seats per order/flight/class BEFORE changing anything
+    cursor.execute(f"""
+        SELECT OrderID, OrderStatus, DATE(OrderDate) AS Day, TotalPrice, RegisteredEmail
+        FROM Orders
+        WHERE OrderID IN ({placeholders})
+    """, ids)
+    orders = cursor.fetchall()
+    _orders_changed(cursor, [o["RegisteredEmail"] for o in orders])
+
+    cursor.execute(f"""
+        SELECT OrderID, FlightNum, ClassType, COUNT(*) AS Cnt
+        FROM Tickets
+        WHERE OrderID IN ({placeholders})
+        GROUP BY OrderID, FlightNum, ClassType
+    """, ids)
+    released = cursor.fetchall()
+
+    cursor.execute(
+        f"UPDATE Orders SET OrderStatus=%s, TotalPrice=ROUND(TotalPrice * %s, 2) WHERE OrderID IN ({placeholders})",
+        (status, keep_rate) + ids
+    )
+    cursor.execute(f"DELETE FROM Tickets WHERE OrderID IN ({placeholders})", ids)
+
+    seats = {}
+    for r in released:
+        key = (r["FlightNum"], r["ClassType"])
+        seats[key] = seats.get(key, 0) + int(r["Cnt"])
+    for (fn, cls), cnt in seats.items():
+        _seat_counters_add(cursor, fn, cls, -cnt)
+
+    # rollups: order leaves its old status and joins the new one with the new total
+    rate = Decimal(str(keep_rate))
+    order_moves = []
+    class_moves = []
+    active_totals = {}
+    for o in orders:
+        old_total = Decimal(o["TotalPrice"] or 0)
+        new_total = (old_total * rate).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        order_moves.append((o["OrderStatus"], o["Day"], -1, -old_total))
+        order_moves.append((status, o["Day"], 1, new_total))
+        if o["OrderStatus"] not in ("CustCancelled", "SysCancelled"):
+            active_totals[o["OrderID"]] = old_total
+
+    for oid, cls in {(r["OrderID"], r["ClassType"]) for r in released}:
+        if oid in active_totals:
+            class_moves.append((cls, -active_totals[oid]))
+
+    _report_orders_delta(cursor, order_moves)
+    _report_class_delta(cursor, class_moves)
+
+    return sorted({fn for fn, _ in seats})
+
+
 def cancel_order_with_fee(order_id, by_system=False):
     status = "SysCancelled" if by_system else "CustCancelled"
 
-    with db_cur() as cursor:
+    with db_tx() as cursor:
         # get order
         cursor.execute(
             "SELECT TotalPrice FROM Orders WHERE OrderID=%s",
@@ -272,38 +1837,50 @@ def cancel_order_with_fee(order_id, by_system=False):
         if not row:
             return False, "Order not found."
 
-        # save flights BEFORE deleting tickets
-        cursor.execute(
-            "SELECT DISTINCT FlightNum FROM Tickets WHERE OrderID=%s",
-            (order_id,)
-        )
-        flights = [r["FlightNum"] for r in cursor.fetchall()]
+        # status + 5% fee + free seats + counters
+        flights = _cancel_orders_cur(cursor, [order_id], status, keep_rate=0.05)
 
-        total = float(row["TotalPrice"] or 0)
-        fee = round(total * 0.05, 2)
-        new_total = fee
+        # update flight status AFTER seats are released
+        for fn in flights:
+            _refresh_flight_status(cursor, fn)
 
-        # 1) update order status + total
-        cursor.execute(
-            "UPDATE Orders SET OrderStatus=%s, TotalPrice=%s WHERE OrderID=%s",
-            (status, new_total, order_id)
-        )
+    invalidate_seat_maps(flights)
+    return True, "Order cancelled and seats released."
 
-        # 2) free seats (delete tickets)
-        cursor.execute(
-            "DELETE FROM Tickets WHERE OrderID=%s",
-            (order_id,)
-        )
 
-    # 3) update flight status AFTER seats are released
-    for fn in flights:
-        update_flight_status_full_if_needed(fn)
 
-    return True, "Order cancelled and seats released."
+ORDERS_CACHE_TTL = float(os.environ.get("ORDERS_CACHE_TTL", "60"))
+
+# (email, status) -> order rows
+_orders_cache = TTLCache("orders_by_email", 2000, ORDERS_CACHE_TTL)
+
+
+def _invalidate_orders(email):
+    email = (email or "").strip().lower()
+    _orders_cache.invalidate(lambda key: key[0] == email)
+
 
+def _orders_changed(cursor, emails):
+    for email in {e for e in emails if e}:
+        log_data_change(cursor, "orders", email.lower())
+        _after_commit(lambda email=email: _invalidate_orders(email))
+
+
+@on_data_change("orders")
+def _on_orders_change(key):
+    if key is None:
+        _orders_cache.invalidate()
+    else:
+        _invalidate_orders(key)
 
 
 def get_registered_orders(email, status=None):
+    key = ((email or "").strip().lower(), status or None)
+    cached = _orders_cache.get(key)
+    if cached is not MISSING:
+        return [dict(r) for r in cached]
+
+    generation = _orders_cache.generation
     query = "SELECT * FROM Orders WHERE RegisteredEmail=%s"
     params = [email]
     if status:
@@ -313,32 +1890,24 @@ def get_registered_orders(email, status=None):
 
     with db_cur() as cursor:
         cursor.execute(query, tuple(params))
-        return cursor.fetchall()
+        rows = cursor.fetchall()
+    _orders_cache.set(key, rows, generation)
+    return [dict(r) for r in rows]
 
 # ==========================================================
 # ADMIN HELPERS
 # ==========================================================
 def admin_list_routes():
-    with db_cur() as cursor:
-        cursor.execute("""
-            SELECT RouteID, SourceAirport, DestAirport, DurationMinutes
-            FROM Routes
-            ORDER BY SourceAirport, DestAirport
-        """)
-        return cursor.fetchall()
+    routes = reference().routes.values()
+    return [dict(r) for r in sorted(routes, key=lambda r: (r["SourceAirport"], r["DestAirport"]))]
 
 def admin_list_aircrafts():
-    with db_cur() as cursor:
-        cursor.execute("""
-            SELECT TailNum, Manufacturer, Size, PurchaseDate
-            FROM Aircrafts
-            ORDER BY TailNum
-        """)
-        return cursor.fetchall()
+    aircraft = reference().aircraft.values()
+    return [dict(a) for a in sorted(aircraft, key=lambda a: a["TailNum"])]
 
 def admin_create_flight(flight_num, route_id, tail_num, departure_date, departure_time, status="Active"):
     try:
-        with db_cur() as cursor:
+        with db_tx() as cursor:
             cursor.execute("SELECT FlightNum FROM Flights WHERE FlightNum=%s", (flight_num,))
             if cursor.fetchone():
                 return False, "Flight number already exists."
@@ -347,6 +1916,13 @@ def admin_create_flight(flight_num, route_id, tail_num, departure_date, departur
                 INSERT INTO Flights (FlightNum, RouteID, TailNum, DepartureTime, DepartureDate, StatusF)
                 VALUES (%s,%s,%s,%s,%s,%s)
             """, (flight_num, route_id, tail_num, departure_time, departure_date, status))
+            _report_flight_status_delta(cursor, None, status)
+            _aircraft_changed(cursor, tail_num)
+
+            cursor.execute("SELECT SourceAirport, DestAirport FROM Routes WHERE RouteID=%s", (route_id,))
+            r = cursor.fetchone()
+            if r:
+                _search_changed(cursor, departure_date, r["SourceAirport"], r["DestAirport"])
         return True, "Flight created."
     except Exception as e:
         return False, str(e)
@@ -360,27 +1936,28 @@ def admin_set_flight_status(flight_num, status):
     if status not in allowed:
         return False, "Invalid status."
 
-    with db_cur() as cursor:
-        # update using TRIM + case-insensitive compare
+    with db_tx() as cursor:
+        # flight_num is already trimmed and the column collation is case-insensitive,
+        # so a plain equality finds the row by primary key (lock it, we need the old status)
         cursor.execute("""
-            UPDATE Flights
-            SET StatusF = %s
-            WHERE UPPER(TRIM(FlightNum)) = UPPER(TRIM(%s))
-        """, (status, flight_num))
-
-        if cursor.rowcount == 0:
-            # extra check: does it exist but update didn't match?
-            cursor.execute("""
-                SELECT FlightNum, StatusF
-                FROM Flights
-                WHERE UPPER(TRIM(FlightNum)) = UPPER(TRIM(%s))
-                LIMIT 1
-            """, (flight_num,))
-            exists = cursor.fetchone()
-            if exists:
-                return False, f"Flight exists but status update failed. Current status: {exists.get('StatusF')}"
+            SELECT f.FlightNum, f.StatusF, f.DepartureDate, f.TailNum, r.SourceAirport, r.DestAirport
+            FROM Flights f
+            JOIN Routes r ON r.RouteID = f.RouteID
+            WHERE f.FlightNum = %s
+            LIMIT 1
+            FOR UPDATE
+        """, (flight_num,))
+        f = cursor.fetchone()
+        if not f:
             return False, "Flight not found."
 
+        if f["StatusF"] != status:
+            cursor.execute("UPDATE Flights SET StatusF = %s WHERE FlightNum = %s", (status, f["FlightNum"]))
+            _report_flight_status_delta(cursor, f["StatusF"], status)
+            _search_changed(cursor, f["DepartureDate"], f["SourceAirport"], f["DestAirport"])
+            if "Canceled" in (f["StatusF"], status):
+                _aircraft_changed(cursor, f["TailNum"])
+
     return True, "Status updated."
 
 
@@ -390,15 +1967,24 @@ def admin_cancel_flight(flight_num):
         return False, "Flight number is required."
 
     try:
-        with db_cur() as cursor:
+        with db_tx() as cursor:
             # 1) flight exists?
-            cursor.execute("SELECT FlightNum, StatusF FROM Flights WHERE FlightNum=%s", (flight_num,))
+            cursor.execute("""
+                SELECT f.FlightNum, f.StatusF, f.DepartureDate, f.TailNum, r.SourceAirport, r.DestAirport
+                FROM Flights f
+                JOIN Routes r ON r.RouteID = f.RouteID
+                WHERE f.FlightNum=%s
+            """, (flight_num,))
             f = cursor.fetchone()
             if not f:
                 return False, "Flight not found."
 
             # 2) set flight status to Canceled
             cursor.execute("UPDATE Flights SET StatusF='Canceled' WHERE FlightNum=%s", (flight_num,))
+            if f["StatusF"] != "Canceled":
+                _report_flight_status_delta(cursor, f["StatusF"], "Canceled")
+                _search_changed(cursor, f["DepartureDate"], f["SourceAirport"], f["DestAirport"])
+                _aircraft_changed(cursor, f["TailNum"])
 
             # 3) cancel all orders that have tickets on this flight (system cancel)
             #    (We only change orders that are not already cancelled)
@@ -411,28 +1997,166 @@ def admin_cancel_flight(flight_num):
             """, (flight_num,))
             order_ids = [r["OrderID"] for r in cursor.fetchall()]
 
-            if order_ids:
-                # mark all as SysCancelled + refund full (TotalPrice=0)
-                placeholders = ",".join(["%s"] * len(order_ids))
-                cursor.execute(
-                    f"UPDATE Orders SET OrderStatus='SysCancelled', TotalPrice=0 WHERE OrderID IN ({placeholders})",
-                    tuple(order_ids)
-                )
+            # 4) mark all as SysCancelled + refund full (TotalPrice=0) + release seats
+            flights = _cancel_orders_cur(cursor, order_ids, "SysCancelled", keep_rate=0)
 
-                # 4) release seats -> delete tickets of those cancelled orders
-                cursor.execute(
-                    f"DELETE FROM Tickets WHERE OrderID IN ({placeholders})",
-                    tuple(order_ids)
-                )
+            # other flights on the same orders got seats back
+            for fn in flights:
+                if fn != flight_num:
+                    _refresh_flight_status(cursor, fn)
 
+        invalidate_seat_maps(flights + [flight_num])
         return True, f"Flight {flight_num} canceled. {len(order_ids)} order(s) were system-canceled and seats released."
     except Exception as e:
         return False, str(e)
 
 
+# ---------- bulk cancellation (weather, grounded aircraft, ...) ----------
+BULK_CANCEL_FLIGHT_CHUNK = int(os.environ.get("BULK_CANCEL_FLIGHT_CHUNK", "50"))
+BULK_CANCEL_ORDER_CHUNK = int(os.environ.get("BULK_CANCEL_ORDER_CHUNK", "200"))
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), max(1, size)):
+        yield items[i:i + size]
+
+
+def admin_bulk_cancel_flights(flight_nums=None, date_from=None, date_to=None, route_id=None,
+                              tail_num=None, progress=None):
+    """
+    Cancel every Active/Full flight in flight_nums, or matching the date range / route / aircraft
+    filter, and system-cancel (full refund) all orders holding tickets on them.
+    Runs as many short transactions instead of one long lock on Orders/Tickets:
+      1. flights, BULK_CANCEL_FLIGHT_CHUNK per transaction (status, rollups, search caches)
+      2. their orders, BULK_CANCEL_ORDER_CHUNK per transaction (_cancel_orders_cur), each one
+         also re-checking the status of other flights that got seats back
+    Canceled flights of the selection that still have live orders (a run that stopped half way)
+    are selected again, so running the same cancellation again finishes the job.
+    progress(stage, done, total) is called after every chunk ("flights", "orders").
+    Returns: (ok, summary {"flights", "orders", "refreshed"} or error message)
+    """
+    flight_nums = [fn.strip() for fn in (flight_nums or []) if fn and fn.strip()]
+    where, params = ["""(
+        f.StatusF IN ('Active', 'Full')
+        OR (f.StatusF = 'Canceled' AND EXISTS (
+            SELECT 1 FROM Tickets t
+            JOIN Orders o ON o.OrderID = t.OrderID
+            WHERE t.FlightNum = f.FlightNum
+              AND o.OrderStatus NOT IN ('CustCancelled', 'SysCancelled')
+        ))
+    )"""], []
+    if flight_nums:
+        where.append(f"f.FlightNum IN ({','.join(['%s'] * len(flight_nums))})")
+        params += flight_nums
+    if date_from:
+        where.append("f.DepartureDate >= %s")
+        params.append(date_from)
+    if date_to:
+        where.append("f.DepartureDate <= %s")
+        params.append(date_to)
+    if route_id:
+        where.append("f.RouteID = %s")
+        params.append(int(route_id))
+    if tail_num:
+        where.append("f.TailNum = %s")
+        params.append(tail_num.strip())
+    if len(where) == 1:
+        return False, "Give flight numbers or at least one filter (dates, route, aircraft)."
+
+    with db_cur() as cursor:
+        cursor.execute(f"""
+            SELECT f.FlightNum FROM Flights f
+            WHERE {" AND ".join(where)}
+            ORDER BY f.DepartureDate, f.FlightNum
+        """, tuple(params))
+        targets = [r["FlightNum"] for r in cursor.fetchall()]
+
+    report = progress or (lambda stage, done, total: None)
+    summary = {"flights": 0, "orders": 0, "refreshed": 0}
+    target_set, canceled, touched, refreshed = set(targets), [], set(), set()
+
+    try:
+        for chunk in _chunks(targets, BULK_CANCEL_FLIGHT_CHUNK):
+            ph = ",".join(["%s"] * len(chunk))
+
+            # 1) flights: re-read under lock (status may have moved since the selection)
+            with db_tx() as cursor:
+                cursor.execute(f"""
+                    SELECT f.FlightNum, f.StatusF, f.DepartureDate, f.TailNum, r.SourceAirport, r.DestAirport
+                    FROM Flights f
+                    JOIN Routes r ON r.RouteID = f.RouteID
+                    WHERE f.FlightNum IN ({ph}) AND f.StatusF IN ('Active', 'Full', 'Canceled')
+                    FOR UPDATE
+                """, tuple(chunk))
+                flights = cursor.fetchall()
+                if not flights:
+                    continue
+                fns = [f["FlightNum"] for f in flights]
+                fresh = [f for f in flights if f["StatusF"] != "Canceled"]
+                if fresh:
+                    cursor.execute(
+                        f"UPDATE Flights SET StatusF='Canceled' WHERE FlightNum IN ({','.join(['%s'] * len(fresh))})",
+                        tuple(f["FlightNum"] for f in fresh)
+                    )
+                by_status = {}
+                for f in fresh:
+                    by_status[f["StatusF"]] = by_status.get(f["StatusF"], 0) + 1
+                for old_status, cnt in by_status.items():
+                    _report_flight_status_delta(cursor, old_status, "Canceled", cnt)
+                for day, src, dst in {(f["DepartureDate"], f["SourceAirport"], f["DestAirport"]) for f in fresh}:
+                    _search_changed(cursor, day, src, dst)
+                for tail in {f["TailNum"].upper() for f in fresh}:
+                    _aircraft_changed(cursor, tail)
+            canceled += fns
+            summary["flights"] += len(fresh)
+            report("flights", summary["flights"], len(targets))
+
+            # 2) orders with tickets on these flights (also those left by an earlier, stopped run)
+            with db_cur() as cursor:
+                cursor.execute(f"""
+                    SELECT DISTINCT t.OrderID
+                    FROM Tickets t
+                    JOIN Orders o ON o.OrderID = t.OrderID
+                    WHERE t.FlightNum IN ({','.join(['%s'] * len(fns))})
+                      AND o.OrderStatus NOT IN ('CustCancelled', 'SysCancelled')
+                """, tuple(fns))
+                order_ids = [r["OrderID"] for r in cursor.fetchall()]
+
+            for ids in _chunks(order_ids, BULK_CANCEL_ORDER_CHUNK):
+                with db_tx() as cursor:
+                    # skip orders the customer cancelled in the meantime (their fee stays)
+                    cursor.execute(f"""
+                        SELECT OrderID FROM Orders
+                        WHERE OrderID IN ({','.join(['%s'] * len(ids))})
+                          AND OrderStatus NOT IN ('CustCancelled', 'SysCancelled')
+                        FOR UPDATE
+                    """, tuple(ids))
+                    live = [r["OrderID"] for r in cursor.fetchall()]
+                    got_back = set(_cancel_orders_cur(cursor, live, "SysCancelled", keep_rate=0))
+
+                    # orders spanning other flights gave seats back there; re-checked in the
+                    # same transaction so a later failure leaves nothing stale behind
+                    others = sorted(got_back - target_set)
+                    for fn in others:
+                        _refresh_flight_status(cursor, fn)
+                touched |= got_back
+                refreshed.update(others)
+                summary["orders"] += len(live)
+                summary["refreshed"] = len(refreshed)
+                report("orders", summary["orders"], None)
+
+    except Exception as e:
+        return False, (f"Stopped after {summary['flights']} flight(s) and {summary['orders']} order(s); "
+                       f"run the same cancellation again to finish: {e}")
+    finally:
+        invalidate_seat_maps(canceled + sorted(touched))
+
+    return True, summary
+
+
 def admin_upsert_pricing(flight_num, econ_price, bus_price=None):
     try:
-        with db_cur() as cursor:
+        with db_tx() as cursor:
             if econ_price is None:
                 return False, "Economy price is required."
 
@@ -448,6 +2172,9 @@ def admin_upsert_pricing(flight_num, econ_price, bus_price=None):
                     VALUES (%s,'Business',%s)
                     ON DUPLICATE KEY UPDATE Price=VALUES(Price)
                 """, (flight_num, bus_price))
+
+            # one counter row per priced class
+            _seat_counters_rebuild_cur(cursor, flight_num)
         return True, "Pricing saved."
     except Exception as e:
         return False, str(e)
@@ -555,38 +2282,29 @@ def admin_can_cancel_order(order_id, hours_before=72):
 
 
 def admin_cancel_order_full(order_id):
-    with db_cur() as cursor:
+    with db_tx() as cursor:
         cursor.execute("SELECT OrderID FROM Orders WHERE OrderID=%s", (order_id,))
         if not cursor.fetchone():
             return False, "Order not found."
 
-        # save flights BEFORE deleting tickets
-        cursor.execute("SELECT DISTINCT FlightNum FROM Tickets WHERE OrderID=%s", (order_id,))
-        flights = [r["FlightNum"] for r in cursor.fetchall()]
-
-        # cancel order + full refund
-        cursor.execute("""
-            UPDATE Orders
-            SET OrderStatus='SysCancelled', TotalPrice=0
-            WHERE OrderID=%s
-        """, (order_id,))
-
-        # release seats
-        cursor.execute("DELETE FROM Tickets WHERE OrderID=%s", (order_id,))
+        # cancel order + full refund + release seats
+        flights = _cancel_orders_cur(cursor, [order_id], "SysCancelled", keep_rate=0)
 
-    # update flight status AFTER seats are released
-    for fn in flights:
-        update_flight_status_full_if_needed(fn)
+        # update flight status AFTER seats are released
+        for fn in flights:
+            _refresh_flight_status(cursor, fn)
 
+    invalidate_seat_maps(flights)
     return True, "Order cancelled by system (refund full) and seats released."
 
 
 def admin_report_orders_by_status():
     with db_cur() as cursor:
         cursor.execute("""
-            SELECT OrderStatus, COUNT(*) AS Cnt
-            FROM Orders
+            SELECT OrderStatus, SUM(Cnt) AS Cnt
+            FROM ReportOrderStatus
             GROUP BY OrderStatus
+            HAVING SUM(Cnt) > 0
             ORDER BY OrderStatus
         """)
         return cursor.fetchall()
@@ -596,7 +2314,7 @@ def admin_report_revenue_sum():
     with db_cur() as cursor:
         cursor.execute("""
             SELECT COALESCE(SUM(TotalPrice), 0) AS Revenue
-            FROM Orders
+            FROM ReportOrderStatus
             WHERE OrderStatus NOT IN ('CustCancelled', 'SysCancelled')
         """)
         row = cursor.fetchone()
@@ -606,14 +2324,38 @@ def admin_report_revenue_sum():
 def admin_report_cancelled_count():
     with db_cur() as cursor:
         cursor.execute("""
-            SELECT COUNT(*) AS Cnt
-            FROM Orders
+            SELECT COALESCE(SUM(Cnt), 0) AS Cnt
+            FROM ReportOrderStatus
             WHERE OrderStatus IN ('CustCancelled', 'SysCancelled')
         """)
         row = cursor.fetchone()
     return int(row["Cnt"] or 0)
 
-def admin_list_flights(status=None):
+ADMIN_FLIGHTS_PAGE_SIZE = int(os.environ.get("ADMIN_FLIGHTS_PAGE_SIZE", "50"))
+ADMIN_FLIGHTS_PAGE_MAX = 200
+
+
+def _flights_cursor_encode(row):
+    return f"{row['DepartureDate'].isoformat()}|{_to_time(row['DepartureTime']).strftime('%H:%M:%S')}|{row['FlightNum']}"
+
+
+def _flights_cursor_decode(after):
+    # "YYYY-MM-DD|HH:MM:SS|FlightNum" -> (date, time, flight_num) or None if broken
+    try:
+        d, t, fn = after.split("|", 2)
+        return _to_date(d), _to_time(t), fn
+    except Exception:
+        return None
+
+
+def admin_list_flights(status=None, date_from=None, date_to=None, route_id=None, tail_num=None,
+                       after=None, page_size=ADMIN_FLIGHTS_PAGE_SIZE):
+    """
+    One page of flights, newest first.
+    Keyset (seek) paging on (DepartureDate, DepartureTime, FlightNum): `after` is the cursor
+    returned with the previous page. All filters are applied in SQL.
+    Returns: (rows, next_cursor or None)
+    """
     query = """
         SELECT f.FlightNum, f.DepartureDate, f.DepartureTime, f.StatusF,
                r.SourceAirport, r.DestAirport, r.DurationMinutes,
@@ -628,15 +2370,101 @@ def admin_list_flights(status=None):
         query += " AND f.StatusF = %s"
         params.append(status)
 
-    query += " ORDER BY f.DepartureDate DESC, f.DepartureTime DESC"
+    if date_from:
+        query += " AND f.DepartureDate >= %s"
+        params.append(date_from)
+
+    if date_to:
+        query += " AND f.DepartureDate <= %s"
+        params.append(date_to)
+
+    if route_id:
+        query += " AND f.RouteID = %s"
+        params.append(int(route_id))
+
+    if tail_num:
+        query += " AND f.TailNum = %s"
+        params.append(tail_num)
+
+    seek = _flights_cursor_decode(after) if after else None
+    if seek:
+        d, t, fn = seek
+        # (date, time, flight) < cursor, written out so the index on DepartureDate can be used
+        query += """
+            AND (f.DepartureDate < %s
+                 OR (f.DepartureDate = %s AND (f.DepartureTime < %s
+                     OR (f.DepartureTime = %s AND f.FlightNum < %s))))
+        """
+        params.extend([d, d, t, t, fn])
+
+    page_size = max(1, min(int(page_size or ADMIN_FLIGHTS_PAGE_SIZE), ADMIN_FLIGHTS_PAGE_MAX))
+    query += " ORDER BY f.DepartureDate DESC, f.DepartureTime DESC, f.FlightNum DESC LIMIT %s"
+    params.append(page_size + 1)  # one extra row tells us if there is a next page
 
     with db_cur() as cursor:
         cursor.execute(query, tuple(params))
         rows = cursor.fetchall()
 
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = _flights_cursor_encode(rows[-1])
+
     for r in rows:
         r["ArrivalDateTime"] = compute_arrival_dt(r["DepartureDate"], r["DepartureTime"], r["DurationMinutes"])
-    return rows
+    return rows, next_cursor
+
+
+# ==========================================================
+# ADMIN DASHBOARD LOADER (independent queries in parallel)
+# ==========================================================
+DASHBOARD_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", "6"))
+DASHBOARD_QUERY_TIMEOUT = float(os.environ.get("DASHBOARD_QUERY_TIMEOUT", "5"))
+
+# keep 1 pool connection free for the request thread itself
+_dashboard_executor = ThreadPoolExecutor(
+    max_workers=max(1, min(DASHBOARD_WORKERS, DB_POOL_SIZE - 1)),
+    thread_name_prefix="dashboard"
+)
+
+
+def load_concurrently(tasks, timeout=None, timeouts=None):
+    """
+    tasks: {name: (func, args, kwargs, default)}
+    Runs every task at the same time on a bounded thread pool (each one borrows its own
+    pooled connection). A task that fails or is not done by its timeout gets its default.
+    timeout: seconds for all tasks (DASHBOARD_QUERY_TIMEOUT), timeouts: {name: seconds} overrides
+    Returns: (results {name: value}, errors {name: message})
+    """
+    timeout = DASHBOARD_QUERY_TIMEOUT if timeout is None else timeout
+    timeouts = timeouts or {}
+
+    stats = current_db_stats()
+
+    def call(func, args, kwargs):
+        with reporting_to(stats):
+            return func(*args, **kwargs)
+
+    started = _clock.monotonic()
+    futures = {
+        name: _dashboard_executor.submit(call, func, args, kwargs)
+        for name, (func, args, kwargs, _) in tasks.items()
+    }
+
+    results, errors = {}, {}
+    for name, future in futures.items():
+        default = tasks[name][3]
+        remaining = started + timeouts.get(name, timeout) - _clock.monotonic()
+        try:
+            results[name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeout:
+            future.cancel()
+            results[name] = default
+            errors[name] = "timed out"
+        except Exception as e:
+            results[name] = default
+            errors[name] = str(e)
+    return results, errors
 
 
 # ==========================================================
@@ -684,47 +2512,55 @@ def _parse_dep_dt(dep_date, dep_time):
     return datetime.combine(dd, tt)
 
 def _get_route_airports_and_duration(route_id):
-    with db_cur() as cursor:
-        cursor.execute("""
-            SELECT SourceAirport, DestAirport, DurationMinutes
-            FROM Routes
-            WHERE RouteID=%s
-        """, (route_id,))
-        row = cursor.fetchone()
+    row = reference().route(route_id)
     if not row:
         return None, None, None
     return row["SourceAirport"], row["DestAirport"], int(row["DurationMinutes"] or 0)
 
-def _crew_schedule_check(member_kind, member_id, new_dep_dt, new_arr_dt, new_source_airport):
+_CREW_SCHEDULE_SQL = {
+    "pilot": """
+        SELECT cp.PilotID AS EmpID, f.FlightNum, f.DepartureDate, f.DepartureTime,
+               r.SourceAirport, r.DestAirport, r.DurationMinutes, f.StatusF
+        FROM CrewPilots cp
+        JOIN Flights f ON cp.FlightNum = f.FlightNum
+        JOIN Routes r ON f.RouteID = r.RouteID
+        WHERE cp.PilotID IN ({ids})
+          AND f.StatusF <> 'Canceled'
+    """,
+    "attendant": """
+        SELECT ca.AttendantID AS EmpID, f.FlightNum, f.DepartureDate, f.DepartureTime,
+               r.SourceAirport, r.DestAirport, r.DurationMinutes, f.StatusF
+        FROM CrewAttendants ca
+        JOIN Flights f ON ca.FlightNum = f.FlightNum
+        JOIN Routes r ON f.RouteID = r.RouteID
+        WHERE ca.AttendantID IN ({ids})
+          AND f.StatusF <> 'Canceled'
+    """,
+}
+
+
+def _crew_schedule_rows(cursor, member_kind, member_ids):
+    """Assigned (not canceled) flights of many crew members in one IN-list query -> {id: [rows]}"""
+    by_id = {int(x): [] for x in member_ids}
+    if not by_id:
+        return by_id
+    placeholders = ",".join(["%s"] * len(by_id))
+    cursor.execute(_CREW_SCHEDULE_SQL[member_kind].format(ids=placeholders), tuple(by_id))
+    for r in cursor.fetchall():
+        by_id[int(r["EmpID"])].append(r)
+    return by_id
+
+
+def _crew_schedule_check(member_kind, member_id, new_dep_dt, new_arr_dt, new_source_airport, rows=None):
     """
     member_kind: 'pilot' or 'attendant'
     Rule A: no overlap with any existing assigned flight
     Rule B: next flight must depart from last destination airport
+    rows: member's assigned flights (from _crew_schedule_rows); queried here if not given
     """
-    if member_kind == "pilot":
-        sql = """
-            SELECT f.FlightNum, f.DepartureDate, f.DepartureTime,
-                   r.SourceAirport, r.DestAirport, r.DurationMinutes, f.StatusF
-            FROM CrewPilots cp
-            JOIN Flights f ON cp.FlightNum = f.FlightNum
-            JOIN Routes r ON f.RouteID = r.RouteID
-            WHERE cp.PilotID = %s
-              AND f.StatusF <> 'Canceled'
-        """
-    else:
-        sql = """
-            SELECT f.FlightNum, f.DepartureDate, f.DepartureTime,
-                   r.SourceAirport, r.DestAirport, r.DurationMinutes, f.StatusF
-            FROM CrewAttendants ca
-            JOIN Flights f ON ca.FlightNum = f.FlightNum
-            JOIN Routes r ON f.RouteID = r.RouteID
-            WHERE ca.AttendantID = %s
-              AND f.StatusF <> 'Canceled'
-        """
-
-    with db_cur() as cursor:
-        cursor.execute(sql, (int(member_id),))
-        rows = cursor.fetchall()
+    if rows is None:
+        with db_cur() as cursor:
+            rows = _crew_schedule_rows(cursor, member_kind, [member_id])[int(member_id)]
 
     # compute existing intervals + find last arrived flight before new_dep_dt
     last_arrival_dt = None
@@ -754,30 +2590,20 @@ def _crew_schedule_check(member_kind, member_id, new_dep_dt, new_arr_dt, new_sou
 
 
 def get_class_seat_count(tail_num, class_type):
-    with db_cur() as cursor:
-        cursor.execute("""
-            SELECT NumRows, NumCols
-            FROM AircraftLayout
-            WHERE TailNum = %s AND ClassType = %s
-        """, (tail_num, class_type))
-        row = cursor.fetchone()
-    if not row:
+    layout = reference().layout(tail_num, class_type)
+    if not layout:
         return 0
-    return int(row["NumRows"]) * int(row["NumCols"])
+    return layout[0] * layout[1]
 
 # ==========================================================
 # ADMIN: CREW RULES (THIS IS THE IMPORTANT PART FOR LONG HAUL)
 # ==========================================================
 def get_aircraft_size(tail_num):
-    with db_cur() as cursor:
-        cursor.execute("SELECT Size FROM Aircrafts WHERE TailNum = %s", (tail_num,))
-        row = cursor.fetchone()
+    row = reference().aircraft_row(tail_num)
     return row["Size"] if row else None
 
 def get_route_duration(route_id):
-    with db_cur() as cursor:
-        cursor.execute("SELECT DurationMinutes FROM Routes WHERE RouteID = %s", (route_id,))
-        row = cursor.fetchone()
+    row = reference().route(route_id)
     return int(row["DurationMinutes"]) if row else None
 
 def is_pilot_longhaul(pilot_id):
@@ -797,6 +2623,17 @@ def is_attendant_longhaul(att_id):
     return bool(row and int(row.get("IsLongHaulQualified", 0)) == 1)
 
 
+def _longhaul_qualified_ids(cursor, table, ids):
+    if not ids:
+        return set()
+    placeholders = ",".join(["%s"] * len(ids))
+    cursor.execute(
+        f"SELECT EmployeeID FROM {table} WHERE EmployeeID IN ({placeholders}) AND IsLongHaulQualified = 1",
+        tuple(ids)
+    )
+    return {int(r["EmployeeID"]) for r in cursor.fetchall()}
+
+
 def validate_crew_before_flight(tail_num, route_id, dep_date, dep_time, pilot_ids, attendant_ids, long_minutes_threshold=360):
     """
     Returns: (ok: bool, msg: str)
@@ -806,69 +2643,84 @@ def validate_crew_before_flight(tail_num, route_id, dep_date, dep_time, pilot_id
     - If DurationMinutes >= threshold -> all crew must be long-haul qualified
     - NEW: crew cannot overlap flights
     - NEW: crew location continuity (next flight must depart from last destination)
+    Aircraft + route come from the reference snapshot; the DB lookups share one connection
+    (2 qualification IN-lists, 2 schedule IN-lists).
     """
-    size = get_aircraft_size(tail_num)
+    snap = reference()
+    aircraft = snap.aircraft_row(tail_num)
+    size = aircraft["Size"] if aircraft else None
     if not size:
         return False, "Tail number not found (aircraft does not exist)."
 
-    source_airport, dest_airport, duration = _get_route_airports_and_duration(route_id)
-    if duration is None:
+    route = snap.route(route_id)
+    if not route:
         return False, "Route not found."
 
-    # required counts
-    if size == "Large":
-        req_p, req_a = 3, 6
-    else:
-        req_p, req_a = 2, 3
-
-    # unique IDs only
-    pilot_ids = [int(x) for x in pilot_ids]
-    attendant_ids = [int(x) for x in attendant_ids]
-
-    if len(set(pilot_ids)) != len(pilot_ids):
-        return False, "Duplicate pilot selected."
-    if len(set(attendant_ids)) != len(attendant_ids):
-        return False, "Duplicate attendant selected."
-
-    if len(pilot_ids) != req_p:
-        return False, f"Aircraft size {size}: you must select exactly {req_p} pilots."
-    if len(attendant_ids) != req_a:
-        return False, f"Aircraft size {size}: you must select exactly {req_a} attendants."
-
-    # long flight check
-    is_long = int(duration) >= int(long_minutes_threshold)
-    if is_long:
-        for pid in pilot_ids:
-            if not is_pilot_longhaul(pid):
+    source_airport = route["SourceAirport"]
+    duration = int(route["DurationMinutes"] or 0)
+
+    with db_cur() as cursor:
+        # required counts
+        if size == "Large":
+            req_p, req_a = 3, 6
+        else:
+            req_p, req_a = 2, 3
+
+        # unique IDs only
+        pilot_ids = [int(x) for x in pilot_ids]
+        attendant_ids = [int(x) for x in attendant_ids]
+
+        if len(set(pilot_ids)) != len(pilot_ids):
+            return False, "Duplicate pilot selected."
+        if len(set(attendant_ids)) != len(attendant_ids):
+            return False, "Duplicate attendant selected."
+
+        if len(pilot_ids) != req_p:
+            return False, f"Aircraft size {size}: you must select exactly {req_p} pilots."
+        if len(attendant_ids) != req_a:
+            return False, f"Aircraft size {size}: you must select exactly {req_a} attendants."
+
+        # long flight check
+        is_long = int(duration) >= int(long_minutes_threshold)
+        if is_long:
+            qualified_pilots = _longhaul_qualified_ids(cursor, "Pilots", pilot_ids)
+            if any(pid not in qualified_pilots for pid in pilot_ids):
                 return False, "Long flight: all pilots must be long-haul qualified."
-        for aid in attendant_ids:
-            if not is_attendant_longhaul(aid):
+            qualified_atts = _longhaul_qualified_ids(cursor, "FlightAttendants", attendant_ids)
+            if any(aid not in qualified_atts for aid in attendant_ids):
                 return False, "Long flight: all attendants must be long-haul qualified."
 
+        pilot_rows = _crew_schedule_rows(cursor, "pilot", pilot_ids)
+        attendant_rows = _crew_schedule_rows(cursor, "attendant", attendant_ids)
+
     # NEW: schedule + location rules
     new_dep_dt = _parse_dep_dt(dep_date, dep_time)
     new_arr_dt = compute_arrival_dt(_to_date(dep_date), dep_time, duration)
 
     for pid in pilot_ids:
-        ok, msg = _crew_schedule_check("pilot", pid, new_dep_dt, new_arr_dt, source_airport)
+        ok, msg = _crew_schedule_check("pilot", pid, new_dep_dt, new_arr_dt, source_airport, rows=pilot_rows[pid])
         if not ok:
             return False, msg
 
     for aid in attendant_ids:
-        ok, msg = _crew_schedule_check("attendant", aid, new_dep_dt, new_arr_dt, source_airport)
+        ok, msg = _crew_schedule_check("attendant", aid, new_dep_dt, new_arr_dt, source_airport, rows=attendant_rows[aid])
         if not ok:
             return False, msg
 
     return True, "OK"
 
 
-def admin_find_available_crew(table, id_col, qual_col, dep_dt, source_airport, long_required: bool):
+def admin_find_available_crew(table, id_col, qual_col, dep_dt, source_airport, long_required: bool, timelines=None):
     """
     Enforces:
     - cannot be in 2 flights at same time (overlap)
     - must depart from last airport they were in (last destination before dep_dt == source_airport)
     - if long_required -> must be qualified
+    timelines: result of load_crew_timelines() (loaded here if not given)
     """
+    if timelines is None:
+        timelines = load_crew_timelines()
+
     candidates = []
     with db_cur() as cursor:
         if long_required:
@@ -879,13 +2731,14 @@ def admin_find_available_crew(table, id_col, qual_col, dep_dt, source_airport, l
 
     for s in staff:
         emp_id = s[id_col]
+        timeline = timelines.get(int(emp_id))
 
         # 1) overlap check
-        if crew_has_overlap(emp_id, dep_dt):
+        if crew_timeline_has_overlap(timeline, dep_dt):
             continue
 
         # 2) location continuity check
-        last_loc = crew_last_location(emp_id, dep_dt)
+        last_loc = crew_timeline_last_location(timeline, dep_dt)
         # If never flew before, we allow only if source is TLV (keeps logic consistent)
         if last_loc is None:
             if source_airport != "TLV":
@@ -899,6 +2752,76 @@ def admin_find_available_crew(table, id_col, qual_col, dep_dt, source_airport, l
     return candidates
 
 
+# ==========================================================
+# CREW TIMELINES (all assignments in one query, answered by binary search)
+# ==========================================================
+def load_crew_timelines():
+    """
+    Every crew assignment (pilots + attendants) -> one sorted timeline per EmployeeID:
+      {emp_id: {"starts", "max_end", "sources", "ends", "dests"}}
+    Keyed by EmployeeID only (pilot and attendant IDs share it), same as
+    crew_has_overlap / crew_last_location, and canceled flights are included like there.
+    """
+    with db_cur() as cursor:
+        cursor.execute("""
+            SELECT x.EmpID, f.DepartureDate, f.DepartureTime, r.DurationMinutes, r.SourceAirport, r.DestAirport
+            FROM (
+                SELECT FlightNum, PilotID AS EmpID FROM CrewPilots
+                UNION
+                SELECT FlightNum, AttendantID AS EmpID FROM CrewAttendants
+            ) x
+            JOIN Flights f ON f.FlightNum = x.FlightNum
+            JOIN Routes r ON r.RouteID = f.RouteID
+        """)
+        rows = cursor.fetchall()
+
+    by_emp = {}
+    for r in rows:
+        by_emp.setdefault(int(r["EmpID"]), []).append(_timeline_item(r))
+    return {emp_id: _build_timeline(items) for emp_id, items in by_emp.items()}
+
+
+def _timeline_item(row):
+    # (start, end, source, dest) of one flight row
+    start = _parse_dep_dt(row["DepartureDate"], row["DepartureTime"])
+    end = start + timedelta(minutes=int(row["DurationMinutes"] or 0))
+    return (start, end, row["SourceAirport"], row["DestAirport"])
+
+
+def _build_timeline(items):
+    by_start = sorted(items, key=lambda x: x[0])
+    max_end = []
+    running = None
+    for _, end, _, _ in by_start:
+        running = end if running is None or end > running else running
+        max_end.append(running)
+
+    by_end = sorted(items, key=lambda x: x[1])
+    return {
+        "starts": [x[0] for x in by_start],
+        "max_end": max_end,            # max end among flights starting at or before starts[i]
+        "sources": [x[2] for x in by_start],
+        "ends": [x[1] for x in by_end],
+        "dests": [x[3] for x in by_end],
+    }
+
+
+def crew_timeline_has_overlap(timeline, dep_dt):
+    # same rule as crew_has_overlap: some flight with start <= dep_dt < end
+    if not timeline:
+        return False
+    i = bisect_right(timeline["starts"], dep_dt)
+    return i > 0 and timeline["max_end"][i - 1] > dep_dt
+
+
+def crew_timeline_last_location(timeline, dep_dt):
+    # same rule as crew_last_location: destination of the latest flight that ended by dep_dt
+    if not timeline:
+        return None
+    i = bisect_right(timeline["ends"], dep_dt)
+    return timeline["dests"][i - 1] if i > 0 else None
+
+
 def crew_has_overlap(emp_id, dep_dt):
     # Any assigned flight whose [start,end) overlaps dep_dt?
     # start = DepartureDate+DepartureTime
@@ -941,14 +2864,119 @@ def crew_last_location(emp_id, dep_dt):
 
 
 
+# ==========================================================
+# AIRCRAFT TIMELINES (where every airframe is, and when it is busy)
+# ==========================================================
+AIRCRAFT_TIMELINE_REBUILD_SECONDS = float(os.environ.get("AIRCRAFT_TIMELINE_REBUILD_SECONDS", "900"))
+AIRCRAFT_HOME_AIRPORT = "TLV"   # an aircraft without flights is parked here (same rule as crew)
+
+_AIRCRAFT_TIMELINE_SQL = """
+    SELECT f.TailNum, f.DepartureDate, f.DepartureTime, r.DurationMinutes, r.SourceAirport, r.DestAirport
+    FROM Flights f
+    JOIN Routes r ON r.RouteID = f.RouteID
+    WHERE f.StatusF <> 'Canceled' {where}
+"""
+
+
+class AircraftTimelines:
+    """
+    Non-canceled flights of every aircraft as one timeline per TAILNUM (see _build_timeline),
+    built from a single query. Tails named in the "aircraft" change namespace are reloaded
+    one by one before the next read; a full rebuild runs every AIRCRAFT_TIMELINE_REBUILD_SECONDS.
+    """
+
+    def __init__(self):
+        self.tails = {}
+        self.built_at = 0.0
+        self._dirty = set()       # TAILNUMs to reload
+        self._stale = True        # full rebuild needed
+        self._lock = threading.Lock()
+
+    def mark(self, key):
+        with self._lock:
+            if key:
+                self._dirty.add(key.upper())
+            else:
+                self._stale = True
+
+    @staticmethod
+    def _group(rows):
+        by_tail = {}
+        for r in rows:
+            by_tail.setdefault(r["TailNum"].upper(), []).append(_timeline_item(r))
+        return {tail: _build_timeline(items) for tail, items in by_tail.items()}
+
+    def refresh(self):
+        with self._lock:
+            if self._stale or _clock.monotonic() - self.built_at >= AIRCRAFT_TIMELINE_REBUILD_SECONDS:
+                self._stale = False
+                self._dirty.clear()
+                with db_cur() as cursor:
+                    cursor.execute(_AIRCRAFT_TIMELINE_SQL.format(where=""))
+                    rows = cursor.fetchall()
+                self.tails = self._group(rows)
+                self.built_at = _clock.monotonic()
+            elif self._dirty:
+                tails, self._dirty = sorted(self._dirty), set()
+                with db_cur() as cursor:
+                    cursor.execute(
+                        _AIRCRAFT_TIMELINE_SQL.format(where=f"AND f.TailNum IN ({','.join(['%s'] * len(tails))})"),
+                        tuple(tails)
+                    )
+                    fresh = self._group(cursor.fetchall())
+                # swap whole entries: readers keep whichever version they already hold
+                for tail in tails:
+                    if tail in fresh:
+                        self.tails[tail] = fresh[tail]
+                    else:
+                        self.tails.pop(tail, None)
+
+    def get(self, tail_num):
+        return self.tails.get(str(tail_num).strip().upper())
+
+
+_aircraft_timelines = AircraftTimelines()
+
+
+def _aircraft_changed(cursor, tail_num):
+    # inside the writing transaction, same pattern as _search_changed
+    key = str(tail_num or "").strip().upper()
+    log_data_change(cursor, "aircraft", key)
+    _after_commit(lambda: _dispatch_change("aircraft", key))
+
+
+@on_data_change("aircraft")
+def _on_aircraft_change(key):
+    _aircraft_timelines.mark(key)
+
+
+def aircraft_schedule_conflict(timeline, dep_dt, arr_dt, source, dest):
+    """
+    Why this aircraft cannot fly source -> dest over [dep_dt, arr_dt), or None if it can:
+    - it is already flying then
+    - it will not be at source (last destination before dep_dt, AIRCRAFT_HOME_AIRPORT if none)
+    - its next flight leaves from somewhere other than dest
+    """
+    timeline = timeline or {"starts": [], "max_end": [], "sources": [], "ends": [], "dests": []}
+
+    i = bisect_left(timeline["starts"], arr_dt)
+    if i > 0 and timeline["max_end"][i - 1] > dep_dt:
+        return "already flying at that time"
+
+    j = bisect_right(timeline["ends"], dep_dt)
+    location = timeline["dests"][j - 1] if j > 0 else AIRCRAFT_HOME_AIRPORT
+    if location != source:
+        return f"will be at {location}, not {source}"
+
+    if i < len(timeline["starts"]) and timeline["sources"][i] != dest:
+        return f"next flight leaves from {timeline['sources'][i]}, not {dest}"
+    return None
+
+
 def admin_get_create_flight_candidates(route_id: int, dep_dt):
     # route info
-    with db_cur() as cursor:
-        cursor.execute(
-            "SELECT SourceAirport, DestAirport, DurationMinutes FROM Routes WHERE RouteID=%s",
-            (route_id,)
-        )
-        r = cursor.fetchone()
+    snap = reference()
+    r = snap.route(route_id)
 
     if not r:
         return False, "Route not found."
@@ -961,29 +2989,30 @@ def admin_get_create_flight_candidates(route_id: int, dep_dt):
     # RULES:
     # - long route => only Large aircraft
     # - short route => Small or Large
-    with db_cur() as cursor:
-        if is_long:
-            cursor.execute(
-                "SELECT TailNum, Manufacturer, Size, PurchaseDate FROM Aircrafts WHERE Size='Large'"
-            )
-        else:
-            cursor.execute(
-                "SELECT TailNum, Manufacturer, Size, PurchaseDate FROM Aircrafts"
-            )
-        aircrafts = cursor.fetchall()
+    aircrafts = [dict(a) for a in snap.aircraft.values() if not is_long or a["Size"] == "Large"]
+
+    # - not flying at that time, parked at the source, and its next flight leaves from the destination
+    arr_dt = dep_dt + timedelta(minutes=dur)
+    _aircraft_timelines.refresh()
+    aircrafts = [
+        a for a in aircrafts
+        if aircraft_schedule_conflict(_aircraft_timelines.get(a["TailNum"]), dep_dt, arr_dt, src, r["DestAirport"]) is None
+    ]
 
     if not aircrafts:
         return False, "No suitable aircraft for this route/time."
 
     # crew pool (qualified + available + correct location)
     # For long routes we require qualification, for short routes we don't.
+    timelines = load_crew_timelines()
     pilots_pool = admin_find_available_crew(
         table="Pilots",
         id_col="EmployeeID",
         qual_col="IsLongHaulQualified",
         dep_dt=dep_dt,
         source_airport=src,
-        long_required=is_long
+        long_required=is_long,
+        timelines=timelines
     )
     attendants_pool = admin_find_available_crew(
         table="FlightAttendants",
@@ -991,7 +3020,8 @@ def admin_get_create_flight_candidates(route_id: int, dep_dt):
         qual_col="IsLongHaulQualified",
         dep_dt=dep_dt,
         source_airport=src,
-        long_required=is_long
+        long_required=is_long,
+        timelines=timelines
     )
 
     # Filter aircrafts to only those we can staff לפי הגודל:
@@ -1057,21 +3087,97 @@ def admin_create_flight_with_crew(
     return True, "Flight created with crew."
 
 
-def _flight_has_any_free_seat(flight_num):
-    pricing = get_flight_pricing(flight_num)  # classes available for this flight
-    for class_type in pricing.keys():
-        if len(list_available_seats(flight_num, class_type)) > 0:
-            return True
-    return False
+# ==========================================================
+# SEAT COUNTERS (FlightSeatCounters: Capacity / Sold per flight + class)
+# ==========================================================
+_SEAT_COUNTERS_REBUILD_SQL = """
+    INSERT INTO FlightSeatCounters (FlightNum, ClassType, Capacity, Sold)
+    SELECT fp.FlightNum, fp.ClassType, al.NumRows * al.NumCols,
+           (SELECT COUNT(*)
+            FROM Tickets t
+            JOIN Orders o ON t.OrderID = o.OrderID
+            WHERE t.FlightNum = fp.FlightNum
+              AND t.ClassType = fp.ClassType
+              AND o.OrderStatus NOT IN ('CustCancelled', 'SysCancelled'))
+    FROM FlightPricing fp
+    JOIN Flights f ON f.FlightNum = fp.FlightNum
+    JOIN AircraftLayout al ON al.TailNum = f.TailNum AND al.ClassType = fp.ClassType
+    {where}
+    ON DUPLICATE KEY UPDATE Capacity = VALUES(Capacity), Sold = VALUES(Sold)
+"""
+
+
+def _seat_counters_rebuild_cur(cursor, flight_num=None):
+    if flight_num is None:
+        cursor.execute(_SEAT_COUNTERS_REBUILD_SQL.format(where=""))
+    else:
+        cursor.execute(_SEAT_COUNTERS_REBUILD_SQL.format(where="WHERE fp.FlightNum = %s"), (flight_num,))
 
 
-def update_flight_status_full_if_needed(flight_num):
-    new_status = "Active" if _flight_has_any_free_seat(flight_num) else "Full"
+def rebuild_seat_counters(flight_num=None):
+    """Recompute counters from Tickets (all flights, or one). Use after manual data fixes."""
+    with db_tx() as cursor:
+        _seat_counters_rebuild_cur(cursor, flight_num)
+
+
+def _seat_counters_add(cursor, flight_num, class_type, delta):
+    # every seat sale/release passes here -> other workers drop their seat map
+    log_data_change(cursor, "seats", f"{flight_num}|{class_type}")
+    cursor.execute("""
+        UPDATE FlightSeatCounters
+        SET Sold = GREATEST(Sold + %s, 0)
+        WHERE FlightNum = %s AND ClassType = %s
+    """, (int(delta), flight_num, class_type))
+
+    # flight created before counters existed -> build its rows from Tickets (same transaction)
+    if cursor.rowcount == 0:
+        _seat_counters_rebuild_cur(cursor, flight_num)
+
+
+def _flight_has_any_free_seat(flight_num):
     with db_cur() as cursor:
+        cursor.execute("""
+            SELECT EXISTS (
+                SELECT 1 FROM FlightSeatCounters
+                WHERE FlightNum = %s AND Sold < Capacity
+            ) AS HasFree
+        """, (flight_num,))
+        row = cursor.fetchone()
+    return bool(row and int(row["HasFree"]) == 1)
+
+
+def _refresh_flight_status(cursor, flight_num):
+    # O(1): read current status + "any class with Sold < Capacity" in one PK lookup
+    cursor.execute("""
+        SELECT f.StatusF, f.DepartureDate, r.SourceAirport, r.DestAirport,
+               EXISTS (
+                   SELECT 1 FROM FlightSeatCounters c
+                   WHERE c.FlightNum = f.FlightNum AND c.Sold < c.Capacity
+               ) AS HasFree
+        FROM Flights f
+        JOIN Routes r ON r.RouteID = f.RouteID
+        WHERE f.FlightNum = %s
+    """, (flight_num,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+
+    new_status = "Active" if int(row["HasFree"]) == 1 else "Full"
+
+    # write only on a real change (no hot-row UPDATE on every sale)
+    if row["StatusF"] != new_status:
         cursor.execute("UPDATE Flights SET StatusF=%s WHERE FlightNum=%s", (new_status, flight_num))
+        _report_flight_status_delta(cursor, row["StatusF"], new_status)
+        # Full <-> Active changes what search_flights returns for this date/route
+        _search_changed(cursor, row["DepartureDate"], row["SourceAirport"], row["DestAirport"])
     return new_status
 
 
+def update_flight_status_full_if_needed(flight_num):
+    with db_cur() as cursor:
+        return _refresh_flight_status(cursor, flight_num)
+
+
 def admin_create_aircraft_with_layout(
     tail_num, manufacturer, size, purchase_date,
     econ_rows, econ_cols, bus_rows, bus_cols
@@ -1095,7 +3201,7 @@ def admin_create_aircraft_with_layout(
         return False, "Business layout must be both 0 (no business) or both > 0."
 
     try:
-        with db_cur() as cursor:
+        with db_tx() as cursor:
             # prevent duplicate aircraft
             cursor.execute("SELECT TailNum FROM Aircrafts WHERE TailNum=%s", (tail_num,))
             if cursor.fetchone():
@@ -1120,6 +3226,9 @@ def admin_create_aircraft_with_layout(
                     VALUES (%s, 'Business', %s, %s)
                 """, (tail_num, bus_rows, bus_cols))
 
+            # every worker swaps in a new reference snapshot
+            bump_data_version(cursor, "reference")
+
         return True, "Aircraft added and layout created."
     except Exception as e:
         return False, str(e)
@@ -1127,9 +3236,10 @@ def admin_create_aircraft_with_layout(
 def admin_report_flights_by_status():
     with db_cur() as cursor:
         cursor.execute("""
-            SELECT StatusF, COUNT(*) AS Cnt
-            FROM Flights
+            SELECT StatusF, SUM(Cnt) AS Cnt
+            FROM ReportFlightStatus
             GROUP BY StatusF
+            HAVING SUM(Cnt) > 0
             ORDER BY StatusF
         """)
         return cursor.fetchall()
@@ -1137,17 +3247,130 @@ def admin_report_flights_by_status():
 def admin_report_revenue_by_class():
     with db_cur() as cursor:
         cursor.execute("""
-            SELECT x.ClassType, SUM(x.TotalPrice) AS Revenue
-            FROM (
-                SELECT o.OrderID, o.TotalPrice, t.ClassType
-                FROM Orders o
-                JOIN Tickets t ON o.OrderID = t.OrderID
-                WHERE o.OrderStatus NOT IN ('CustCancelled', 'SysCancelled')
-                GROUP BY o.OrderID, o.TotalPrice, t.ClassType
-            ) AS x
-            GROUP BY x.ClassType;
-
+            SELECT ClassType, SUM(Revenue) AS Revenue
+            FROM ReportClassRevenue
+            GROUP BY ClassType
+            HAVING SUM(Revenue) <> 0
+            ORDER BY ClassType
         """)
         return cursor.fetchall()
 
 
+# ==========================================================
+# REPORT ROLLUPS (kept up to date by the booking / cancel / status paths)
+# ==========================================================
+# every rollup key is split over REPORT_SHARDS rows (readers SUM them): each transaction adds
+# its delta to a random shard, so concurrent bookings rarely wait on the same row lock
+REPORT_SHARDS = min(256, max(1, int(os.environ.get("REPORT_SHARDS", "16"))))   # Shard is a TINYINT UNSIGNED
+
+
+def _report_shard():
+    return random.randrange(REPORT_SHARDS)
+
+
+def _report_orders_delta(cursor, moves):
+    """moves: [(OrderStatus, Day, cnt_delta, total_delta)] -> ReportOrderStatus + ReportDailyOrders"""
+    merged = {}
+    for status, day, cnt, amount in moves:
+        if status is None:
+            continue
+        key = (status, day)
+        c, a = merged.get(key, (0, Decimal(0)))
+        merged[key] = (c + int(cnt), a + Decimal(str(amount or 0)))
+    if not merged:
+        return
+
+    shard = _report_shard()
+    cursor.executemany("""
+        INSERT INTO ReportDailyOrders (Day, OrderStatus, Shard, Cnt, TotalPrice)
+        VALUES (%s,%s,%s,%s,%s)
+        ON DUPLICATE KEY UPDATE Cnt = Cnt + VALUES(Cnt), TotalPrice = TotalPrice + VALUES(TotalPrice)
+    """, [(day, status, shard, c, a) for (status, day), (c, a) in sorted(merged.items())])
+
+    by_status = {}
+    for (status, _), (c, a) in merged.items():
+        pc, pa = by_status.get(status, (0, Decimal(0)))
+        by_status[status] = (pc + c, pa + a)
+    cursor.executemany("""
+        INSERT INTO ReportOrderStatus (OrderStatus, Shard, Cnt, TotalPrice)
+        VALUES (%s,%s,%s,%s)
+        ON DUPLICATE KEY UPDATE Cnt = Cnt + VALUES(Cnt), TotalPrice = TotalPrice + VALUES(TotalPrice)
+    """, [(status, shard, c, a) for status, (c, a) in sorted(by_status.items())])
+
+
+def _report_class_delta(cursor, moves):
+    """moves: [(ClassType, revenue_delta)] -> ReportClassRevenue"""
+    merged = {}
+    for cls, amount in moves:
+        merged[cls] = merged.get(cls, Decimal(0)) + Decimal(str(amount or 0))
+    if not merged:
+        return
+    shard = _report_shard()
+    cursor.executemany("""
+        INSERT INTO ReportClassRevenue (ClassType, Shard, Revenue)
+        VALUES (%s,%s,%s)
+        ON DUPLICATE KEY UPDATE Revenue = Revenue + VALUES(Revenue)
+    """, [(cls, shard, amount) for cls, amount in sorted(merged.items())])
+
+
+def _report_flight_status_delta(cursor, old_status, new_status, count=1):
+    shard, rows = _report_shard(), []
+    if old_status:
+        rows.append((old_status, shard, -count))
+    if new_status:
+        rows.append((new_status, shard, count))
+    if rows:
+        cursor.executemany("""
+            INSERT INTO ReportFlightStatus (StatusF, Shard, Cnt)
+            VALUES (%s,%s,%s)
+            ON DUPLICATE KEY UPDATE Cnt = Cnt + VALUES(Cnt)
+        """, sorted(rows))
+
+
+_REPORT_REBUILD_SQL = [
+    "DELETE FROM ReportOrderStatus",
+    "DELETE FROM ReportDailyOrders",
+    "DELETE FROM ReportClassRevenue",
+    "DELETE FROM ReportFlightStatus",
+    """
+    INSERT INTO ReportOrderStatus (OrderStatus, Cnt, TotalPrice)
+    SELECT OrderStatus, COUNT(*), COALESCE(SUM(TotalPrice), 0)
+    FROM Orders
+    WHERE OrderStatus IS NOT NULL
+    GROUP BY OrderStatus
+    """,
+    """
+    INSERT INTO ReportDailyOrders (Day, OrderStatus, Cnt, TotalPrice)
+    SELECT DATE(OrderDate), OrderStatus, COUNT(*), COALESCE(SUM(TotalPrice), 0)
+    FROM Orders
+    WHERE OrderStatus IS NOT NULL AND OrderDate IS NOT NULL
+    GROUP BY DATE(OrderDate), OrderStatus
+    """,
+    """
+    INSERT INTO ReportClassRevenue (ClassType, Revenue)
+    SELECT x.ClassType, SUM(x.TotalPrice)
+    FROM (
+        SELECT o.OrderID, o.TotalPrice, t.ClassType
+        FROM Orders o
+        JOIN Tickets t ON o.OrderID = t.OrderID
+        WHERE o.OrderStatus NOT IN ('CustCancelled', 'SysCancelled')
+        GROUP BY o.OrderID, o.TotalPrice, t.ClassType
+    ) AS x
+    GROUP BY x.ClassType
+    """,
+    """
+    INSERT INTO ReportFlightStatus (StatusF, Cnt)
+    SELECT StatusF, COUNT(*)
+    FROM Flights
+    WHERE StatusF IS NOT NULL
+    GROUP BY StatusF
+    """,
+]
+
+
+def rebuild_report_rollups():
+    """Recompute every report rollup from Orders/Tickets/Flights (one transaction, all in shard 0)."""
+    with db_tx() as cursor:
+        for sql in _REPORT_REBUILD_SQL:
+            cursor.execute(sql)
+